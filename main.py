@@ -1,24 +1,26 @@
-from typing import Optional
-from solver.card import CardIndex, \
-    ShouldPickCardsByProblem, \
-    should_pick_cards_from_yaml
+import asyncio
+from asyncio import Task, get_running_loop
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from time import monotonic, perf_counter, time
+from typing import Callable, Final, Optional
 from solver.const import ScoreConstant
-from solver.pick_ways import solve_by_binary_search
-from solver.request.meta import AbstractRequester, Answer, Match, Problem
-from ml.maesyori import preprocess_input
-from ml.focal_loss import focal_loss
+from solver.factory import SOLVER_FACTORIES, create_solver
+from solver.journal import Journal
+from solver.poller import ProblemPoller
+from solver.prediction_cache import PredictionCache
+from solver.request.cache import DEFAULT_MAX_BYTES, CachingRequester
+from solver.request.meta import AbstractRequester, Answer, Problem
+from solver.schedule import ChunkScheduler
+from solver.search import AnswerSearch
+from solver.stopping import StoppingPolicy
+from ml.maesyori import MEL_BASIS, WINDOW, preprocess_batch
 from os import getenv
-from os.path import join, exists
 from dotenv import load_dotenv
-import tensorflow as tf
 import numpy as np
-from numpy import ndarray
 from solver.request.mock import MockRequester
 from solver.request.net import NetRequester
 
-from solver.score import calc_score, current_score
-from solver.state import SolverState, solver_state_from_yaml
-
 load_dotenv()
 
 TEMP_YAML_DIR = getenv('TEMP_YAML_DIR')
@@ -26,6 +28,16 @@ MODEL_PATH = getenv('MODEL_PATH')
 ENDPOINT = getenv('ENDPOINT')
 TOKEN = getenv('TOKEN')
 DEBUG = getenv('DEBUG')
+SOLVER = getenv('SOLVER') or 'binary_search'
+SOLVER_WORKERS = getenv('SOLVER_WORKERS')
+CHUNK_CACHE_BYTES = getenv('CHUNK_CACHE_BYTES')
+PREPROCESS = getenv('PREPROCESS') or 'numpy'
+WARM_UP = getenv('WARM_UP') or 'True'
+INFERENCE_BACKEND = getenv('INFERENCE_BACKEND') or 'keras'
+STOP_MIN_LOWEST = getenv('STOP_MIN_LOWEST')
+STOP_MIN_MARGIN = getenv('STOP_MIN_MARGIN')
+STOP_MIN_PICK_MARGIN = getenv('STOP_MIN_PICK_MARGIN')
+PIPELINE = getenv('PIPELINE') or 'sync'
 
 if TEMP_YAML_DIR is None or TEMP_YAML_DIR == '':
     raise Exception('env `TEMP_YAML_DIR` was not set')
@@ -35,15 +47,149 @@ if ENDPOINT is None or ENDPOINT == '':
     raise Exception('env `ENDPOINT` was not set')
 if TOKEN is None or TOKEN == '':
     raise Exception('env `TOKEN` was not set')
+SOLVER_CHOICES: Final = list(SOLVER_FACTORIES)
+if SOLVER not in SOLVER_CHOICES:
+    raise Exception(f'env `SOLVER` must be one of {SOLVER_CHOICES}')
+PREPROCESS_CHOICES: Final = ['numpy', 'graph']
+if PREPROCESS not in PREPROCESS_CHOICES:
+    raise Exception(f'env `PREPROCESS` must be one of {PREPROCESS_CHOICES}')
+PIPELINE_CHOICES: Final = ['sync', 'async']
+if PIPELINE not in PIPELINE_CHOICES:
+    raise Exception(f'env `PIPELINE` must be one of {PIPELINE_CHOICES}')
+INFERENCE_BACKEND_CHOICES: Final = ['keras', 'tflite']
+if INFERENCE_BACKEND not in INFERENCE_BACKEND_CHOICES:
+    raise Exception(
+        f'env `INFERENCE_BACKEND` must be one of {INFERENCE_BACKEND_CHOICES}')
+if INFERENCE_BACKEND == 'tflite' and PREPROCESS == 'graph':
+    raise Exception('env `PREPROCESS=graph` requires a keras backend')
 
-PICK_CARDS_YAML = join(TEMP_YAML_DIR, 'pick-cards.yaml')
-STATE_YAML = join(TEMP_YAML_DIR, 'solver-state.yaml')
+# 回答の送信に使うために、回答期限より前に探索を打ち切る秒数
+SOLVER_MARGIN: Final = 1.0
+# PIPELINE=async で回答の送信に失敗したときに、諦めるまでに送信する回数
+POST_ATTEMPTS: Final = 3
+# 回答を送り直すまでに待つ秒数。送り直すたびにこの秒数ずつ長くする
+POST_RETRY_SECONDS: Final = 0.5
+# 次の問題に進んだ後で以前の問題への回答の送信に失敗したときに、送り直すまでに待つ秒数
+PAST_POST_RETRY_SECONDS: Final = 5.0
+# 起動時の準備で前処理と推論に通すダミーの音声波形のサンプル数
+WARM_UP_SAMPLES: Final = 96000
 
 
 def main():
     print(f'Using temp path: {TEMP_YAML_DIR}')
     print(f'Using model path: {MODEL_PATH}')
     print(f'Accessing endpoint: {ENDPOINT}')
+    print(f'Using solver: {SOLVER}')
+
+    start = perf_counter()
+    predictions = create_prediction_cache()
+    print(f'loaded model in {perf_counter() - start:.3f}s')
+    if WARM_UP == 'True':
+        warm_up(predictions)
+    scheduler = ChunkScheduler(margin=SOLVER_MARGIN)
+    predictions.preprocess = scheduler.timed(
+        'preprocess', predictions.preprocess)
+    predictions.predict = scheduler.timed('inference', predictions.predict)
+    policy = StoppingPolicy(
+        min_lowest=float(STOP_MIN_LOWEST) if STOP_MIN_LOWEST
+        else StoppingPolicy.min_lowest,
+        min_margin=float(STOP_MIN_MARGIN) if STOP_MIN_MARGIN
+        else StoppingPolicy.min_margin,
+        min_pick_margin=float(STOP_MIN_PICK_MARGIN) if STOP_MIN_PICK_MARGIN
+        else StoppingPolicy.min_pick_margin,
+    )
+
+    req = CachingRequester(
+        MockRequester('E01') if DEBUG == "True" else NetRequester(
+            endpoint=ENDPOINT, token=TOKEN),
+        max_bytes=int(CHUNK_CACHE_BYTES) if CHUNK_CACHE_BYTES
+        else DEFAULT_MAX_BYTES,
+    )
+    match = req.get_match()
+    score_const = ScoreConstant(1, match.bonus_factor, match.penalty)
+
+    print(match)
+
+    solvers = create_solver(
+        SOLVER, int(SOLVER_WORKERS) if SOLVER_WORKERS else None)
+
+    journal = Journal(TEMP_YAML_DIR)
+    journal.load()
+
+    def search_on(problem: Problem) -> AnswerSearch:
+        return AnswerSearch(
+            scheduler, policy, match, score_const, journal, problem,
+            solvers.for_deadline(solver_deadline(problem)),
+        )
+
+    poller = ProblemPoller(req, journal.state)
+    try:
+        if PIPELINE == 'async':
+            asyncio.run(run_pipeline(predictions, req, poller, search_on))
+            return
+
+        while True:
+            problem = poller.next_problem()
+            answers = find_answers(predictions, search_on(problem), req)
+
+            for answer in answers:
+                print(answer)
+                req.post_answer(answer)
+    finally:
+        solvers.close()
+
+
+async def run_pipeline(
+    predictions: PredictionCache,
+    req: AbstractRequester,
+    poller: ProblemPoller,
+    search_on: Callable[[Problem], AnswerSearch],
+) -> None:
+    """
+    回答の送信を待たずに次の問題の取得と回答の探索を進める、非同期のメインループ。
+
+    ソルバーの状態とジャーナルを変更する処理は、全て executor の 1 つのスレッドで順に行う。
+    終了するときは、送信中の回答を待ってから抜け、送り直せなかった回答を表示する。
+    """
+    posting: set[Task[None]] = set()
+    past_answers: asyncio.Queue[list[Answer]] = asyncio.Queue()
+    reposting = asyncio.create_task(repost_past_answers(req, past_answers))
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        try:
+            while True:
+                problem = await poller.next_problem_async()
+                search = search_on(problem)
+                answers = await find_answers_async(
+                    predictions, search, req, executor)
+
+                task = asyncio.create_task(post_answers_or_roll_back(
+                    req, poller, search, answers, executor, past_answers))
+                posting.add(task)
+                task.add_done_callback(posting.discard)
+                task.add_done_callback(report_posting_failure)
+        finally:
+            if posting:
+                await asyncio.gather(*posting, return_exceptions=True)
+            reposting.cancel()
+            while not past_answers.empty():
+                for answer in past_answers.get_nowait():
+                    print(f'answer was not posted: {answer}')
+
+
+def create_prediction_cache() -> PredictionCache:
+    """
+    INFERENCE_BACKEND のモデルを読み込んで、PREPROCESS に応じた前処理と推論を行う PredictionCache を作る。
+
+    TensorFlow は読み込みに時間がかかるので、ここで初めて import する。
+    """
+    if INFERENCE_BACKEND == 'tflite':
+        from ml.backend import TFLiteBackend
+        return PredictionCache(
+            preprocess_batch, TFLiteBackend(MODEL_PATH).predict)
+
+    import tensorflow as tf
+    from ml.backend import KerasBackend
+    from ml.focal_loss import focal_loss
 
     model: Optional[tf.keras.Model] = tf.keras.models.load_model(
         MODEL_PATH,
@@ -55,107 +201,172 @@ def main():
     if model is None:
         raise Exception(f'model was not found at {MODEL_PATH}')
 
-    req = MockRequester('E01') if DEBUG == "True" else NetRequester(
-        endpoint=ENDPOINT, token=TOKEN)
-    match = req.get_match()
-    score_const = ScoreConstant(1, match.bonus_factor, match.penalty)
+    if PREPROCESS == 'graph':
+        from ml.tf_preprocess import predict_waveforms, \
+            with_waveform_preprocessing
+        waveform_model = with_waveform_preprocessing(model, MEL_BASIS, WINDOW)
+        return PredictionCache(
+            list, partial(predict_waveforms, waveform_model))
+    return PredictionCache(preprocess_batch, KerasBackend(model).predict)
 
-    print(match)
 
-    should = should_pick_cards_from_yaml(PICK_CARDS_YAML) \
-        if exists(PICK_CARDS_YAML) \
-        else ShouldPickCardsByProblem()
-    current_state = solver_state_from_yaml(STATE_YAML) \
-        if exists(STATE_YAML) \
-        else SolverState(
-        current_problem_id='',
-        current_fails=0,
-        used_chunks={},
-        past_answers={},
-    )
+def warm_up(predictions: PredictionCache) -> None:
+    """
+    ダミーの音声波形で前処理と推論を 2 回ずつ行い、1 回目と 2 回目の所要時間を表示する。
 
-    while True:
-        problem = req.get_problem()
-        answers = find_answers(
-            model, req, match, score_const, should, current_state, problem,
+    グラフのトレースなど初回の呼び出しにだけかかる処理を、試合が始まる前に済ませておく。
+    """
+    waveform = np.random.default_rng(0).normal(
+        0, 1000, WARM_UP_SAMPLES).astype(np.int16)
+    for label in ['cold', 'warm']:
+        start = perf_counter()
+        features = predictions.preprocess([waveform])
+        preprocessed = perf_counter()
+        predictions.predict(features)
+        predicted = perf_counter()
+        print(
+            f'{label} start: preprocess {preprocessed - start:.3f}s, '
+            f'predict {predicted - preprocessed:.3f}s'
         )
 
-        for answer in answers:
-            print(answer)
-            req.post_answer(answer)
+
+def solver_deadline(problem: Problem) -> float:
+    """
+    問題の回答期限の SOLVER_MARGIN 秒前を、time.monotonic() と同じ基準の時刻で返す。
+    """
+    remaining = problem.start_at + problem.time_limit - time() - SOLVER_MARGIN
+    return monotonic() + remaining
 
 
 def find_answers(
-    model: tf.keras.Model,
+    predictions: PredictionCache,
+    search: AnswerSearch,
     req: AbstractRequester,
-    match: Match,
-    score_const: ScoreConstant,
-    should: ShouldPickCardsByProblem,
-    current_state: SolverState,
-    problem: Problem,
 ) -> list[Answer]:
-    current_state.current_problem_id = problem.id
-    score_max = current_score(current_state, should, score_const)
-    answers: list[Answer] = []
+    problem = search.problem
+    for using_chunks in range(1, problem.chunks + 1):
+        if not search.can_use_next():
+            break
+        with search.scheduler.measure('fetch'):
+            chunks = req.get_chunks(using_chunks, TEMP_YAML_DIR)
+        with search.scheduler.measure('journal'):
+            search.use_chunks(using_chunks)
+
+        prediction_avg = predictions.update(problem.id, chunks)
+        if not search.step(using_chunks, prediction_avg):
+            break
+    return search.finish()
+
 
+async def find_answers_async(
+    predictions: PredictionCache,
+    search: AnswerSearch,
+    req: AbstractRequester,
+    executor: ThreadPoolExecutor,
+) -> list[Answer]:
+    """
+    find_answers と同じ回答を、イベントループを止めずに探す。
+
+    断片データのダウンロードはイベントループで待ち、前処理、推論、取り方の探索と
+    ソルバーの状態の保存は executor で行う。ダウンロードと推論は重ならず、
+    重なるのは前の問題の回答の送信と、次の問題の処理だけである。
+    """
+    loop = get_running_loop()
+    problem = search.problem
     for using_chunks in range(1, problem.chunks + 1):
-        chunks = req.get_chunks(using_chunks, TEMP_YAML_DIR)
-        current_state.used_chunks[problem.id] = max(
-            current_state.used_chunks.get(problem.id, 0), using_chunks,
-        )
+        if not search.can_use_next():
+            break
+        with search.scheduler.measure('fetch'):
+            chunk_names = await req.get_chunk_names_async(using_chunks)
+            chunks = await req.fetch_chunks_async(chunk_names, TEMP_YAML_DIR)
+        with search.scheduler.measure('journal'):
+            await loop.run_in_executor(
+                executor, search.use_chunks, using_chunks)
 
-        images = []
-        for chunk in chunks:
-            image = preprocess_input(chunk.wav)
-            images.append(image)
-        prediction: ndarray = model.predict(np.array(images))
-        prediction_avg = np.average(prediction, axis=0)
-
-        probabilities: list[float] = prediction_avg.tolist()
-        for index in range(0, len(probabilities)):
-            should.insert(
-                current_state.current_problem_id,
-                CardIndex(index + 1),
-                probabilities[index],
-            )
-        should.set_picks_on(current_state.current_problem_id, problem.data)
-
-        solution = solve_by_binary_search(match.problems, should)
-        if solution is None:
-            print(f'solution not found with using {using_chunks} chunks')
-            continue
-
-        picks_by_problem, acc = solution
-        score = calc_score(
-            problem.data,
-            current_state.current_fails,
-            using_chunks,
-            const=score_const
-        )
-        if score_max < score:
-            score_max = score
-            for picks in picks_by_problem:
-                new_answer = Answer(
-                    problem_id=problem.id,
-                    answers=list(map(
-                        lambda card_index: card_index.as_0_pad(),
-                        picks,
-                    )),
+        prediction_avg = await loop.run_in_executor(
+            executor, predictions.update, problem.id, chunks)
+        if not await loop.run_in_executor(
+            executor, search.step, using_chunks, prediction_avg
+        ):
+            break
+    return await loop.run_in_executor(executor, search.finish)
+
+
+async def post_answers_async(
+    req: AbstractRequester,
+    answers: list[Answer],
+) -> None:
+    """
+    answers を順に送信する。送信に失敗したときは POST_ATTEMPTS 回まで送り直す。
+    """
+    for answer in answers:
+        print(answer)
+        for attempt in range(1, POST_ATTEMPTS + 1):
+            try:
+                await req.post_answer_async(answer)
+                break
+            except Exception as e:
+                print(
+                    f'failed to post answer for {answer.problem_id} '
+                    f'({attempt}/{POST_ATTEMPTS}): {e!r}'
                 )
-                if problem.id in current_state.past_answers:
-                    new_taking_set = set(new_answer.answers)
-                    old_taking_set = set(
-                        current_state.past_answers[problem.id])
-                    retaken_cards = len(
-                        new_taking_set.difference(old_taking_set))
-                    current_state.current_fails += retaken_cards
-                current_state.past_answers[problem.id] = new_answer.answers
-                answers.append(new_answer)
-
-        should.save_yaml(PICK_CARDS_YAML)
-        current_state.save_yaml(STATE_YAML)
-        return answers
-    return []
+                if attempt == POST_ATTEMPTS:
+                    raise
+                await asyncio.sleep(POST_RETRY_SECONDS * attempt)
+
+
+async def post_answers_or_roll_back(
+    req: AbstractRequester,
+    poller: ProblemPoller,
+    search: AnswerSearch,
+    answers: list[Answer],
+    executor: ThreadPoolExecutor,
+    past_answers: asyncio.Queue[list[Answer]],
+) -> None:
+    """
+    answers を送信し、送り直しても失敗したときは、回答済みにした状態を元に戻す。
+
+    元に戻した問題は、まだ出題中であれば次の問い合わせで再び処理される。
+    すでに次の問題に進んでいたときは、状態は戻さずに past_answers に入れて後で送り直す。
+    """
+    problem_id = search.problem.id
+    try:
+        await post_answers_async(req, answers)
+        return
+    except Exception as e:
+        print(f'giving up posting answers for {problem_id}: {e!r}')
+    if poller.is_current(problem_id):
+        await get_running_loop().run_in_executor(executor, search.roll_back)
+        if poller.forget(problem_id):
+            return
+        # 元に戻している間に次の問題に進んだときも、解いた回答は送り直す
+    print(f'posting answers for {problem_id} again later')
+    past_answers.put_nowait(answers)
+
+
+async def repost_past_answers(
+    req: AbstractRequester,
+    past_answers: asyncio.Queue[list[Answer]],
+) -> None:
+    """
+    past_answers に入れた以前の問題への回答を、送信できるまで送り直す。
+
+    競技システムは出題中の問題より前の問題への回答も受け付けるので、
+    PAST_POST_RETRY_SECONDS 秒待ってから送り直し、失敗したときは past_answers に戻す。
+    """
+    while True:
+        answers = await past_answers.get()
+        await asyncio.sleep(PAST_POST_RETRY_SECONDS)
+        try:
+            await post_answers_async(req, answers)
+        except Exception as e:
+            print(f'failed to post past answers again: {e!r}')
+            past_answers.put_nowait(answers)
+
+
+def report_posting_failure(task: Task[None]) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        print(f'failed to post answers: {task.exception()!r}')
 
 
 if __name__ == '__main__':
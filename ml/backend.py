@@ -0,0 +1,88 @@
+import abc
+from typing import Any, Optional
+import numpy as np
+
+
+class InferenceBackend(metaclass=abc.ABCMeta):
+    @abc.abstractmethod
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        pass
+
+
+class KerasBackend(InferenceBackend):
+    """読み込み済みの Keras のモデルで推論する。
+
+    Parameters:
+        model (tf.keras.Model): 推論に使うモデル。
+    """
+
+    def __init__(self, model: Any) -> None:
+        self.model = model
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        # 数個の画像に対しては predict よりも呼び出しの手間が少ない
+        return np.asarray(self.model.predict_on_batch(features))
+
+
+class TFLiteBackend(InferenceBackend):
+    """TensorFlow Lite のインタープリタで推論する。
+
+    tflite_runtime がインストールされていればそれを使い、TensorFlow 全体は読み込まない。
+    入力と出力が整数に量子化されたモデルでは、量子化のパラメータで変換してから推論する。
+
+    Parameters:
+        model_path (str): export_tflite.py で書き出した .tflite のファイルのパス。
+        num_threads (Optional[int]): 推論に使うスレッドの数。None のときはインタープリタの既定値を使う。
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        num_threads: Optional[int] = None,
+    ) -> None:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+        self.interpreter = Interpreter(
+            model_path=model_path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        input_shape = self._input['shape']
+        features = np.asarray(features, dtype=np.float32).reshape(
+            (len(features), *input_shape[1:]))
+        if input_shape[0] != len(features):
+            # 個数が変わったときだけテンソルを確保し直す
+            self.interpreter.resize_tensor_input(
+                self._input['index'], features.shape)
+            self.interpreter.allocate_tensors()
+            self._input = self.interpreter.get_input_details()[0]
+            self._output = self.interpreter.get_output_details()[0]
+
+        self.interpreter.set_tensor(
+            self._input['index'], _quantize(features, self._input))
+        self.interpreter.invoke()
+        return _dequantize(
+            self.interpreter.get_tensor(self._output['index']), self._output)
+
+
+def _quantize(values: np.ndarray, details: dict) -> np.ndarray:
+    dtype = details['dtype']
+    if dtype == np.float32:
+        return values
+    scale, zero_point = details['quantization']
+    info = np.iinfo(dtype)
+    return np.clip(
+        np.round(values / scale + zero_point), info.min, info.max
+    ).astype(dtype)
+
+
+def _dequantize(values: np.ndarray, details: dict) -> np.ndarray:
+    if details['dtype'] == np.float32:
+        return values
+    scale, zero_point = details['quantization']
+    return (values.astype(np.float32) - zero_point) * scale
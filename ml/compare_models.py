@@ -0,0 +1,100 @@
+import os
+import tempfile
+from argparse import ArgumentParser
+from os.path import getsize, isdir, join
+from time import perf_counter
+import numpy as np
+import tensorflow as tf
+from model import compact_voice_judgment_model, neural_voice_judgment_model
+from sample_yomikomi import sample_all_data
+
+# 2 つのモデルのパラメータ数、ファイルサイズ、1 件あたりの CPU の推論時間、sample での正解率を比べる。
+#
+#     python compare_models.py
+#     python compare_models.py --baseline trained_model/seventh.tf \
+#         --compact trained_model/compact.tf
+
+INPUT_SHAPE = (None, 128, 128, 1)
+LATENCY_RUNS = 50
+
+
+def load_or_build(model_path, build):
+    # パスが指定されていなければ、学習していないモデルを作る
+    if model_path is None:
+        model = build()
+        model.build(INPUT_SHAPE)
+        return model
+    return tf.keras.models.load_model(model_path, compile=False)
+
+
+def disk_size(model_path, model):
+    if model_path is None:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            saved_path = join(temp_dir, "model.h5")
+            model.save(saved_path)
+            return getsize(saved_path)
+    if isdir(model_path):
+        return sum(
+            getsize(join(root, name))
+            for root, _dirs, names in os.walk(model_path)
+            for name in names
+        )
+    return getsize(model_path)
+
+
+def single_latency(model, image):
+    batch = image[np.newaxis]
+    # 初回の呼び出しにかかる時間は含めない
+    model.predict_on_batch(batch)
+    times = []
+    for _ in range(LATENCY_RUNS):
+        start = perf_counter()
+        model.predict_on_batch(batch)
+        times.append(perf_counter() - start)
+    return float(np.median(times))
+
+
+def top_k_accuracy(model, images, labels):
+    # 含まれている札の数だけ確率の高い札を選んだときに、正解の札だった割合
+    predictions = model.predict(images, verbose=0)
+    correct = 0
+    total = 0
+    for prediction, label in zip(predictions, labels):
+        k = int(label.sum())
+        picked = np.argsort(prediction)[::-1][:k]
+        correct += int(label[picked].sum())
+        total += k
+    return correct / total
+
+
+def main():
+    parser = ArgumentParser(description="2 つのモデルを比べる。")
+    parser.add_argument(
+        "--baseline", help="neural_voice_judgment_model の学習済みモデル")
+    parser.add_argument(
+        "--compact", help="compact_voice_judgment_model の学習済みモデル")
+    args = parser.parse_args()
+
+    pairs = sample_all_data()
+    images = np.array([image for image, _label in pairs])[..., np.newaxis]
+    labels = np.array([label for _image, label in pairs])
+
+    for name, model_path, build in [
+        ("baseline", args.baseline, neural_voice_judgment_model),
+        ("compact", args.compact, compact_voice_judgment_model),
+    ]:
+        model = load_or_build(model_path, build)
+        print(name)
+        print(f"  parameters: {model.count_params()}")
+        print(f"  disk size: {disk_size(model_path, model) / 1024:.1f} KiB")
+        latency = single_latency(model, images[0])
+        print(f"  single sample latency: {latency * 1000:.2f} ms")
+        if model_path is None:
+            print("  accuracy: - (not trained)")
+        else:
+            accuracy = top_k_accuracy(model, images, labels)
+            print(f"  top-k accuracy on sample: {accuracy:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,18 @@
-from shuffle_number import waveform_sample_data
+from shuffle_number import waveform_sample_batch
 import idx2numpy
 import numpy as np
 from os.path import join
 
+# まとめて前処理する音声波形の個数
+BATCH_SIZE = 100
+
 train_label_list = []
 train_image_list = []
-for train_data in range(5000):
-    train_image, train_label = waveform_sample_data()
-    train_label_list.append(np.array(train_label))
-    train_image_list.append(train_image)
+for train_data in range(0, 5000, BATCH_SIZE):
+    train_images, train_labels = waveform_sample_batch(
+        min(BATCH_SIZE, 5000 - train_data))
+    train_label_list += [np.array(label) for label in train_labels]
+    train_image_list += list(train_images)
 processing_train_label = np.array(train_label_list)
 processing_train_image = np.array(train_image_list)
 idx2numpy.convert_to_file(
@@ -18,10 +22,11 @@ idx2numpy.convert_to_file(
 
 test_label_list = []
 test_image_list = []
-for test_data in range(1000):
-    test_image, test_label = waveform_sample_data()
-    test_label_list.append(test_label)
-    test_image_list.append(test_image)
+for test_data in range(0, 1000, BATCH_SIZE):
+    test_images, test_labels = waveform_sample_batch(
+        min(BATCH_SIZE, 1000 - test_data))
+    test_label_list += test_labels
+    test_image_list += list(test_images)
 processing_test_label = np.array(test_label_list)
 processing_test_image = np.array(test_image_list)
 idx2numpy.convert_to_file(
@@ -31,10 +36,11 @@ idx2numpy.convert_to_file(
 
 validation_label_list = []
 validation_image_list = []
-for validation_data in range(1000):
-    validation_image, validation_label = waveform_sample_data()
-    validation_label_list.append(validation_label)
-    validation_image_list.append(validation_image)
+for validation_data in range(0, 1000, BATCH_SIZE):
+    validation_images, validation_labels = waveform_sample_batch(
+        min(BATCH_SIZE, 1000 - validation_data))
+    validation_label_list += validation_labels
+    validation_image_list += list(validation_images)
 processing_validation_label = np.array(validation_label_list)
 processing_validation_image = np.array(validation_image_list)
 idx2numpy.convert_to_file(
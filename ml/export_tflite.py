@@ -0,0 +1,75 @@
+import glob
+from argparse import ArgumentParser
+from os.path import join
+import numpy as np
+import tensorflow as tf
+from scipy.io.wavfile import read
+from maesyori import preprocess_batch
+
+# 学習済みモデルを TensorFlow Lite の形式に変換する。
+#
+#     python export_tflite.py trained_model/seventh.tf seventh.tflite
+#     python export_tflite.py trained_model/seventh.tf seventh_int8.tflite \
+#         --quantize int8
+
+
+def sample_images():
+    # 量子化の校正に使う、sample ディレクトリの断片データを前処理した画像
+    paths = sorted(glob.glob(join("..", "sample", "*", "problem*.wav")))
+    waveforms = [read(path)[1] for path in paths]
+    return preprocess_batch(waveforms)
+
+
+def representative_dataset(input_shape):
+    def generate():
+        for image in sample_images():
+            yield [image.reshape((1, *input_shape[1:]))]
+    return generate
+
+
+def export_tflite(model_path, output_path, quantize):
+    # compile しなければ、損失関数の focal_loss を custom_objects に渡す必要はない
+    model = tf.keras.models.load_model(model_path, compile=False)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if quantize in ("dynamic", "int8"):
+        # 重みを 8 ビットの整数にする
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantize == "int8":
+        # 活性化も sample のデータで値の範囲を校正して 8 ビットの整数にする
+        # 入力と出力は float32 のままにして、呼び出し側の変換を不要にする
+        converter.representative_dataset = representative_dataset(
+            model.inputs[0].shape)
+        converter.target_spec.supported_ops = [
+            tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    tflite_model = converter.convert()
+    with open(output_path, "wb") as f:
+        f.write(tflite_model)
+    print(f"wrote {len(tflite_model)} bytes to {output_path}")
+
+
+def compare(model_path, output_path):
+    # 変換前後のモデルで sample の予測を比べる
+    from backend import TFLiteBackend
+
+    model = tf.keras.models.load_model(model_path, compile=False)
+    images = sample_images()
+    expected = model.predict_on_batch(
+        images.reshape((len(images), *model.inputs[0].shape[1:])))
+    actual = TFLiteBackend(output_path).predict(images)
+    print(f"max abs difference: {np.abs(expected - actual).max():.6f}")
+
+
+def main():
+    parser = ArgumentParser(description="学習済みモデルを TFLite に変換する。")
+    parser.add_argument("model_path")
+    parser.add_argument("output_path")
+    parser.add_argument(
+        "--quantize", choices=["none", "dynamic", "int8"], default="none")
+    args = parser.parse_args()
+
+    export_tflite(args.model_path, args.output_path, args.quantize)
+    compare(args.model_path, args.output_path)
+
+
+if __name__ == "__main__":
+    main()
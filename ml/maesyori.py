@@ -1,12 +1,150 @@
-import cv2
+from functools import lru_cache
 import numpy as np
-import scipy
-from librosa import amplitude_to_db, feature, note_to_hz
+import scipy.fft
 
 sr = 48000
 
+# librosa.feature.melspectrogram の既定値に合わせた STFT とメルフィルタバンクの設定
+N_FFT = 2048
+N_MELS = 128
+HOP_LENGTH = int(sr * 10e-3)
+# int(sr / librosa.note_to_hz('C3')) と同じ値
+WIN_LENGTH = int(sr / (440.0 * 2.0 ** ((48 - 69) / 12)))
+IMAGE_SIZE = 128
+
+# プリエンファシスフィルタの係数
+PRE_EMPHASIS = 0.97
+# librosa.amplitude_to_db の既定値
+AMIN = 1e-5
+TOP_DB = 80.0
+
+
+def _hz_to_mel(frequencies: np.ndarray) -> np.ndarray:
+    # librosa.hz_to_mel の Slaney 式
+    f_sp = 200.0 / 3
+    mels = frequencies / f_sp
+    min_log_hz = 1000.0
+    min_log_mel = min_log_hz / f_sp
+    logstep = np.log(6.4) / 27.0
+    return np.where(
+        frequencies >= min_log_hz,
+        min_log_mel + np.log(np.maximum(frequencies, min_log_hz)
+                             / min_log_hz) / logstep,
+        mels,
+    )
+
+
+def _mel_to_hz(mels: np.ndarray) -> np.ndarray:
+    # librosa.mel_to_hz の Slaney 式
+    f_sp = 200.0 / 3
+    freqs = f_sp * mels
+    min_log_hz = 1000.0
+    min_log_mel = min_log_hz / f_sp
+    logstep = np.log(6.4) / 27.0
+    return np.where(
+        mels >= min_log_mel,
+        min_log_hz * np.exp(logstep * (mels - min_log_mel)),
+        freqs,
+    )
+
+
+def _mel_basis() -> np.ndarray:
+    # librosa.filters.mel(sr=sr, n_fft=N_FFT) と同じ Slaney 正規化のフィルタバンク
+    fft_freqs = np.linspace(0, sr / 2, 1 + N_FFT // 2)
+    mel_f = _mel_to_hz(np.linspace(
+        _hz_to_mel(np.float64(0.0)), _hz_to_mel(np.float64(sr / 2)),
+        N_MELS + 2,
+    ))
+    fdiff = np.diff(mel_f)
+    ramps = np.subtract.outer(mel_f, fft_freqs)
+    lower = -ramps[:-2] / fdiff[:-1, np.newaxis]
+    upper = ramps[2:] / fdiff[1:, np.newaxis]
+    weights = np.maximum(0, np.minimum(lower, upper))
+    enorm = 2.0 / (mel_f[2:N_MELS + 2] - mel_f[:N_MELS])
+    return (weights * enorm[:, np.newaxis]).astype(np.float32)
+
+
+# 呼び出しごとに作り直さないように、メルフィルタバンクと窓関数は一度だけ計算する
+MEL_BASIS = _mel_basis()
+# scipy.signal.get_window('hann', WIN_LENGTH) と同じ周期的なハン窓
+WINDOW = (0.5 - 0.5 * np.cos(
+    2 * np.pi * np.arange(WIN_LENGTH) / WIN_LENGTH)).astype(np.float32)
+# N_FFT の長さのフレームのうち、窓関数が 0 でない区間の開始位置
+WINDOW_OFFSET = (N_FFT - WIN_LENGTH) // 2
+
+
+@lru_cache(maxsize=None)
+def _resize_matrix(frames: int) -> np.ndarray:
+    # cv2.resize の INTER_LINEAR で時間方向を IMAGE_SIZE に伸縮する重み
+    scale = frames / IMAGE_SIZE
+    matrix = np.zeros((frames, IMAGE_SIZE), dtype=np.float32)
+    for x in range(IMAGE_SIZE):
+        fx = (x + 0.5) * scale - 0.5
+        sx = int(np.floor(fx))
+        fx -= sx
+        if sx < 0:
+            fx, sx = 0.0, 0
+        if frames - 1 <= sx:
+            fx, sx = 0.0, frames - 1
+        matrix[sx, x] += 1.0 - fx
+        if fx:
+            matrix[sx + 1, x] += fx
+    return matrix
+
+
+def mel_spectrogram_batch(waveforms: list[np.ndarray]) -> list[np.ndarray]:
+    # 長さの違う音声波形をまとめて float32 でメルスペクトログラムにする
+    lengths = [len(waveform) for waveform in waveforms]
+    if not lengths:
+        return []
+    padded = np.zeros(
+        (len(waveforms), max(lengths) + N_FFT), dtype=np.float32)
+    for row, waveform in enumerate(waveforms):
+        # プリエンファシスフィルタ: y(t) = x(t) - p x(t - 1)
+        samples = np.asarray(waveform, dtype=np.float32)
+        body = padded[row, N_FFT // 2:N_FFT // 2 + len(samples)]
+        body[:] = samples
+        body[1:] -= PRE_EMPHASIS * samples[:-1]
+
+    # 窓関数の外側は 0 なので、窓関数がかかる区間だけを切り出して FFT する
+    windows = np.lib.stride_tricks.sliding_window_view(
+        padded[:, WINDOW_OFFSET:], WIN_LENGTH, axis=1)[:, ::HOP_LENGTH]
+    frames = max(lengths) // HOP_LENGTH + 1
+    spectrum = scipy.fft.rfft(
+        windows[:, :frames] * WINDOW, n=N_FFT, axis=-1, workers=-1)
+    power = spectrum.real ** 2 + spectrum.imag ** 2
+    mel = np.matmul(MEL_BASIS, power.transpose(0, 2, 1))
+    return [
+        mel[row, :, :length // HOP_LENGTH + 1]
+        for row, length in enumerate(lengths)
+    ]
+
+
+def preprocess_batch(waveforms: list[np.ndarray]) -> np.ndarray:
+    # 音声波形のリストを、正規化した (個数, 128, 128) の float32 の画像の配列にする
+    images = np.empty(
+        (len(waveforms), N_MELS, IMAGE_SIZE), dtype=np.float32)
+    for row, mel in enumerate(mel_spectrogram_batch(waveforms)):
+        images[row] = mel @ _resize_matrix(mel.shape[1])
+
+    db = 20.0 * np.log10(np.maximum(AMIN, images))
+    db = np.maximum(db, db.max(axis=(1, 2), keepdims=True) - TOP_DB)
+    min_value = db.min(axis=(1, 2), keepdims=True)
+    max_value = db.max(axis=(1, 2), keepdims=True)
+    # 無音のときは 0 除算にならないように全て 0 にする
+    value_range = np.where(max_value == min_value, 1.0, max_value - min_value)
+    return ((db - min_value) / value_range).astype(np.float32)
+
 
 def preprocess_input(onsei_data: np.ndarray) -> np.ndarray:
+    return preprocess_batch([onsei_data])[0]
+
+
+def preprocess_input_librosa(onsei_data: np.ndarray) -> np.ndarray:
+    # preprocess_batch と比較するための、librosa と OpenCV による 1 つずつの前処理
+    import cv2
+    import scipy.signal
+    from librosa import amplitude_to_db, feature, note_to_hz
 
     # プリエンファシスフィルタ:
     # y(t) = x(t) - p x(t - 1)
@@ -1,7 +1,9 @@
 from keras.models import Sequential
 from keras.layers import Dense, Conv2D, MaxPooling2D, Flatten, \
-    BatchNormalization
+    BatchNormalization, Dropout, GlobalAveragePooling2D, SeparableConv2D
 from keras.regularizers import L2
+from maesyori import MEL_BASIS, WINDOW
+from tf_preprocess import with_waveform_preprocessing
 
 
 def neural_voice_judgment_model():
@@ -24,3 +26,32 @@ def neural_voice_judgment_model():
     model.add(Dense(44, activation='sigmoid'))
 
     return model
+
+
+def compact_voice_judgment_model():
+    # 全結合層の代わりに大域平均プーリングを使い、畳み込みも深さ方向に分離して軽くしたモデル
+    model = Sequential()
+
+    model.add(Conv2D(16, (3, 3), strides=(2, 2), activation='relu'))
+    model.add(BatchNormalization())
+    model.add(SeparableConv2D(32, (3, 3), activation='relu', padding='same'))
+    model.add(MaxPooling2D(pool_size=(2, 2)))
+    model.add(BatchNormalization())
+    model.add(SeparableConv2D(64, (3, 3), activation='relu', padding='same'))
+    model.add(MaxPooling2D(pool_size=(2, 2)))
+    model.add(BatchNormalization())
+    model.add(SeparableConv2D(128, (3, 3), activation='relu', padding='same'))
+    model.add(MaxPooling2D(pool_size=(2, 2)))
+    model.add(BatchNormalization())
+    model.add(SeparableConv2D(256, (3, 3), activation='relu', padding='same'))
+    model.add(GlobalAveragePooling2D())
+    model.add(Dropout(0.3))
+    model.add(Dense(44, activation='sigmoid'))
+
+    return model
+
+
+def neural_voice_judgment_waveform_model():
+    # 音声波形を直接入力して、前処理もグラフの中で行うモデル
+    return with_waveform_preprocessing(
+        neural_voice_judgment_model(), MEL_BASIS, WINDOW)
@@ -2,7 +2,7 @@ import yaml
 import os
 import tensorflow as tf
 from itertools import product
-from maesyori import preprocess_input
+from maesyori import preprocess_batch
 from os.path import join
 from scipy.io.wavfile import read
 try:
@@ -18,14 +18,15 @@ def sample_data(question_sub_dir):
         seikai_parsed_split = parsed["speech"].split(",")
         nsplit = parsed["nsplit"]
 
-    bunkatu_list = []
+    bunkatu_onsei_list = []
 
     for sample in range(1, nsplit+1):
         sample_bunkatu = join("..", "sample", question_sub_dir,
                               f"problem{sample}.wav")
         _rate, bunkatu_onsei = read(sample_bunkatu)
-        bunkatu_graph = preprocess_input(bunkatu_onsei)
-        bunkatu_list.append(bunkatu_graph)
+        bunkatu_onsei_list.append(bunkatu_onsei)
+
+    bunkatu_list = list(preprocess_batch(bunkatu_onsei_list))
 
     seikai_list = []
 
@@ -2,10 +2,10 @@ import random
 from os.path import join
 from scipy.io.wavfile import read
 import numpy as np
-from maesyori import preprocess_input
+from maesyori import preprocess_batch
 
 
-def waveform_sample_data():
+def mixed_waveform():
     list_number = list(range(1, 44+1))
     shuffle_list = random.sample(list_number, k=random.randint(3, 5))
     yomidata_list = []
@@ -32,10 +32,28 @@ def waveform_sample_data():
         sliced = np.resize(
             waveform_data[cut:cut + sample_length], sample_length)
         test_sample += sliced
-    neural_input_data = preprocess_input(test_sample)
 
     neural_output = [0.0]*44
     for use_number in shuffle_list:
         neural_output[use_number-1] = 1.0
 
-    return (neural_input_data, neural_output)
+    return (test_sample, neural_output)
+
+
+def waveform_sample_batch(batch_size):
+    # 混ぜた音声波形をまとめて前処理する
+    waveforms = []
+    neural_outputs = []
+    for _ in range(batch_size):
+        test_sample, neural_output = mixed_waveform()
+        waveforms.append(test_sample)
+        neural_outputs.append(neural_output)
+    neural_input_data = preprocess_batch(waveforms)
+
+    return (neural_input_data, neural_outputs)
+
+
+def waveform_sample_data():
+    neural_input_data, neural_outputs = waveform_sample_batch(1)
+
+    return (neural_input_data[0], neural_outputs[0])
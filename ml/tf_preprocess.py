@@ -0,0 +1,170 @@
+import numpy as np
+import tensorflow as tf
+
+# maesyori.preprocess_batch と同じ設定
+SR = 48000
+N_FFT = 2048
+HOP_LENGTH = int(SR * 10e-3)
+IMAGE_SIZE = 128
+PRE_EMPHASIS = 0.97
+AMIN = 1e-5
+TOP_DB = 80.0
+
+
+class PreEmphasis(tf.keras.layers.Layer):
+    # プリエンファシスフィルタ: y(t) = x(t) - p x(t - 1)
+
+    def __init__(self, coefficient=PRE_EMPHASIS, **kwargs):
+        super().__init__(**kwargs)
+        self.coefficient = coefficient
+
+    def call(self, waveforms):
+        waveforms = tf.cast(waveforms, tf.float32)
+        return tf.concat([
+            waveforms[:, :1],
+            waveforms[:, 1:] - self.coefficient * waveforms[:, :-1],
+        ], axis=1)
+
+    def get_config(self):
+        config = super().get_config()
+        config.update({'coefficient': self.coefficient})
+        return config
+
+
+class MelSpectrogram(tf.keras.layers.Layer):
+    # librosa.feature.melspectrogram と同じく、両端を 0 で埋めた STFT のパワーにメルフィルタバンクをかける
+    # 1 回の呼び出しに含める音声波形は全て同じ長さにすること
+
+    def __init__(self, mel_basis, window, hop_length=HOP_LENGTH,
+                 n_fft=N_FFT, **kwargs):
+        super().__init__(**kwargs)
+        self.mel_basis = np.asarray(mel_basis, dtype=np.float32)
+        self.window = np.asarray(window, dtype=np.float32)
+        self.hop_length = hop_length
+        self.n_fft = n_fft
+
+    def call(self, waveforms):
+        length = tf.shape(waveforms)[1]
+        padded = tf.pad(waveforms, [[0, 0], [self.n_fft // 2] * 2])
+        # 窓関数の外側は 0 なので、窓関数がかかる区間だけを切り出して FFT する
+        offset = (self.n_fft - len(self.window)) // 2
+        frames = tf.signal.frame(
+            padded[:, offset:], len(self.window), self.hop_length)
+        frames = frames[:, :length // self.hop_length + 1] * self.window
+        spectrum = tf.signal.rfft(frames, fft_length=[self.n_fft])
+        power = tf.math.real(spectrum) ** 2 + tf.math.imag(spectrum) ** 2
+        # (個数, メル, フレーム) の向きにする
+        return tf.linalg.matmul(
+            self.mel_basis, power, transpose_b=True)
+
+    def get_config(self):
+        config = super().get_config()
+        config.update({
+            'mel_basis': self.mel_basis.tolist(),
+            'window': self.window.tolist(),
+            'hop_length': self.hop_length,
+            'n_fft': self.n_fft,
+        })
+        return config
+
+
+class ResizeFrames(tf.keras.layers.Layer):
+    # cv2.resize の INTER_LINEAR と同じく、画素の中心を合わせた双線形補間で伸縮する
+
+    def __init__(self, size=IMAGE_SIZE, **kwargs):
+        super().__init__(**kwargs)
+        self.size = size
+
+    def call(self, mel):
+        images = tf.image.resize(
+            mel[..., tf.newaxis], [tf.shape(mel)[1], self.size],
+            method='bilinear')
+        return images
+
+    def get_config(self):
+        config = super().get_config()
+        config.update({'size': self.size})
+        return config
+
+
+class AmplitudeToDecibel(tf.keras.layers.Layer):
+    # librosa.amplitude_to_db と同じく、最大値から top_db 下までに切り詰めたデシベルにする
+
+    def __init__(self, amin=AMIN, top_db=TOP_DB, **kwargs):
+        super().__init__(**kwargs)
+        self.amin = amin
+        self.top_db = top_db
+
+    def call(self, images):
+        db = 20.0 * tf.math.log(tf.maximum(self.amin, images)) \
+            / tf.math.log(10.0)
+        peak = tf.reduce_max(db, axis=[1, 2, 3], keepdims=True)
+        return tf.maximum(db, peak - self.top_db)
+
+    def get_config(self):
+        config = super().get_config()
+        config.update({'amin': self.amin, 'top_db': self.top_db})
+        return config
+
+
+class MinMaxNormalization(tf.keras.layers.Layer):
+    # 画像ごとに最小値が 0、最大値が 1 になるように正規化する
+
+    def call(self, images):
+        min_value = tf.reduce_min(images, axis=[1, 2, 3], keepdims=True)
+        max_value = tf.reduce_max(images, axis=[1, 2, 3], keepdims=True)
+        value_range = max_value - min_value
+        # 無音のときは 0 除算にならないように全て 0 にする
+        return tf.math.divide_no_nan(images - min_value, value_range)
+
+
+CUSTOM_OBJECTS = {
+    'PreEmphasis': PreEmphasis,
+    'MelSpectrogram': MelSpectrogram,
+    'ResizeFrames': ResizeFrames,
+    'AmplitudeToDecibel': AmplitudeToDecibel,
+    'MinMaxNormalization': MinMaxNormalization,
+}
+
+
+def waveform_preprocessing(mel_basis, window):
+    # 音声波形の (個数, サンプル数) の配列を、正規化した (個数, 128, 128, 1) の画像にする
+    # mel_basis と window には maesyori.MEL_BASIS と maesyori.WINDOW を渡す
+    return tf.keras.Sequential([
+        PreEmphasis(),
+        MelSpectrogram(mel_basis, window),
+        ResizeFrames(),
+        AmplitudeToDecibel(),
+        MinMaxNormalization(),
+    ], name='waveform_preprocessing')
+
+
+def with_waveform_preprocessing(model, mel_basis, window):
+    # 画像を入力とするモデルの前に前処理の層を付け、音声波形を直接入力できるようにする
+    return tf.keras.Sequential([
+        tf.keras.Input(shape=(None,)),
+        waveform_preprocessing(mel_basis, window),
+        model,
+    ])
+
+
+def preprocess_dataset(dataset, mel_basis, window, batch_size=200):
+    # (音声波形, ラベル) の tf.data.Dataset を、前処理した (画像, ラベル) のバッチにする
+    preprocessing = waveform_preprocessing(mel_basis, window)
+    return dataset.batch(batch_size).map(
+        lambda waveforms, labels: (preprocessing(waveforms), labels),
+        num_parallel_calls=tf.data.AUTOTUNE,
+    ).prefetch(tf.data.AUTOTUNE)
+
+
+def predict_waveforms(model, waveforms):
+    # 長さが同じ音声波形ごとにまとめて、前処理と推論を 1 回のグラフの呼び出しで行う
+    rows_by_length = {}
+    for row, waveform in enumerate(waveforms):
+        rows_by_length.setdefault(len(waveform), []).append(row)
+    predictions = [None] * len(waveforms)
+    for rows in rows_by_length.values():
+        batch = np.array([waveforms[row] for row in rows])
+        for row, prediction in zip(rows, model.predict_on_batch(batch)):
+            predictions[row] = prediction
+    return np.array(predictions)
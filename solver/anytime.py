@@ -0,0 +1,92 @@
+from dataclasses import dataclass
+from solver.card import CardIndex, ShouldPickCardsByProblem
+from solver.pick_ways import SearchInterrupted, assign_by_min_cost_flow, \
+    calc_min_probability, calc_pick_probabilities, \
+    calc_threshold_candidates, convert_to_pick_indexes, search_pick_indexes
+from time import monotonic
+from typing import Optional
+import numpy as np
+
+
+@dataclass(frozen=True)
+class AnytimeSolution:
+    """
+    期限付きの探索で見つかった取り方。
+
+    Attributes:
+        ways (list[list[CardIndex]]): 各問題ごとに取る札の種類を格納したリスト。
+        threshold (float): 選んだ札の試合全体を通した確率の最小値。
+        optimal (bool): 期限までに探索し終えて、threshold が最大であると確かめられたかどうか。
+    """
+    ways: list[list[CardIndex]]
+    threshold: float
+    optimal: bool
+
+
+def solve_anytime(
+    problems: int,
+    should_pick_sets: ShouldPickCardsByProblem,
+    deadline: float,
+) -> Optional[AnytimeSolution]:
+    """
+    期限までに見つかった中で最も良い取り方を返す。
+
+    まず最小費用流で多項式時間のうちに完全な取り方を 1 つ求め、そこからしきい値の候補を
+    二分探索して取り方を改善していく。期限を過ぎると探索を打ち切り、それまでで最も
+    しきい値の高い取り方を返す。
+
+    引数:
+        - problems: この試合の問題数。
+        - should_pick_sets: 各問題データごとに、その札が含まれている確率のデータ。
+        - deadline: 探索を打ち切る時刻。time.monotonic() と同じ基準の秒数。
+
+    戻り値:
+        見つかった取り方。取る札が存在しない場合は None を返す。
+    """
+
+    pick_probabilities = calc_pick_probabilities(should_pick_sets)
+    picks = should_pick_sets.picks_array()
+
+    best = assign_by_min_cost_flow(problems, pick_probabilities, picks)
+    if best is None:
+        return None
+    best_threshold = calc_min_probability(pick_probabilities, best)
+
+    def solution(optimal: bool) -> AnytimeSolution:
+        return AnytimeSolution(
+            ways=[
+                [CardIndex.of(column + 1) for column in columns]
+                for columns in best
+            ],
+            threshold=best_threshold,
+            optimal=optimal,
+        )
+
+    def interrupted() -> bool:
+        return deadline <= monotonic()
+
+    thresholds, end = calc_threshold_candidates(pick_probabilities, picks)
+    # 最小費用流の取り方は、その最小値未満のしきい値であれば満たされる
+    start = int(np.searchsorted(thresholds, best_threshold, side='left')) - 1
+    start = max(start, 0)
+    while 1 < end - start:
+        if interrupted():
+            return solution(False)
+        mid = (end - start) // 2 + start
+        pick_indexes = convert_to_pick_indexes(
+            pick_probabilities, picks, float(thresholds[mid])
+        )
+        try:
+            ways = None if pick_indexes is None else search_pick_indexes(
+                problems, pick_indexes, picks, interrupted=interrupted,
+            )
+        except SearchInterrupted:
+            return solution(False)
+        if ways is None:
+            end = mid
+        else:
+            best = ways
+            best_threshold = calc_min_probability(pick_probabilities, ways)
+            start = max(mid, int(np.searchsorted(
+                thresholds, best_threshold, side='left')) - 1)
+    return solution(True)
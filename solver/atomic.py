@@ -0,0 +1,40 @@
+from contextlib import contextmanager, suppress
+import os
+from os.path import basename, dirname
+from tempfile import mkstemp
+from typing import IO, Any, Iterator
+
+
+@contextmanager
+def replacing(path: str, mode: str = 'w') -> Iterator[IO[Any]]:
+    """
+    with 文の中で書き込んだ内容で、抜けるときに path を置き換えるファイルを開く。
+
+    同じディレクトリの一時ファイルに書き込んでから置き換えるので、途中で異常終了しても
+    path には書き込む前か後のどちらかの内容が完全に残る。
+
+    引数:
+        - path: 置き換えるファイルのパス。
+        - mode: 一時ファイルを開くモード。'w' か 'wb' のどちらか。
+    """
+    fd, temp_path = mkstemp(
+        dir=dirname(path) or '.', prefix=f'{basename(path)}.', suffix='.tmp')
+    try:
+        encoding = None if 'b' in mode else 'utf-8'
+        with os.fdopen(fd, mode, encoding=encoding) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        with suppress(FileNotFoundError):
+            os.remove(temp_path)
+        raise
+
+
+def write_atomically(path: str, text: str) -> None:
+    """
+    text を path に書き込む。途中で異常終了しても path が壊れないように、replacing で置き換える。
+    """
+    with replacing(path) as f:
+        f.write(text)
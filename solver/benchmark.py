@@ -0,0 +1,253 @@
+# 取り方を求めるソルバーの実行時間、最大メモリ使用量、探索の呼び出し回数を計測する。
+#
+#     python -m solver.benchmark
+#     python -m solver.benchmark --json --problems 1 5 --solvers min_cost_flow
+from argparse import ArgumentParser
+from dataclasses import asdict, dataclass
+from itertools import product
+import json
+from time import monotonic, perf_counter
+import tracemalloc
+from typing import Final, Iterator, Optional
+from unittest.mock import patch
+
+import numpy as np
+
+from solver import anytime, incremental, parallel, pick_ways
+from solver.card import CARDS, CardIndex, ShouldPickCardsByProblem
+from solver.factory import SOLVER_FACTORIES, create_solver
+from solver.table import format_table
+
+DEFAULT_PROBLEMS: Final = [1, 2, 5, 8, 11, 14, 20, 40]
+DEFAULT_PICKS: Final = [3, 4, 5]
+DEFAULT_SHARPNESS: Final = [1.0, 4.0]
+# anytime ソルバーが探索を打ち切るまでの秒数
+DEADLINE_SECONDS: Final = 60.0
+
+
+def generate_match(
+    seed: int,
+    problems: int,
+    picks: int,
+    sharpness: float,
+    adversarial: bool = False,
+) -> ShouldPickCardsByProblem:
+    """
+    乱数で試合全体の確率のデータを作る。
+
+    引数:
+        - seed: 乱数のシード値。同じ引数からは同じデータが作られる。
+        - problems: 問題数。
+        - picks: 各問題の取るべき個数。
+        - sharpness: 含まれている札とそうでない札の確率の差の大きさ。大きいほど確率が 0 か 1 に近づく。
+        - adversarial: True のとき、全ての札の確率をほぼ同じ値にして探索の後戻りを起こしやすくする。
+
+    戻り値:
+        各問題に picks 枚の正解の札を含むデータ。正解の札は札が足りる限り問題の間で重複しない。
+    """
+    rng = np.random.default_rng(seed)
+    should = ShouldPickCardsByProblem()
+    deck = rng.permutation(CARDS)
+    for problem in range(problems):
+        if (problem + 1) * picks <= CARDS:
+            answers = deck[problem * picks:(problem + 1) * picks]
+        else:
+            answers = rng.choice(CARDS, picks, replace=False)
+        if adversarial:
+            probabilities = 0.5 + rng.uniform(-1e-3, 1e-3, CARDS)
+        else:
+            logits = rng.normal(-sharpness, 1.0, CARDS)
+            logits[answers] = rng.normal(sharpness, 1.0, picks)
+            probabilities = 1.0 / (1.0 + np.exp(-logits))
+        should.insert_all(str(problem), probabilities)
+        should.set_picks_on(str(problem), picks)
+    return should
+
+
+@dataclass(frozen=True)
+class BenchmarkResult:
+    solver: str
+    problems: int
+    picks: int
+    sharpness: float
+    adversarial: bool
+    found: bool
+    threshold: Optional[float]
+    seconds: float
+    peak_bytes: int
+    searches: int
+    solves: int
+
+
+def _solve(
+    solver: str,
+    problems: int,
+    should: ShouldPickCardsByProblem,
+) -> Optional[tuple[list[list[CardIndex]], float]]:
+    solvers = create_solver(solver)
+    try:
+        return solvers.for_deadline(monotonic() + DEADLINE_SECONDS)(
+            problems, should)
+    finally:
+        solvers.close()
+
+
+class _CallCounter:
+    """
+    探索の関数を呼び出し回数を数える関数に差し替える。
+    """
+
+    def __init__(self) -> None:
+        self.searches = 0
+        self.solves = 0
+
+    def __enter__(self) -> "_CallCounter":
+        search = pick_ways.search_pick_indexes
+        solve = pick_ways.solve
+
+        def counted_search(*args, **kwargs):
+            self.searches += 1
+            return search(*args, **kwargs)
+
+        def counted_solve(*args, **kwargs):
+            self.solves += 1
+            return solve(*args, **kwargs)
+
+        self._patches = [
+            patch.object(module, 'search_pick_indexes', counted_search)
+            for module in [pick_ways, anytime, incremental, parallel]
+        ] + [patch.object(pick_ways, 'solve', counted_solve)]
+        for p in self._patches:
+            p.start()
+        return self
+
+    def __exit__(self, *_args) -> None:
+        for p in reversed(self._patches):
+            p.stop()
+
+
+def run_case(
+    solver: str,
+    should: ShouldPickCardsByProblem,
+    problems: int,
+    picks: int,
+    sharpness: float,
+    adversarial: bool,
+) -> BenchmarkResult:
+    """
+    1 つのデータに対して 1 つのソルバーを実行して計測する。
+
+    実行時間は tracemalloc を止めた状態で、メモリ使用量は別にもう一度実行して計測する。
+    """
+    with _CallCounter() as counter:
+        start = perf_counter()
+        solution = _solve(solver, problems, should)
+        seconds = perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        _solve(solver, problems, should)
+        _current, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return BenchmarkResult(
+        solver=solver,
+        problems=problems,
+        picks=picks,
+        sharpness=sharpness,
+        adversarial=adversarial,
+        found=solution is not None,
+        threshold=None if solution is None else solution[1],
+        seconds=seconds,
+        peak_bytes=peak_bytes,
+        searches=counter.searches,
+        solves=counter.solves,
+    )
+
+
+def run_benchmark(
+    solvers: list[str],
+    problems_list: list[int],
+    picks_list: list[int],
+    sharpness_list: list[float],
+    seed: int = 0,
+    adversarial: bool = True,
+) -> Iterator[BenchmarkResult]:
+    """
+    問題数、取るべき個数、確率の鋭さの全ての組み合わせについて、各ソルバーを計測する。
+    """
+    cases = [
+        (problems, picks, sharpness, False)
+        for problems, picks, sharpness
+        in product(problems_list, picks_list, sharpness_list)
+    ]
+    if adversarial:
+        cases += [
+            (problems, picks, 0.0, True)
+            for problems, picks in product(problems_list, picks_list)
+        ]
+    for case_seed, (problems, picks, sharpness, is_adversarial) \
+            in enumerate(cases, start=seed):
+        should = generate_match(
+            case_seed, problems, picks, sharpness, is_adversarial)
+        for solver in solvers:
+            yield run_case(
+                solver, should, problems, picks, sharpness, is_adversarial)
+
+
+def format_results(results: list[BenchmarkResult]) -> str:
+    header = [
+        'solver', 'problems', 'picks', 'sharpness', 'adversarial',
+        'found', 'threshold', 'seconds', 'peak_kib', 'searches', 'solves',
+    ]
+    rows = [
+        [
+            r.solver, str(r.problems), str(r.picks), f'{r.sharpness:g}',
+            str(r.adversarial), str(r.found),
+            '-' if r.threshold is None else f'{r.threshold:.6g}',
+            f'{r.seconds:.4f}', f'{r.peak_bytes / 1024:.1f}',
+            str(r.searches), str(r.solves),
+        ]
+        for r in results
+    ]
+    return format_table(header, rows)
+
+
+def main() -> None:
+    parser = ArgumentParser(description='ソルバーのベンチマークを実行する。')
+    parser.add_argument(
+        '--solvers', nargs='+', choices=list(SOLVER_FACTORIES),
+        default=[name for name in SOLVER_FACTORIES if name != 'parallel'],
+    )
+    parser.add_argument(
+        '--problems', nargs='+', type=int, default=DEFAULT_PROBLEMS)
+    parser.add_argument('--picks', nargs='+', type=int, default=DEFAULT_PICKS)
+    parser.add_argument(
+        '--sharpness', nargs='+', type=float, default=DEFAULT_SHARPNESS)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument(
+        '--no-adversarial', dest='adversarial', action='store_false')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    results = []
+    for result in run_benchmark(
+        args.solvers, args.problems, args.picks, args.sharpness,
+        seed=args.seed, adversarial=args.adversarial,
+    ):
+        results.append(result)
+        if not args.json:
+            print(
+                f'{result.solver} problems={result.problems} '
+                f'picks={result.picks}: {result.seconds:.4f}s',
+                flush=True,
+            )
+    if args.json:
+        print(json.dumps([asdict(r) for r in results], indent=2))
+    else:
+        print(format_results(results))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,23 +1,36 @@
 from dataclasses import dataclass
+import struct
 from typing import Any, Final, Iterable
+from zipfile import ZIP_STORED, ZipFile
+import numpy as np
+from numpy.typing import ArrayLike
 import yaml
+
+from solver.atomic import replacing, write_atomically
+
 try:
     from yaml import CLoader as Loader, CDumper as Dumper
 except ImportError:
     from yaml import Loader, Dumper
 
 KANA: Final = "あいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわ"
+CARDS: Final = len(KANA)
+INITIAL_ROWS: Final = 16
 
 
 @dataclass(frozen=True, order=True)
 class CardIndex:
     """
     読み札と取り札において札の種類を表す 1 以上 44 以下の整数。
+
+    44 種類のインスタンスは事前に作った表で共有されるので、新しく作る代わりに
+    CardIndex.of や CardIndex.all などで表から取り出して使う。
     """
+    __slots__ = ('_index',)
     _index: int
 
     def __post_init__(self) -> None:
-        if not (1 <= self._index <= 44):
+        if not (1 <= self._index <= CARDS):
             raise ValueError("index must be between 1 and 44")
 
     def __hash__(self) -> int:
@@ -26,16 +39,39 @@ class CardIndex:
     def __str__(self) -> str:
         return KANA[self._index - 1]
 
+    def __reduce__(self) -> Any:
+        return (CardIndex.of, (self._index,))
+
     def as_0_pad(self) -> str:
-        return f'{self._index:02}'
+        return _ZERO_PADDED[self._index - 1]
+
+    @staticmethod
+    def of(index: int) -> "CardIndex":
+        """
+        1 以上 44 以下の整数に対応する、表の CardIndex を返す。
+        """
+        if not (1 <= index <= CARDS):
+            raise ValueError("index must be between 1 and 44")
+        return _CARD_INDEXES[index - 1]
+
+    @staticmethod
+    def from_0_pad(padded: str) -> "CardIndex":
+        return CardIndex.of(int(padded))
 
     @staticmethod
     def from_kana(kana: str) -> "CardIndex":
-        return CardIndex(KANA.find(kana) + 1)
+        if kana not in _KANA_INDEXES:
+            raise ValueError("kana must be one of KANA")
+        return _KANA_INDEXES[kana]
 
     @staticmethod
     def all() -> Iterable["CardIndex"]:
-        return map(lambda c: CardIndex(c + 1), range(44))
+        return _CARD_INDEXES
+
+
+_CARD_INDEXES: Final = tuple(CardIndex(c + 1) for c in range(CARDS))
+_KANA_INDEXES: Final = dict(zip(KANA, _CARD_INDEXES))
+_ZERO_PADDED: Final = tuple(f'{c + 1:02}' for c in range(CARDS))
 
 
 @dataclass(frozen=True)
@@ -95,7 +131,7 @@ class ShouldPickCards:
     @staticmethod
     def from_plain(plain: dict[str, Any]) -> "ShouldPickCards":
         probabilities = {
-            CardIndex(k): v for k, v in plain["probabilities"].items()
+            CardIndex.of(k): v for k, v in plain["probabilities"].items()
         }
         return ShouldPickCards(
             probabilities=probabilities,
@@ -107,41 +143,101 @@ class ShouldPickCards:
 class ShouldPickCardsByProblem:
     """
     各問題データごとに、その札が含まれている確率と取るべき個数を管理する。
+
+    確率は試合全体で 1 つの (問題数, 44) の連続した配列に保持され、問題ごとの行は
+    その配列のビューとして取り出せる。列 c は CardIndex(c + 1) に対応する。
     """
-    _should: dict[str, ShouldPickCards]
+    _probabilities: np.ndarray
+    _inserted: np.ndarray
+    _picks: list[int]
     _problems: list[str]
+    _rows: dict[str, int]
 
     def __init__(self) -> None:
-        self._should = dict()
+        self._probabilities = np.zeros((INITIAL_ROWS, CARDS), dtype=np.float64)
+        self._inserted = np.zeros((INITIAL_ROWS, CARDS), dtype=np.bool_)
+        self._picks = []
         self._problems = []
+        self._rows = dict()
 
     def save_yaml(self, path: str) -> None:
-        mapped = {k: v.plain() for k, v in self._should.items()}
-        output = yaml.dump(mapped, Dumper=Dumper)
-        with open(path, 'w') as f:
-            f.truncate()
-            f.write(output)
+        mapped = {
+            problem: self.should_pick_cards_on(problem).plain()
+            for problem in self._problems
+        }
+        # 読み込んだときに問題の追加順を復元できるように、キーを並べ替えない
+        output = yaml.dump(mapped, Dumper=Dumper, sort_keys=False)
+        write_atomically(path, output)
+
+    def save_npz(self, path: str) -> None:
+        """
+        問題の追加順、取るべき個数、確率の行列を無圧縮の .npz に保存する。
+
+        should_pick_cards_from_npz で確率の行列をメモリマップして読み込めるように、
+        各配列は圧縮せずにそのまま格納する。
+        """
+        rows = len(self._problems)
+        with replacing(path, 'wb') as f:
+            np.savez(
+                f,
+                problems=np.array(self._problems, dtype=np.str_),
+                picks=self.picks_array(),
+                probabilities=self._probabilities[:rows],
+                inserted=self._inserted[:rows],
+            )
+
+    def _row_of(self, problem: str) -> int:
+        if problem in self._rows:
+            return self._rows[problem]
+        row = len(self._problems)
+        if self._probabilities.shape[0] <= row:
+            capacity = max(self._probabilities.shape[0] * 2, INITIAL_ROWS)
+            probabilities = np.zeros((capacity, CARDS), dtype=np.float64)
+            probabilities[:row] = self._probabilities[:row]
+            inserted = np.zeros((capacity, CARDS), dtype=np.bool_)
+            inserted[:row] = self._inserted[:row]
+            self._probabilities = probabilities
+            self._inserted = inserted
+        self._problems.append(problem)
+        self._picks.append(1)
+        self._rows[problem] = row
+        return row
 
     def insert(self, problem: str, index: CardIndex, prob: float) -> None:
-        if problem not in self._problems:
-            self._problems.append(problem)
-            self._should[problem] = ShouldPickCards({}, 1)
-        self._should[problem].probabilities[index] = prob
+        row = self._row_of(problem)
+        self._probabilities[row, hash(index) - 1] = prob
+        self._inserted[row, hash(index) - 1] = True
+
+    def insert_all(self, problem: str, probabilities: ArrayLike) -> None:
+        """
+        44 種類すべての札についての確率をまとめて設定する。
+
+        引数:
+            - problem: 問題 ID。
+            - probabilities: 長さ 44 の確率の配列。model.predict の出力の 1 行をそのまま渡せる。
+        """
+        values = np.asarray(probabilities, dtype=np.float64)
+        if values.shape != (CARDS,):
+            raise ValueError(f"shape of probabilities must be ({CARDS},)")
+        row = self._row_of(problem)
+        self._probabilities[row] = values
+        self._inserted[row] = True
 
     def remove(self, problem: str, index: CardIndex) -> None:
-        self._should[problem].probabilities.pop(index)
+        row = self._rows[problem]
+        if not self._inserted[row, hash(index) - 1]:
+            raise KeyError(index)
+        self._probabilities[row, hash(index) - 1] = 0.0
+        self._inserted[row, hash(index) - 1] = False
 
     def cards_on(self, problem: str) -> int:
-        return len(self._should[problem].probabilities)
+        return int(np.count_nonzero(self._inserted[self._rows[problem]]))
 
     def set_picks_on(self, problem: str, picks: int) -> None:
-        if problem not in self._problems:
-            self._problems.append(problem)
-            self._should[problem] = ShouldPickCards({}, 1)
-        self._should[problem].picks = picks
+        self._picks[self._row_of(problem)] = picks
 
     def picks_on(self, problem: str) -> int:
-        return self._should[problem].picks
+        return self._picks[self._rows[problem]]
 
     def problems(self) -> Iterable[str]:
         return self._problems
@@ -150,14 +246,125 @@ class ShouldPickCardsByProblem:
         return len(self._problems)
 
     def probability(self, problem: str, index: CardIndex) -> float:
-        return self._should[problem].probabilities.get(index, 0.0)
+        return float(self._probabilities[self._rows[problem], hash(index) - 1])
+
+    def row(self, problem: str) -> np.ndarray:
+        """
+        その問題の確率の行を、長さ 44 の配列のビューとして返す。
+
+        ビューは次に新しい問題が追加されるまで有効である。
+        """
+        return self._probabilities[self._rows[problem]]
+
+    def matrix(self) -> np.ndarray:
+        """
+        全ての問題の確率を、問題の追加順に並べた (問題数, 44) の配列のビューとして返す。
+
+        ビューは次に新しい問題が追加されるまで有効である。
+        """
+        return self._probabilities[:len(self._problems)]
+
+    def picks_array(self) -> np.ndarray:
+        """
+        各問題の取るべき個数を、問題の追加順に並べた配列として返す。
+        """
+        return np.array(self._picks, dtype=np.int64)
+
+    def should_pick_cards_on(self, problem: str) -> ShouldPickCards:
+        row = self._rows[problem]
+        return ShouldPickCards(
+            probabilities={
+                CardIndex.of(int(column) + 1):
+                    float(self._probabilities[row, column])
+                for column in np.flatnonzero(self._inserted[row])
+            },
+            picks=self._picks[row],
+        )
 
 
 def should_pick_cards_from_yaml(path: str) -> ShouldPickCardsByProblem:
     should = ShouldPickCardsByProblem()
     with open(path, 'r', newline='') as f:
         plain = yaml.load(f, Loader=Loader)
-        should._should = {
-            k: ShouldPickCards.from_plain(v) for k, v in plain.items()
-        }
+    for problem, value in plain.items():
+        should_pick_cards = ShouldPickCards.from_plain(value)
+        should.set_picks_on(problem, should_pick_cards.picks)
+        for index, prob in should_pick_cards.probabilities.items():
+            should.insert(problem, index, prob)
+    return should
+
+
+def should_pick_cards_from_npz(
+    path: str,
+    mmap: bool = True,
+) -> ShouldPickCardsByProblem:
+    """
+    save_npz で保存した .npz から読み込む。
+
+    引数:
+        - path: .npz のファイルパス。
+        - mmap: True のとき、確率の行列をコピーせずにメモリマップする。
+          書き換えはメモリ上だけで行われ、ファイルには反映されない。
+
+    戻り値:
+        保存したときと同じ問題の追加順、取るべき個数、確率を持つ ShouldPickCardsByProblem。
+    """
+    should = ShouldPickCardsByProblem()
+    with np.load(path) as arrays:
+        problems = [str(problem) for problem in arrays['problems']]
+        picks = arrays['picks'].tolist()
+        if not problems:
+            return should
+        if mmap:
+            probabilities = _memmap_member(path, 'probabilities')
+            inserted = _memmap_member(path, 'inserted')
+        else:
+            probabilities = arrays['probabilities']
+            inserted = arrays['inserted']
+    if probabilities.shape != (len(problems), CARDS):
+        raise ValueError(f"shape of probabilities must be (problems, {CARDS})")
+    should._probabilities = probabilities
+    should._inserted = inserted
+    should._picks = picks
+    should._problems = problems
+    should._rows = {problem: row for row, problem in enumerate(problems)}
     return should
+
+
+def should_pick_cards_from_file(path: str) -> ShouldPickCardsByProblem:
+    """
+    拡張子が .npz なら should_pick_cards_from_npz で、そうでなければ YAML として読み込む。
+    """
+    if path.endswith('.npz'):
+        return should_pick_cards_from_npz(path)
+    return should_pick_cards_from_yaml(path)
+
+
+# ZIP のローカルファイルヘッダーの固定長部分。ファイル名と拡張フィールドの長さが末尾にある
+_LOCAL_HEADER: Final = struct.Struct('<4s5H3L2H')
+
+
+def _memmap_member(path: str, name: str) -> np.ndarray:
+    """
+    無圧縮の .npz に格納された name の配列を、コピーオンライトでメモリマップする。
+    """
+    with ZipFile(path) as archive:
+        info = archive.getinfo(f'{name}.npy')
+    if info.compress_type != ZIP_STORED:
+        raise ValueError(f"{name} in {path} is compressed")
+    with open(path, 'rb') as f:
+        f.seek(info.header_offset)
+        header = _LOCAL_HEADER.unpack(f.read(_LOCAL_HEADER.size))
+        f.seek(header[-2] + header[-1], 1)
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = \
+                np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = \
+                np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+    return np.memmap(
+        path, dtype=dtype, mode='c', offset=offset, shape=shape,
+        order='F' if fortran_order else 'C',
+    ).view(np.ndarray)
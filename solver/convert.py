@@ -0,0 +1,30 @@
+# 札の確率のファイルを YAML と .npz の間で変換する。形式は拡張子で判断する。
+#
+#     python -m solver.convert temp/pick-cards.yaml temp/pick-cards.npz
+#     python -m solver.convert temp/pick-cards.npz temp/pick-cards.yaml
+from argparse import ArgumentParser
+
+from solver.card import should_pick_cards_from_file
+
+
+def convert(source: str, destination: str) -> None:
+    """
+    source の札の確率を読み込み、destination の拡張子に応じた形式で保存する。
+    """
+    should = should_pick_cards_from_file(source)
+    if destination.endswith('.npz'):
+        should.save_npz(destination)
+    else:
+        should.save_yaml(destination)
+
+
+def main() -> None:
+    parser = ArgumentParser(description='札の確率のファイルの形式を変換する。')
+    parser.add_argument('source')
+    parser.add_argument('destination')
+    args = parser.parse_args()
+    convert(args.source, args.destination)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+from dataclasses import dataclass
+from functools import partial
+from typing import Callable, Final, Optional
+
+from solver.anytime import solve_anytime
+from solver.card import ShouldPickCardsByProblem
+from solver.incremental import IncrementalSolver
+from solver.parallel import ParallelSolver
+from solver.pick_ways import SOLVERS, Solver
+
+
+@dataclass(frozen=True)
+class SolverProvider:
+    """
+    試合を通して使うソルバー。問題ごとに、探索を打ち切る時刻を渡してソルバーを取り出す。
+
+    Attributes:
+        for_deadline (Callable[[float], Solver]): 探索を打ち切る time.monotonic() の時刻を
+            受け取り、その問題で使うソルバーを返す関数。
+        close (Callable[[], None]): 試合が終わったときに、ソルバーが持つ資源を解放する関数。
+    """
+    for_deadline: Callable[[float], Solver]
+    close: Callable[[], None] = lambda: None
+
+
+def _stateless(solver: Solver, _workers: Optional[int]) -> SolverProvider:
+    return SolverProvider(lambda _deadline: solver)
+
+
+def _incremental(_workers: Optional[int]) -> SolverProvider:
+    # 問題の間で状態を引き継ぐので、試合を通して 1 つのインスタンスを使う
+    solver = IncrementalSolver()
+    return SolverProvider(lambda _deadline: solver.solve)
+
+
+def _anytime(_workers: Optional[int]) -> SolverProvider:
+    def for_deadline(deadline: float) -> Solver:
+        def solve_ways(problems: int, should: ShouldPickCardsByProblem):
+            solution = solve_anytime(problems, should, deadline)
+            if solution is None:
+                return None
+            if not solution.optimal:
+                print('solver reached the deadline, using the best one so far')
+            return (solution.ways, solution.threshold)
+        return solve_ways
+    return SolverProvider(for_deadline)
+
+
+def _parallel(workers: Optional[int]) -> SolverProvider:
+    # プロセスプールは試合を通して使い回し、試合が終わったら止める
+    solver = ParallelSolver(workers)
+    return SolverProvider(lambda _deadline: solver.solve, solver.close)
+
+
+# main.py の環境変数 SOLVER で選択できるソルバーの名前と、ワーカーの数を受け取って
+# SolverProvider を作る関数の表
+SOLVER_FACTORIES: Final[
+    dict[str, Callable[[Optional[int]], SolverProvider]]
+] = {
+    **{
+        name: partial(_stateless, solver)
+        for name, solver in SOLVERS.items()
+    },
+    'incremental': _incremental,
+    'anytime': _anytime,
+    'parallel': _parallel,
+}
+
+
+def create_solver(
+    name: str,
+    workers: Optional[int] = None,
+) -> SolverProvider:
+    """
+    SOLVER_FACTORIES の name のソルバーを作る。
+
+    引数:
+        - name: ソルバーの名前。
+        - workers: 並列に探索するソルバーで使うワーカープロセスの数。None のときは CPU の数を使う。
+
+    戻り値:
+        試合を通して使う SolverProvider。
+    """
+    return SOLVER_FACTORIES[name](workers)
@@ -0,0 +1,105 @@
+from heapq import heappop, heappush
+from math import inf
+from typing import Tuple
+
+
+class MinCostFlow:
+    """
+    最小費用流を、ポテンシャル付きの逐次最短路法で求める。
+
+    負の費用の辺も扱えるが、負の閉路を含んではならない。
+    """
+
+    def __init__(self, nodes: int) -> None:
+        self._nodes = nodes
+        # 各頂点から出る辺の [行き先, 容量, 費用, 逆辺の番号]
+        self._graph: list[list[list]] = [[] for _ in range(nodes)]
+        self._edges: list[Tuple[int, int]] = []
+
+    def add_edge(self, src: int, dst: int, capacity: int, cost: float) -> int:
+        """
+        src から dst への辺を追加する。
+
+        戻り値:
+            追加した辺の番号。edge_flow で流量を調べるのに使う。
+        """
+        self._edges.append((src, len(self._graph[src])))
+        self._graph[src].append([dst, capacity, cost, len(self._graph[dst])])
+        self._graph[dst].append([src, 0, -cost, len(self._graph[src]) - 1])
+        return len(self._edges) - 1
+
+    def edge_flow(self, edge: int) -> int:
+        """
+        add_edge で追加した辺に流れている量を返す。
+        """
+        src, index = self._edges[edge]
+        dst, _capacity, _cost, rev = self._graph[src][index]
+        return self._graph[dst][rev][1]
+
+    def flow(self, source: int, sink: int, limit: int) -> Tuple[int, float]:
+        """
+        source から sink へ最大 limit だけ流し、その流量と費用の合計を返す。
+        """
+        graph = self._graph
+        potentials = self._initial_potentials(source)
+        flowed = 0
+        total_cost = 0.0
+        while flowed < limit:
+            dist = [inf] * self._nodes
+            prev_node = [-1] * self._nodes
+            prev_edge = [-1] * self._nodes
+            dist[source] = 0.0
+            queue = [(0.0, source)]
+            while queue:
+                d, node = heappop(queue)
+                if dist[node] < d:
+                    continue
+                for index, (dst, capacity, cost, _rev) \
+                        in enumerate(graph[node]):
+                    if capacity <= 0:
+                        continue
+                    next_d = d + cost + potentials[node] - potentials[dst]
+                    if next_d < dist[dst]:
+                        dist[dst] = next_d
+                        prev_node[dst] = node
+                        prev_edge[dst] = index
+                        heappush(queue, (next_d, dst))
+            if dist[sink] == inf:
+                break
+            for node in range(self._nodes):
+                if dist[node] != inf:
+                    potentials[node] += dist[node]
+
+            amount = limit - flowed
+            node = sink
+            while node != source:
+                edge = graph[prev_node[node]][prev_edge[node]]
+                amount = min(amount, edge[1])
+                node = prev_node[node]
+            node = sink
+            while node != source:
+                edge = graph[prev_node[node]][prev_edge[node]]
+                edge[1] -= amount
+                graph[node][edge[3]][1] += amount
+                total_cost += amount * edge[2]
+                node = prev_node[node]
+            flowed += amount
+        return (flowed, total_cost)
+
+    def _initial_potentials(self, source: int) -> list[float]:
+        # 負の費用の辺があっても Dijkstra 法が使えるように、Bellman-Ford 法で初期化する
+        potentials = [inf] * self._nodes
+        potentials[source] = 0.0
+        for _ in range(self._nodes):
+            updated = False
+            for node in range(self._nodes):
+                if potentials[node] == inf:
+                    continue
+                for dst, capacity, cost, _rev in self._graph[node]:
+                    if 0 < capacity and potentials[node] + cost < \
+                            potentials[dst]:
+                        potentials[dst] = potentials[node] + cost
+                        updated = True
+            if not updated:
+                break
+        return [0.0 if p == inf else p for p in potentials]
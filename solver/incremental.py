@@ -0,0 +1,201 @@
+from solver.card import CARDS, CardIndex, ShouldPickCardsByProblem
+from solver.pick_ways import calc_threshold_candidates, \
+    convert_to_pick_indexes, search_pick_indexes
+from typing import Optional, Tuple
+import numpy as np
+
+
+class IncrementalSolver:
+    """
+    呼び出しの間で状態を保持しながら、solve_by_threshold_sweep と同じしきい値の上限を求める。
+
+    試合全体を通した確率の行列と前回の取り方を覚えておき、変化した問題の行だけを
+    再計算する。しきい値は前回の値から探索を始め、前回の取り方のうち引き続き使える
+    部分は残したまま、残りの問題だけを探索し直す。
+    """
+
+    def __init__(self) -> None:
+        self._reset()
+
+    def _reset(self) -> None:
+        self._probabilities = np.zeros((0, CARDS), dtype=np.float64)
+        self._opposite_sums = np.zeros((0, CARDS), dtype=np.float64)
+        self._pick_probabilities = np.zeros((0, CARDS), dtype=np.float64)
+        self._picks = np.zeros(0, dtype=np.int64)
+        self._ways: Optional[list[list[int]]] = None
+        self._threshold = 0.0
+        self._result: Optional[Tuple[list[list[CardIndex]], float]] = None
+        self._solved = False
+        self._rounds = 0
+
+    def solve(
+        self,
+        problems: int,
+        should_pick_sets: ShouldPickCardsByProblem
+    ) -> Optional[Tuple[list[list[CardIndex]], float]]:
+        """
+        前回の呼び出しから変化した部分だけを計算し直して、取り方を探索する。
+
+        引数:
+            - problems: この試合の問題数。
+            - should_pick_sets: 各問題データごとに、その札が含まれている確率のデータ。
+
+        戻り値:
+            各問題ごとに取る札の種類を格納したリストと、しきい値の上限の組。
+            取る札が存在しない場合は None を返す。
+        """
+
+        if not self._update(should_pick_sets) and self._solved \
+                and self._rounds == problems:
+            return self._result
+
+        self._solved = True
+        self._rounds = problems
+        self._result = None
+        thresholds, end = calc_threshold_candidates(
+            self._pick_probabilities, self._picks
+        )
+        if end == 0:
+            self._ways = None
+            return None
+
+        # 前回の結果から、取り方が存在する候補の範囲を広げながら探す
+        found: dict[int, list[list[int]]] = {}
+
+        def feasible(index: int) -> bool:
+            ways = self._search(problems, float(thresholds[index]))
+            if ways is None:
+                return False
+            found[index] = ways
+            return True
+
+        pivot = min(
+            int(np.searchsorted(thresholds, self._threshold, side='right')),
+            end,
+        ) - 1
+        pivot = max(pivot, 0)
+        step = 1
+        if feasible(pivot):
+            start = pivot
+            while start + step < end and feasible(start + step):
+                start += step
+                step *= 2
+            end = min(start + step, end)
+        else:
+            end = pivot
+            start = pivot - step
+            while 0 <= start and not feasible(start):
+                end = start
+                step *= 2
+                start = end - step
+            if start < 0:
+                if end == 0 or not feasible(0):
+                    self._ways = None
+                    return None
+                start = 0
+        while 1 < end - start:
+            mid = (end - start) // 2 + start
+            if feasible(mid):
+                start = mid
+            else:
+                end = mid
+
+        self._ways = found[start]
+        self._threshold = float(thresholds[start])
+        upper = thresholds[end] if end < len(thresholds) \
+            else thresholds[start]
+        self._result = (
+            [
+                [CardIndex.of(column + 1) for column in columns]
+                for columns in self._ways
+            ],
+            float(upper),
+        )
+        return self._result
+
+    def _update(self, should_pick_sets: ShouldPickCardsByProblem) -> bool:
+        """
+        キャッシュしている行列を should_pick_sets に合わせて更新し、変化があったかを返す。
+        """
+        probabilities = should_pick_sets.matrix()
+        picks = should_pick_sets.picks_array()
+        cached = len(self._probabilities)
+        if len(probabilities) < cached:
+            self._reset()
+            cached = 0
+
+        changed_rows = np.flatnonzero(np.any(
+            probabilities[:cached] != self._probabilities, axis=1
+        ))
+        picks_changed = not np.array_equal(picks[:cached], self._picks)
+        if len(changed_rows) == 0 and len(probabilities) == cached \
+                and not picks_changed:
+            return False
+
+        self._probabilities = np.array(probabilities)
+        self._picks = picks
+        # 2 問目以降の確率は後続の問題の Σ_{d ≠ c} に影響しないので、1 問目が変わったときだけ全て計算し直す
+        if cached == 0 or (0 < len(changed_rows) and changed_rows[0] == 0):
+            first_new = 0
+            changed_rows = np.zeros(0, dtype=np.int64)
+        else:
+            first_new = cached
+        opposite_sums = np.empty_like(self._probabilities)
+        opposite_sums[:first_new] = self._opposite_sums[:first_new]
+        pick_probabilities = np.empty_like(self._probabilities)
+        pick_probabilities[:first_new] = \
+            self._pick_probabilities[:first_new]
+        for row in range(first_new, len(self._probabilities)):
+            if row == 0:
+                opposite_sums[row] = self._probabilities[row]
+            else:
+                prev = opposite_sums[row - 1]
+                opposite_sums[row] = prev.sum() - prev
+        pick_probabilities[first_new:] = \
+            self._probabilities[first_new:] * opposite_sums[first_new:]
+        pick_probabilities[changed_rows] = \
+            self._probabilities[changed_rows] * opposite_sums[changed_rows]
+        self._opposite_sums = opposite_sums
+        self._pick_probabilities = pick_probabilities
+        return True
+
+    def _search(
+        self,
+        problems: int,
+        pick_threshold: float
+    ) -> Optional[list[list[int]]]:
+        pick_indexes = convert_to_pick_indexes(
+            self._pick_probabilities, self._picks, pick_threshold
+        )
+        if pick_indexes is None:
+            return None
+        rounds = min(problems, len(pick_indexes))
+        if self._ways is None:
+            return search_pick_indexes(problems, pick_indexes, self._picks)
+
+        # 前回の取り方のうち、しきい値を超えていて個数も変わっていない問題はそのまま使う
+        kept: dict[int, list[int]] = {}
+        used = 0
+        for row, columns in enumerate(self._ways[:rounds]):
+            if len(columns) == self._picks[row] and np.all(
+                pick_threshold < self._pick_probabilities[row, columns]
+            ):
+                kept[row] = columns
+                for column in columns:
+                    used |= 1 << column
+        rest = [row for row in range(rounds) if row not in kept]
+        partial = search_pick_indexes(
+            len(rest),
+            [
+                [column for column in pick_indexes[row]
+                 if not used >> int(column) & 1]
+                for row in rest
+            ],
+            [self._picks[row] for row in rest],
+        )
+        if partial is None:
+            return search_pick_indexes(problems, pick_indexes, self._picks)
+        ways = [kept.get(row, []) for row in range(rounds)]
+        for row, columns in zip(rest, partial):
+            ways[row] = columns
+        return ways
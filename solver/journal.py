@@ -0,0 +1,165 @@
+import json
+import os
+from os.path import exists, join
+from typing import Any, Final, Optional, TextIO
+
+from solver.card import ShouldPickCardsByProblem, \
+    should_pick_cards_from_npz, should_pick_cards_from_yaml
+from solver.state import SolverState, solver_state_from_yaml
+
+PICK_CARDS_FILE: Final = 'pick-cards.npz'
+# 以前のバージョンが YAML で保存していた札の確率のファイル
+LEGACY_PICK_CARDS_FILE: Final = 'pick-cards.yaml'
+STATE_FILE: Final = 'solver-state.yaml'
+JOURNAL_FILE: Final = 'journal.jsonl'
+# この数の記録を追記するたびにスナップショットを取り、ジャーナルを空にする
+SNAPSHOT_EVERY: Final = 64
+
+
+class Journal:
+    """
+    札の確率とソルバーの状態を、スナップショットと追記専用のジャーナルで保存する。
+
+    断片データを増やすたびに変わった分だけを 1 行の JSON としてジャーナルに追記し、
+    snapshot_every 件ごとに全体をスナップショットに書き出してジャーナルを空にする。
+    札の確率のスナップショットは .npz で、読み込むときは確率の行列をメモリマップする。
+    各記録は差分ではなく変わった値そのものを持つので、スナップショットの後に
+    同じ記録をもう一度適用しても結果は変わらない。
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        snapshot_every: int = SNAPSHOT_EVERY,
+        sync: bool = False,
+    ) -> None:
+        """
+        引数:
+            - directory: スナップショットとジャーナルを保存するディレクトリ。
+            - snapshot_every: スナップショットを取るまでに追記する記録の数。
+            - sync: True のとき、追記するたびに fsync してディスクへの書き込みを待つ。
+        """
+        self.pick_cards_path = join(directory, PICK_CARDS_FILE)
+        self.legacy_pick_cards_path = join(directory, LEGACY_PICK_CARDS_FILE)
+        self.state_path = join(directory, STATE_FILE)
+        self.journal_path = join(directory, JOURNAL_FILE)
+        self.snapshot_every = snapshot_every
+        self.sync = sync
+        self.should = ShouldPickCardsByProblem()
+        self.state = SolverState(
+            current_problem_id='',
+            current_fails=0,
+            used_chunks={},
+            past_answers={},
+        )
+        self._records = 0
+        self._file: Optional[TextIO] = None
+
+    def load(self) -> tuple[ShouldPickCardsByProblem, SolverState]:
+        """
+        スナップショットを読み込んでからジャーナルの記録を適用し、最後に保存した状態を復元する。
+
+        戻り値:
+            復元した札の確率とソルバーの状態。以降はこれらへの変更を record_row と
+            record_state で記録する。
+        """
+        if exists(self.pick_cards_path):
+            self.should = should_pick_cards_from_npz(self.pick_cards_path)
+        elif exists(self.legacy_pick_cards_path):
+            self.should = should_pick_cards_from_yaml(
+                self.legacy_pick_cards_path)
+        if exists(self.state_path):
+            self.state = solver_state_from_yaml(self.state_path)
+        self._records = self._replay()
+        self._file = open(self.journal_path, 'a', encoding='utf-8')
+        return self.should, self.state
+
+    def record_row(self, problem: str) -> None:
+        """
+        problem の札の確率と取るべき個数を記録する。
+        """
+        self._append({
+            'row': problem,
+            'picks': self.should.picks_on(problem),
+            'probabilities': self.should.row(problem).tolist(),
+        })
+
+    def record_state(self, problem: str) -> None:
+        """
+        ソルバーの状態のうち、problem に関わる部分を記録する。
+        """
+        record: dict[str, Any] = {
+            'state': problem,
+            'fails': self.state.current_fails,
+        }
+        if problem in self.state.used_chunks:
+            record['used_chunks'] = self.state.used_chunks[problem]
+        # 回答を取り消したことも再生できるように、回答がないときは None を記録する
+        record['answers'] = self.state.past_answers.get(problem)
+        self._append(record)
+
+    def snapshot(self) -> None:
+        """
+        今の状態をスナップショットに書き出して、ジャーナルを空にする。
+        """
+        self.should.save_npz(self.pick_cards_path)
+        self.state.save_yaml(self.state_path)
+        if self._file is not None:
+            self._file.truncate(0)
+        self._records = 0
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _append(self, record: dict[str, Any]) -> None:
+        if self._file is None:
+            raise RuntimeError('journal is not loaded')
+        self._file.write(json.dumps(
+            record, ensure_ascii=False, separators=(',', ':')) + '\n')
+        self._file.flush()
+        if self.sync:
+            os.fsync(self._file.fileno())
+        self._records += 1
+        if self.snapshot_every <= self._records:
+            self.snapshot()
+
+    def _replay(self) -> int:
+        """
+        ジャーナルの記録を順に適用し、適用した記録の数を返す。
+
+        書き込みの途中で異常終了して最後の行が壊れているときは、その行を切り捨てる。
+        """
+        if not exists(self.journal_path):
+            return 0
+        records = 0
+        valid_bytes = 0
+        with open(self.journal_path, 'rb+') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b'\n'):
+                    break
+                self._apply(record)
+                records += 1
+                valid_bytes += len(line)
+            f.truncate(valid_bytes)
+        return records
+
+    def _apply(self, record: dict[str, Any]) -> None:
+        if 'row' in record:
+            self.should.insert_all(record['row'], record['probabilities'])
+            self.should.set_picks_on(record['row'], record['picks'])
+            return
+        problem = record['state']
+        self.state.current_problem_id = problem
+        self.state.current_fails = record['fails']
+        if 'used_chunks' in record:
+            self.state.used_chunks[problem] = record['used_chunks']
+        if record.get('answers') is not None:
+            self.state.past_answers[problem] = record['answers']
+        elif 'answers' in record:
+            self.state.past_answers.pop(problem, None)
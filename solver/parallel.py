@@ -0,0 +1,224 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import get_all_start_methods, get_context
+from multiprocessing.context import BaseContext
+from os import cpu_count
+from solver.card import CardIndex, ShouldPickCardsByProblem
+from solver.pick_ways import SearchInterrupted, calc_pick_probabilities, \
+    calc_threshold_candidates, convert_to_pick_indexes, \
+    search_pick_indexes, solve_by_threshold_sweep
+from typing import Any, Final, Optional, Tuple
+import numpy as np
+
+# これより問題数が少ないときは、プロセスの起動の方が時間がかかるので並列化しない
+PARALLEL_MIN_PROBLEMS: Final = 12
+
+# ワーカープロセスごとに、initializer で受け取った探索の状態を共有する値を保持する
+_worker: dict[str, Any] = {}
+
+
+def _init_worker(best_feasible: Any, lowest_infeasible: Any) -> None:
+    _worker['best_feasible'] = best_feasible
+    _worker['lowest_infeasible'] = lowest_infeasible
+
+
+def _ready() -> None:
+    pass
+
+
+def _search_on(
+    index: int,
+    problems: int,
+    pick_probabilities: np.ndarray,
+    picks: np.ndarray,
+    threshold: float,
+) -> Tuple[int, Optional[list[list[int]]], bool]:
+    """
+    しきい値 threshold で取り方を探索し、(候補の番号 index, 取り方, 打ち切ったかどうか) を返す。
+    """
+    best_feasible = _worker['best_feasible']
+    lowest_infeasible = _worker['lowest_infeasible']
+
+    def interrupted() -> bool:
+        # ほかのワーカーの結果から答えが分かる候補は、それ以上調べる必要がない
+        return index <= best_feasible.value \
+            or lowest_infeasible.value <= index
+
+    if interrupted():
+        return (index, None, True)
+    pick_indexes = convert_to_pick_indexes(
+        pick_probabilities, picks, threshold)
+    try:
+        ways = None if pick_indexes is None else search_pick_indexes(
+            problems,
+            pick_indexes,
+            picks,
+            interrupted=interrupted,
+        )
+    except SearchInterrupted:
+        return (index, None, True)
+
+    if ways is None:
+        with lowest_infeasible.get_lock():
+            lowest_infeasible.value = min(lowest_infeasible.value, index)
+    else:
+        with best_feasible.get_lock():
+            best_feasible.value = max(best_feasible.value, index)
+    return (index, ways, False)
+
+
+def _default_context() -> BaseContext:
+    # fork では TensorFlow を読み込んだメインプロセスを複製してしまうので、
+    # 使えるときは何も読み込んでいないサーバーから複製する forkserver を使う
+    if 'forkserver' in get_all_start_methods():
+        context = get_context('forkserver')
+        context.set_forkserver_preload(['solver.parallel'])
+        return context
+    return get_context('spawn')
+
+
+class ParallelSolver:
+    """
+    solve_by_threshold_sweep と同じ取り方の探索を、しきい値の候補ごとにプロセスプールで並列に行う。
+
+    プロセスプールは作ったときに起動し、close するまで呼び出しの間で使い回すので、
+    探索のたびにプロセスの起動を待つ必要はない。
+
+    毎回ワーカーの数だけしきい値の候補を等間隔に選んで同時に調べ、範囲を絞り込む。
+    あるワーカーが取り方を見つけると、それ以下の候補を調べているワーカーは探索を打ち切る。
+    同様に、取り方が存在しないと分かった候補以上を調べているワーカーも打ち切る。
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        min_problems: int = PARALLEL_MIN_PROBLEMS,
+        mp_context: Optional[BaseContext] = None,
+    ) -> None:
+        """
+        引数:
+            - workers: ワーカープロセスの数。None のときは CPU の数を使う。
+            - min_problems: 並列化する最小の問題数。これより少ないときは同じプロセスで探索する。
+            - mp_context: ワーカープロセスの起動に使う multiprocessing のコンテキスト。
+              None のときは forkserver か、使えなければ spawn を使う。
+        """
+        self.workers = workers if workers is not None else cpu_count() or 1
+        self.min_problems = min_problems
+        self._executor: Optional[ProcessPoolExecutor] = None
+        if self.workers <= 1:
+            return
+        context = mp_context or _default_context()
+        self._best_feasible = context.Value('i', -1)
+        self._lowest_infeasible = context.Value('i', 0)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self._best_feasible, self._lowest_infeasible),
+        )
+        # 試合が始まる前に、全てのワーカープロセスを起動しておく
+        wait([self._executor.submit(_ready) for _ in range(self.workers)])
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> "ParallelSolver":
+        return self
+
+    def __exit__(self, *_args) -> None:
+        self.close()
+
+    def solve(
+        self,
+        problems: int,
+        should_pick_sets: ShouldPickCardsByProblem,
+    ) -> Optional[Tuple[list[list[CardIndex]], float]]:
+        """
+        引数:
+            - problems: この試合の問題数。
+            - should_pick_sets: 各問題データごとに、その札が含まれている確率のデータ。
+
+        戻り値:
+            各問題ごとに取る札の種類を格納したリストと、しきい値の上限の組。
+            取る札が存在しない場合は None を返す。
+        """
+        executor = self._executor
+        if executor is None \
+                or should_pick_sets.problem_count() < self.min_problems:
+            return solve_by_threshold_sweep(problems, should_pick_sets)
+
+        pick_probabilities = calc_pick_probabilities(should_pick_sets)
+        picks = should_pick_sets.picks_array()
+        thresholds, end = calc_threshold_candidates(pick_probabilities, picks)
+        if end == 0:
+            return None
+
+        best_feasible = self._best_feasible
+        lowest_infeasible = self._lowest_infeasible
+        # 前回の呼び出しのタスクは全て終わっているので、共有する値を初期化してよい
+        best_feasible.value = -1
+        lowest_infeasible.value = end
+        found: dict[int, list[list[int]]] = {}
+        while 1 < lowest_infeasible.value - best_feasible.value:
+            start = best_feasible.value
+            width = lowest_infeasible.value - start
+            indexes = sorted({
+                start + width * (i + 1) // (self.workers + 1)
+                for i in range(self.workers)
+            } - {start})
+            pending = {
+                executor.submit(
+                    _search_on, index, problems, pick_probabilities, picks,
+                    float(thresholds[index]),
+                ): index
+                for index in indexes
+            }
+            while pending:
+                done, _not_done = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.pop(future)
+                    if future.cancelled():
+                        continue
+                    index, ways, _aborted = future.result()
+                    if ways is not None:
+                        found[index] = ways
+                # 答えが分かった候補は、まだ始まっていなければ取り消す
+                for future, index in pending.items():
+                    if index <= best_feasible.value \
+                            or lowest_infeasible.value <= index:
+                        future.cancel()
+
+        if best_feasible.value < 0:
+            return None
+        ways = found[best_feasible.value]
+        upper = thresholds[lowest_infeasible.value] \
+            if lowest_infeasible.value < len(thresholds) \
+            else thresholds[best_feasible.value]
+        return (
+            [
+                [CardIndex.of(column + 1) for column in columns]
+                for columns in ways
+            ],
+            float(upper),
+        )
+
+
+def solve_in_parallel(
+    problems: int,
+    should_pick_sets: ShouldPickCardsByProblem,
+    workers: Optional[int] = None,
+    min_problems: int = PARALLEL_MIN_PROBLEMS,
+) -> Optional[Tuple[list[list[CardIndex]], float]]:
+    """
+    1 回だけ探索するために ParallelSolver を作って探索する。
+
+    引数と戻り値の意味は ParallelSolver と同じ。繰り返し探索するときは、プロセスプールを
+    使い回せるように ParallelSolver を使う。
+    """
+    if workers is None:
+        workers = cpu_count() or 1
+    if workers <= 1 or should_pick_sets.problem_count() < min_problems:
+        return solve_by_threshold_sweep(problems, should_pick_sets)
+    with ParallelSolver(workers, min_problems) as solver:
+        return solver.solve(problems, should_pick_sets)
@@ -1,7 +1,26 @@
 from dataclasses import dataclass
-from solver.card import CardIndex, ShouldPickCardsByProblem
-from typing import Final, Iterable, Optional, Tuple
+from solver.card import CARDS, CardIndex, ShouldPickCardsByProblem
+from solver.flow import MinCostFlow
+from typing import Callable, Final, Iterable, Optional, Sequence, Tuple
 from itertools import combinations
+from math import comb, log
+import numpy as np
+
+MEMO_LIMIT: Final = 1 << 16
+INTERRUPT_INTERVAL: Final = 256
+
+
+class SearchInterrupted(Exception):
+    """
+    探索が打ち切られたことを表す。
+    """
+
+
+@dataclass(frozen=True)
+class ShouldPickList:
+    problem_id: str
+    cards: list[CardIndex]
+    picks: int
 
 
 def solve_by_binary_search(
@@ -25,6 +44,199 @@ def solve_by_binary_search(
     return (ways, start)
 
 
+def solve_by_threshold_sweep(
+    problems: int,
+    should_pick_sets: ShouldPickCardsByProblem
+) -> Optional[Tuple[list[list[CardIndex]], float]]:
+    """
+    取り方が存在するような最大のしきい値を、しきい値の候補を二分探索して厳密に求める。
+
+    取り方が存在するかどうかは、しきい値が試合全体を通した確率のいずれかの値を
+    跨ぐときにしか変わらない。そこで、その値を昇順に並べたものを候補として一度だけ
+    求め、試合全体を通した確率の行列も探索の間で使い回す。
+
+    引数:
+        - problems: この試合の問題数。
+        - should_pick_sets: 各問題データごとに、その札が含まれている確率のデータ。
+
+    戻り値:
+        各問題ごとに取る札の種類を格納したリストと、しきい値の上限の組。
+        しきい値の上限は、これ未満のどのしきい値でも取り方が存在するような最大の値で、
+        solve_by_binary_search が EPS の精度で近似しているものに等しい。
+        取る札が存在しない場合は None を返す。
+    """
+
+    pick_probabilities = calc_pick_probabilities(should_pick_sets)
+    picks = should_pick_sets.picks_array()
+
+    def solve_on(pick_threshold: float) -> Optional[list[list[CardIndex]]]:
+        pick_indexes = convert_to_pick_indexes(
+            pick_probabilities, picks, pick_threshold
+        )
+        if pick_indexes is None:
+            return None
+        ways = search_pick_indexes(problems, pick_indexes, picks)
+        if ways is None:
+            return None
+        return [
+            [CardIndex.of(column + 1) for column in columns]
+            for columns in ways
+        ]
+
+    thresholds, end = calc_threshold_candidates(pick_probabilities, picks)
+    if end == 0:
+        return None
+
+    start = 0
+    ways = solve_on(float(thresholds[start]))
+    if ways is None:
+        return None
+    while 1 < end - start:
+        mid = (end - start) // 2 + start
+        mid_ways = solve_on(float(thresholds[mid]))
+        if mid_ways is None:
+            end = mid
+        else:
+            start = mid
+            ways = mid_ways
+    if end == len(thresholds):
+        return (ways, float(thresholds[start]))
+    return (ways, float(thresholds[end]))
+
+
+def solve_by_min_cost_flow(
+    problems: int,
+    should_pick_sets: ShouldPickCardsByProblem
+) -> Optional[Tuple[list[list[CardIndex]], float]]:
+    """
+    問題から札への割り当てを最小費用流として解き、選んだ札の試合全体を通した確率の
+    対数の合計が最大となるような取り方を多項式時間で求める。
+
+    引数:
+        - problems: この試合の問題数。
+        - should_pick_sets: 各問題データごとに、その札が含まれている確率のデータ。
+
+    戻り値:
+        各問題ごとに取る札の種類を格納したリストと、選んだ札の試合全体を通した確率の
+        最小値の組。取る札が存在しない場合は None を返す。
+    """
+
+    pick_probabilities = calc_pick_probabilities(should_pick_sets)
+    ways = assign_by_min_cost_flow(
+        problems, pick_probabilities, should_pick_sets.picks_array()
+    )
+    if ways is None:
+        return None
+    return (
+        [[CardIndex.of(column + 1) for column in columns] for columns in ways],
+        calc_min_probability(pick_probabilities, ways),
+    )
+
+
+def assign_by_min_cost_flow(
+    problems: int,
+    pick_probabilities: np.ndarray,
+    picks: np.ndarray
+) -> Optional[list[list[int]]]:
+    """
+    試合全体を通した確率の行列から、選んだ札の確率の対数の合計が最大となるような
+    問題ごとの札の列番号を、最小費用流で求める。
+
+    引数:
+        - problems: この試合の問題数。
+        - pick_probabilities: calc_pick_probabilities で求めた (問題数, 44) の配列。
+        - picks: 各問題の取るべき個数の配列。
+
+    戻り値:
+        各問題ごとに取る札の列番号を昇順に格納したリスト。取る札が存在しない場合は None を返す。
+    """
+
+    rounds = min(problems, len(pick_probabilities))
+
+    # 頂点: 始点, 問題 (rounds 個), 札 (44 個), 終点
+    source = 0
+    sink = rounds + CARDS + 1
+    flow = MinCostFlow(rounds + CARDS + 2)
+    for column in range(CARDS):
+        flow.add_edge(rounds + 1 + column, sink, 1, 0.0)
+    assign_edges: list[list[Tuple[int, int]]] = []
+    for row in range(rounds):
+        flow.add_edge(source, row + 1, int(picks[row]), 0.0)
+        assign_edges.append([])
+        for column in np.flatnonzero(0.0 < pick_probabilities[row]):
+            edge = flow.add_edge(
+                row + 1,
+                rounds + 1 + int(column),
+                1,
+                -log(pick_probabilities[row, column]),
+            )
+            assign_edges[-1].append((int(column), edge))
+
+    required = int(picks[:rounds].sum())
+    flowed, _cost = flow.flow(source, sink, required)
+    if flowed < required:
+        return None
+
+    return [
+        [column for column, edge in edges if flow.edge_flow(edge) == 1]
+        for edges in assign_edges
+    ]
+
+
+def calc_min_probability(
+    pick_probabilities: np.ndarray,
+    ways: list[list[int]]
+) -> float:
+    """
+    取り方で選んだ札の、試合全体を通した確率の最小値を返す。
+    これ未満のしきい値であれば、その取り方はしきい値を満たす。
+    """
+    return float(min(
+        (pick_probabilities[row, column]
+         for row, columns in enumerate(ways) for column in columns),
+        default=0.0,
+    ))
+
+
+def calc_threshold_candidates(
+    pick_probabilities: np.ndarray,
+    picks: np.ndarray
+) -> Tuple[np.ndarray, int]:
+    """
+    取り方が存在するかどうかが変わりうる、しきい値の候補を求める。
+
+    引数:
+        - pick_probabilities: calc_pick_probabilities で求めた (問題数, 44) の配列。
+        - picks: 各問題の取るべき個数の配列。
+
+    戻り値:
+        試合全体を通した確率と 0.0 を重複なく昇順に並べた配列と、調べる必要のある候補の個数の組。
+        各問題で picks 番目に大きい確率以上のしきい値では札が足りないので、その手前までを調べればよい。
+    """
+
+    thresholds = np.unique(np.append(pick_probabilities, 0.0))
+    thresholds = thresholds[0.0 <= thresholds]
+    end = len(thresholds)
+    if len(pick_probabilities) != 0 and np.all(0 < picks):
+        sorted_rows = -np.sort(-pick_probabilities, axis=1)
+        upper_bound = sorted_rows[np.arange(len(picks)), picks - 1].min()
+        end = int(np.searchsorted(thresholds, upper_bound, side='left'))
+    return (thresholds, end)
+
+
+Solver = Callable[
+    [int, ShouldPickCardsByProblem],
+    Optional[Tuple[list[list[CardIndex]], float]]
+]
+
+# main.py の環境変数 SOLVER で選択できる、取り方を求めるソルバーの一覧
+SOLVERS: Final[dict[str, Solver]] = {
+    'binary_search': solve_by_binary_search,
+    'threshold_sweep': solve_by_threshold_sweep,
+    'min_cost_flow': solve_by_min_cost_flow,
+}
+
+
 def solve(
     problems: int,
     should_pick_sets: ShouldPickCardsByProblem,
@@ -47,83 +259,152 @@ def solve(
     )
     if pick_lists is None:
         return None
+    return search_ways(problems, pick_lists)
 
-    def index_from_cards(cards_by_problem: Iterable[list[CardIndex]]) -> int:
-        indexes = 0
-        for cards in cards_by_problem:
-            index = 0
-            for card in cards:
-                index |= 1 << hash(card)
-            indexes = (indexes << 45) + index
-        return indexes
-
-    memo: dict[int, Optional[list[list[CardIndex]]]] = {}
-
-    def inner(
-        curr_ways: list[list[CardIndex]],
-        visited: set[CardIndex],
-        pick_lists: list[ShouldPickList]
-    ) -> Optional[list[list[CardIndex]]]:
-        index = index_from_cards(curr_ways)
-        if index in memo:
-            return memo[index]
-        curr_round = len(curr_ways)
-        if problems <= curr_round or len(pick_lists) <= curr_round:
-            return curr_ways
-
-        patterns = combinations(
-            pick_lists[curr_round].cards,
-            pick_lists[curr_round].picks
-        )
-        filtered_patterns = filter(
-            lambda cards: all(map(
-                lambda card: card not in visited,
-                cards
-            )),
-            patterns
-        )
-        for pattern in filtered_patterns:
-            curr_ways.append(list(pattern))
-            for card in pattern:
-                visited.add(card)
-            recursive_result = inner(curr_ways, visited, pick_lists)
-            memo[index_from_cards(curr_ways)] = recursive_result
-            if recursive_result is not None:
-                return recursive_result
-            for card in pattern:
-                visited.discard(card)
-            curr_ways.pop()
+
+def search_ways(
+    problems: int,
+    pick_lists: list[ShouldPickList]
+) -> Optional[list[list[CardIndex]]]:
+    """
+    選ぶべき札データのリストから、札が重複しないような問題ごとの札の取り方を探索する。
+
+    引数:
+        - problems: この試合の問題数。
+        - pick_lists: 選ぶべき札データのリスト。
+
+    戻り値:
+        各問題ごとに取る札の種類を格納したリスト。取る札が存在しない場合は None を返す。
+    """
+
+    ways = search_pick_indexes(
+        problems,
+        [[hash(card) - 1 for card in pick_list.cards]
+         for pick_list in pick_lists],
+        [pick_list.picks for pick_list in pick_lists],
+    )
+    if ways is None:
         return None
+    return [
+        [CardIndex.of(column + 1) for column in columns]
+        for columns in ways
+    ]
 
-    return inner([], set(), pick_lists)
 
+def search_pick_indexes(
+    problems: int,
+    pick_indexes: Sequence[Iterable[int]],
+    picks: Sequence[int],
+    memo_limit: int = MEMO_LIMIT,
+    interrupted: Optional[Callable[[], bool]] = None,
+) -> Optional[list[list[int]]]:
+    """
+    問題ごとに選ぶべき札の列番号から、札が重複しないような問題ごとの札の取り方を探索する。
 
-@dataclass(frozen=True)
-class ShouldPickList:
-    problem_id: str
-    cards: list[CardIndex]
-    picks: int
+    使用済みの札は 44 ビットの整数で表し、(探索の深さ, 使用済みの札) の組で取り方が
+    存在しないと分かった状態を記録して枝刈りする。記録は memo_limit 件を超えると
+    破棄するので、問題数が多くてもメモリ使用量は一定に保たれる。
+    問題は札の選び方が少ない順に探索する。
 
+    引数:
+        - problems: この試合の問題数。
+        - pick_indexes: 問題ごとに、選ぶべき札の列番号 (CardIndex から 1 を引いたもの) を並べたもの。
+        - picks: 各問題の取るべき個数。
+        - memo_limit: 取り方が存在しない状態を記録しておく最大の件数。
+        - interrupted: 探索の途中で定期的に呼ばれ、True を返すと探索を打ち切る関数。
 
-def convert_to_pick_lists(
-    should_pick_sets: ShouldPickCardsByProblem,
-    pick_threshold: float
-) -> Optional[list[ShouldPickList]]:
+    戻り値:
+        各問題ごとに取る札の列番号を昇順に格納したリスト。取る札が存在しない場合は None を返す。
+
+    例外:
+        - SearchInterrupted: interrupted が True を返して探索を打ち切った。
     """
-    ShouldPickCardsByRound のデータを選ぶべき札データのリストへと変換する。
-    このとき、このデータを試合全体を通した確率として再計算する。
+
+    rounds = min(problems, len(pick_indexes))
+    card_bits = [
+        [1 << int(column) for column in sorted(pick_indexes[i])]
+        for i in range(rounds)
+    ]
+    order = sorted(
+        range(rounds),
+        key=lambda i: (comb(len(card_bits[i]), picks[i]), i),
+    )
+    ordered_bits = [card_bits[i] for i in order]
+    ordered_picks = [int(picks[i]) for i in order]
+    ordered_masks = [sum(bits) for bits in ordered_bits]
+    # 残りの問題が選びうる札を合わせたものと、残りの問題の取るべき個数の合計
+    remaining_masks = [0] * (rounds + 1)
+    remaining_picks = [0] * (rounds + 1)
+    for i in reversed(range(rounds)):
+        remaining_masks[i] = remaining_masks[i + 1] | ordered_masks[i]
+        remaining_picks[i] = remaining_picks[i + 1] + ordered_picks[i]
+
+    dead_ends: set[tuple[int, int]] = set()
+    chosen: list[int] = []
+    visits = 0
+
+    def has_enough_cards(curr_round: int, used: int) -> bool:
+        # 残りの問題全体で、または 1 つの問題だけでも札が足りなければ取り方は存在しない
+        available = remaining_masks[curr_round] & ~used
+        if bin(available).count('1') < remaining_picks[curr_round]:
+            return False
+        return all(
+            ordered_picks[remaining]
+            <= bin(ordered_masks[remaining] & ~used).count('1')
+            for remaining in range(curr_round, rounds)
+        )
+
+    def inner(curr_round: int, used: int) -> bool:
+        nonlocal visits
+        if rounds <= curr_round:
+            return True
+        if (curr_round, used) in dead_ends:
+            return False
+        visits += 1
+        if interrupted is not None and visits % INTERRUPT_INTERVAL == 0 \
+                and interrupted():
+            raise SearchInterrupted()
+        if has_enough_cards(curr_round, used):
+            available_bits = [
+                bit for bit in ordered_bits[curr_round] if not bit & used
+            ]
+            for pattern in combinations(
+                available_bits, ordered_picks[curr_round]
+            ):
+                pattern_mask = sum(pattern)
+                chosen.append(pattern_mask)
+                if inner(curr_round + 1, used | pattern_mask):
+                    return True
+                chosen.pop()
+        if memo_limit <= len(dead_ends):
+            dead_ends.clear()
+        dead_ends.add((curr_round, used))
+        return False
+
+    if not inner(0, 0):
+        return None
+
+    ways: list[list[int]] = [[] for _ in range(rounds)]
+    for i, pattern_mask in zip(order, chosen):
+        ways[i] = [
+            column for column in range(CARDS) if pattern_mask >> column & 1
+        ]
+    return ways
+
+
+def calc_pick_probabilities(
+    should_pick_sets: ShouldPickCardsByProblem
+) -> np.ndarray:
+    """
+    ShouldPickCardsByProblem の確率を、試合全体を通した確率として再計算する。
 
     引数:
         - should_pick_sets: 各問題データごとに、その札が含まれている確率のデータ。
-        - pick_threshold: その札を取るべきと見なす確率のしきい値。
 
     戻り値:
-        選ぶべき札データのリスト。取る札が存在しない場合は None を返す。
+        問題の追加順に並べた (問題数, 44) の配列。列 c は CardIndex(c + 1) に対応する。
     """
 
-    pick_lists: list[ShouldPickList] = []
-    opposite_sums: dict[str, dict[CardIndex, float]] = {}
-
     """
     ラウンド i で札 c と推定される確率を P_i,c とし,
     全体を通してラウンド i で札 c を選ぶ確率 Q_i,c とすると,
@@ -133,37 +414,74 @@ def convert_to_pick_lists(
         = P(ラウンド i で c を選ぶ | ラウンド i - 1 で c を選ばない)
         * P(ラウンド i - 1 で c を選ばない)
     Q_i,c = P_i,c * (Σ_{d ≠ c} P_i-1,d)
+
+    Σ_{d ≠ c} は行の合計から自身の値を引いたものなので, 1 問題あたり O(44) で更新できる.
     """
 
-    problems = iter(should_pick_sets.problems())
-    prev = next(problems)
-    opposite_sums[prev] = {}
-    for index in CardIndex.all():
-        opposite_sums[prev][index] = should_pick_sets.probability(prev, index)
-    for problem in problems:
-        opposite_sums[problem] = {}
-        for after in CardIndex.all():
-            opposite_sums[problem][after] = 0.0
-            for before in CardIndex.all():
-                if before != after:
-                    opposite_sums[problem][after] += \
-                        opposite_sums[prev][before]
-        prev = problem
-
-    for problem in should_pick_sets.problems():
-        picks = should_pick_sets.picks_on(problem)
-        pick_lists.append(ShouldPickList(
-            problem_id=problem,
-            cards=[],
-            picks=picks,
-        ))
-        for card in CardIndex.all():
-            probability = should_pick_sets.probability(
-                problem, card
-            ) * opposite_sums[problem][card]
-            if pick_threshold < probability:
-                pick_lists[-1].cards.append(card)
-        if len(pick_lists[-1].cards) < picks:
-            return None
+    probabilities = should_pick_sets.matrix()
+    opposite_sums = np.empty_like(probabilities)
+    if len(probabilities) == 0:
+        return opposite_sums
+    opposite_sums[0] = probabilities[0]
+    for row in range(1, len(probabilities)):
+        prev = opposite_sums[row - 1]
+        opposite_sums[row] = prev.sum() - prev
+    return probabilities * opposite_sums
+
+
+def convert_to_pick_indexes(
+    pick_probabilities: np.ndarray,
+    picks: np.ndarray,
+    pick_threshold: float
+) -> Optional[list[np.ndarray]]:
+    """
+    試合全体を通した確率の行列から、問題ごとに選ぶべき札の列番号の配列を求める。
+
+    引数:
+        - pick_probabilities: calc_pick_probabilities で求めた (問題数, 44) の配列。
+        - picks: 各問題の取るべき個数の配列。
+        - pick_threshold: その札を取るべきと見なす確率のしきい値。
+
+    戻り値:
+        問題ごとに、しきい値を超える札の列番号を昇順に並べた配列のリスト。
+        取る札が足りない問題がある場合は None を返す。
+    """
+
+    candidates = pick_threshold < pick_probabilities
+    if np.any(np.count_nonzero(candidates, axis=1) < picks):
+        return None
+    return [np.flatnonzero(row) for row in candidates]
+
 
-    return pick_lists
+def convert_to_pick_lists(
+    should_pick_sets: ShouldPickCardsByProblem,
+    pick_threshold: float
+) -> Optional[list[ShouldPickList]]:
+    """
+    ShouldPickCardsByRound のデータを選ぶべき札データのリストへと変換する。
+    このとき、このデータを試合全体を通した確率として再計算する。
+
+    引数:
+        - should_pick_sets: 各問題データごとに、その札が含まれている確率のデータ。
+        - pick_threshold: その札を取るべきと見なす確率のしきい値。
+
+    戻り値:
+        選ぶべき札データのリスト。取る札が存在しない場合は None を返す。
+    """
+
+    picks = should_pick_sets.picks_array()
+    pick_indexes = convert_to_pick_indexes(
+        calc_pick_probabilities(should_pick_sets), picks, pick_threshold
+    )
+    if pick_indexes is None:
+        return None
+
+    return [
+        ShouldPickList(
+            problem_id=problem,
+            cards=[CardIndex.of(int(column) + 1) for column in columns],
+            picks=int(problem_picks),
+        )
+        for problem, columns, problem_picks
+        in zip(should_pick_sets.problems(), pick_indexes, picks)
+    ]
@@ -0,0 +1,165 @@
+import asyncio
+from time import sleep, time
+from typing import Callable, Final, Optional
+
+from solver.request.meta import AbstractRequester, Problem
+from solver.state import SolverState
+
+# 問題が変わっていないときに、次に問い合わせるまで待つ最初の秒数
+MIN_INTERVAL: Final = 0.5
+# 問題が変わっていないときに、次に問い合わせるまで待つ最大の秒数
+MAX_INTERVAL: Final = 8.0
+
+
+class ProblemPoller:
+    """
+    出題中の問題を問い合わせ、まだ回答していない新しい問題が出るまで待つ。
+
+    回答済みの問題の回答期限までは次の問題が出ないので、期限まで待ってから問い合わせる。
+    期限を過ぎても問題が変わらないときや、問い合わせに失敗したときは、
+    min_interval 秒から max_interval 秒まで待つ時間を倍にしながら問い合わせ直す。
+    """
+
+    def __init__(
+        self,
+        requester: AbstractRequester,
+        state: SolverState,
+        min_interval: float = MIN_INTERVAL,
+        max_interval: float = MAX_INTERVAL,
+        clock: Callable[[], float] = time,
+        sleep: Callable[[float], None] = sleep,
+    ) -> None:
+        """
+        引数:
+            - requester: 問題を問い合わせるリクエスター。
+            - state: 回答済みの問題を past_answers に記録しているソルバーの状態。
+            - min_interval: 問題が変わっていないときに、最初に待つ秒数。
+            - max_interval: 問題が変わっていないときに、待つ最大の秒数。
+            - clock: 現在時刻を UNIX エポックの秒数で返す関数。
+            - sleep: 指定の秒数だけ待つ関数。
+        """
+        self.requester = requester
+        self.state = state
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.clock = clock
+        self.sleep = sleep
+        self.polls = 0
+        self.total_polls = 0
+        self._interval = min_interval
+        self._last_id: Optional[str] = None
+        # Python 3.9 の asyncio.Event は作ったときのイベントループに結び付くので、
+        # 待つときに、実行中のイベントループの中で作る
+        self._forgotten: Optional[asyncio.Event] = None
+        self._forgotten_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def is_solved(self, problem: Problem) -> bool:
+        """
+        problem をすでに処理したかを返す。
+        """
+        return problem.id == self._last_id \
+            or problem.id in self.state.past_answers
+
+    def is_current(self, problem_id: str) -> bool:
+        """
+        problem_id が最後に返した問題で、まだ次の問題に進んでいないかを返す。
+        """
+        return self._last_id == problem_id
+
+    def forget(self, problem_id: str) -> bool:
+        """
+        problem_id を処理していないことにして、回答済みでなければ再び返せるようにする。
+
+        戻り値:
+            problem_id が最後に返した問題で、処理していないことにできたなら True。
+            すでに次の問題に進んでいたときは False。
+        """
+        if not self.is_current(problem_id):
+            return False
+        self._last_id = None
+        if self._forgotten is not None:
+            self._forgotten.set()
+        return True
+
+    def next_problem(self) -> Problem:
+        """
+        まだ回答していない新しい問題が出るまで問い合わせを繰り返し、その問題を返す。
+        """
+        while True:
+            try:
+                problem = self.requester.get_problem()
+            except Exception as e:
+                self.sleep(self._failed(e))
+                continue
+            delay = self._observe(problem)
+            if delay is None:
+                return problem
+            self.sleep(delay)
+
+    async def next_problem_async(self) -> Problem:
+        """
+        next_problem と同じく新しい問題が出るまで待つが、待つ間もイベントループは止めない。
+
+        待っている間に forget が呼ばれたときは、すぐに問い合わせ直す。
+        """
+        while True:
+            try:
+                problem = await self.requester.get_problem_async()
+            except Exception as e:
+                await self._sleep_async(self._failed(e))
+                continue
+            delay = self._observe(problem)
+            if delay is None:
+                return problem
+            await self._sleep_async(delay)
+
+    async def _sleep_async(self, seconds: float) -> None:
+        forgotten = self._forgotten_event()
+        try:
+            await asyncio.wait_for(forgotten.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+        forgotten.clear()
+
+    def _forgotten_event(self) -> asyncio.Event:
+        loop = asyncio.get_running_loop()
+        if self._forgotten is None or self._forgotten_loop is not loop:
+            self._forgotten = asyncio.Event()
+            self._forgotten_loop = loop
+        return self._forgotten
+
+    def _observe(self, problem: Problem) -> Optional[float]:
+        """
+        問い合わせた problem が新しい問題なら None を、そうでなければ次に問い合わせるまで待つ秒数を返す。
+        """
+        self.polls += 1
+        self.total_polls += 1
+        if not self.is_solved(problem):
+            print(
+                f'found problem {problem.id} after {self.polls} polls '
+                f'({self.total_polls} in total)'
+            )
+            self.polls = 0
+            self._interval = self.min_interval
+            self._last_id = problem.id
+            return None
+
+        until_deadline = problem.start_at + problem.time_limit - self.clock()
+        if 0 < until_deadline:
+            print(
+                f'problem {problem.id} is already solved, '
+                f'waiting {until_deadline:.1f}s until it closes'
+            )
+            return until_deadline
+        return self._back_off()
+
+    def _failed(self, error: Exception) -> float:
+        self.polls += 1
+        self.total_polls += 1
+        print(f'failed to get the problem: {error}')
+        return self._back_off()
+
+    def _back_off(self) -> float:
+        delay = self._interval
+        self._interval = min(self._interval * 2, self.max_interval)
+        return delay
@@ -0,0 +1,92 @@
+from typing import Callable, Optional, Sequence
+import numpy as np
+
+from solver.request.meta import Chunk
+
+
+class PredictionCache:
+    """
+    出題中の問題について、断片データごとの特徴量とモデルの予測を segment_index ごとに保持する。
+
+    using_chunks を増やすたびに全ての断片データを前処理して推論し直すのではなく、
+    新しく届いた断片データだけを前処理して推論し、予測の平均を逐次更新する。
+    問題が変わると保持しているデータは全て破棄する。
+    """
+
+    def __init__(
+        self,
+        preprocess: Callable[[list[np.ndarray]], Sequence[np.ndarray]],
+        predict: Callable[[Sequence[np.ndarray]], np.ndarray],
+    ) -> None:
+        """
+        引数:
+            - preprocess: 断片データの音声波形のリストから、モデルに入力する特徴量を並べた配列を作る関数。
+              前処理をモデルの中で行うときは、音声波形のリストをそのまま返す関数を渡す。
+            - predict: 特徴量を並べた配列から、各札の確率を並べた配列を予測する関数。
+        """
+        self.preprocess = preprocess
+        self.predict = predict
+        self._problem_id: Optional[str] = None
+        self._features: dict[int, np.ndarray] = {}
+        self._predictions: dict[int, np.ndarray] = {}
+        self._sum: Optional[np.ndarray] = None
+
+    def reset(self, problem_id: Optional[str] = None) -> None:
+        """
+        保持しているデータを全て破棄して、problem_id の問題のデータを保持し始める。
+        """
+        self._problem_id = problem_id
+        self._features.clear()
+        self._predictions.clear()
+        self._sum = None
+
+    def update(self, problem_id: str, chunks: list[Chunk]) -> np.ndarray:
+        """
+        chunks のうちまだ予測していない断片データだけを推論して、全ての予測の平均を返す。
+
+        引数:
+            - problem_id: chunks を取得した問題の ID。
+            - chunks: これまでに取得した断片データのリスト。
+
+        戻り値:
+            chunks の全ての断片データに対する予測の平均。chunks が空のときは空の配列を返す。
+        """
+        if problem_id != self._problem_id:
+            self.reset(problem_id)
+
+        new_chunks = [
+            chunk for chunk in chunks
+            if chunk.segment_index not in self._predictions
+        ]
+        if new_chunks:
+            features = self.preprocess([chunk.wav for chunk in new_chunks])
+            predictions = np.asarray(self.predict(features))
+            for chunk, feature, prediction in zip(
+                new_chunks, features, predictions
+            ):
+                self._features[chunk.segment_index] = feature
+                self._predictions[chunk.segment_index] = prediction
+                self._sum = prediction.astype(np.float64) \
+                    if self._sum is None else self._sum + prediction
+
+        if self._sum is None:
+            return np.zeros(0, dtype=np.float64)
+        if len(self._predictions) == len(chunks):
+            return self._sum / len(self._predictions)
+        # 以前より少ない断片データで呼ばれたときは、その分だけで平均を取る
+        return np.average(
+            [self._predictions[chunk.segment_index] for chunk in chunks],
+            axis=0,
+        )
+
+    def feature(self, segment_index: int) -> Optional[np.ndarray]:
+        """
+        segment_index の断片データの特徴量を返す。まだ前処理していなければ None を返す。
+        """
+        return self._features.get(segment_index)
+
+    def prediction(self, segment_index: int) -> Optional[np.ndarray]:
+        """
+        segment_index の断片データに対する予測を返す。まだ推論していなければ None を返す。
+        """
+        return self._predictions.get(segment_index)
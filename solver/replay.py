@@ -0,0 +1,247 @@
+# sample ディレクトリの問題を断片データを 1 つずつ増やしながら再生し、停止方針ごとに
+# 使った断片データの数と正解率を比べる。
+#
+#     python -m solver.replay --model ml/trained_model/seventh.tf \
+#         --save-predictions temp/replay.npz
+#     python -m solver.replay --predictions temp/replay.npz \
+#         --min-lowest 0.3 0.5 --min-margin 0.1 0.2
+from argparse import ArgumentParser
+from contextlib import redirect_stdout
+from dataclasses import dataclass
+from io import StringIO
+from itertools import product
+import os
+from os.path import isdir, join
+from tempfile import TemporaryDirectory
+from typing import Final
+import numpy as np
+import yaml
+
+from solver.card import CARDS
+from solver.const import ScoreConstant
+from solver.journal import Journal
+from solver.pick_ways import solve_by_threshold_sweep
+from solver.request.meta import Match, Problem
+from solver.request.wav import read_wav_file
+from solver.schedule import ChunkScheduler
+from solver.search import AnswerSearch
+from solver.stopping import StoppingPolicy
+from solver.table import format_table
+
+try:
+    from yaml import CLoader as Loader
+except ImportError:
+    from yaml import Loader
+
+DEFAULT_MIN_LOWEST: Final = [0.0, 0.3, 0.5, 0.7]
+DEFAULT_MIN_MARGIN: Final = [0.0, 0.1, 0.2, 0.4]
+DEFAULT_MIN_PICK_MARGIN: Final = [0.0, 0.15, 0.3, 0.5]
+# 試合の情報がないときに使う、断片データの数ごとのボーナス係数
+DEFAULT_BONUS_FACTOR: Final = [3.0, 2.5, 2.0, 1.5, 1.0]
+
+
+@dataclass(frozen=True)
+class ReplaySample:
+    """
+    再生する 1 つの問題。
+
+    Attributes:
+        name (str): 問題のディレクトリ名。
+        expected (list[int]): 正解の札の 0 から始まる列番号のリスト。
+        predictions (np.ndarray): 断片データごとの予測を並べた (断片データの数, 44) の配列。
+    """
+    name: str
+    expected: list[int]
+    predictions: np.ndarray
+
+
+@dataclass(frozen=True)
+class ReplayResult:
+    policy: StoppingPolicy
+    samples: int
+    mean_chunks: float
+    accuracy: float
+
+
+def predict_samples(sample_dir: str, model_path: str) -> list[ReplaySample]:
+    """
+    sample_dir の各問題の断片データを model_path の Keras のモデルで予測する。
+    """
+    import tensorflow as tf
+    from ml.backend import KerasBackend
+    from ml.maesyori import preprocess_batch
+
+    backend = KerasBackend(
+        tf.keras.models.load_model(model_path, compile=False))
+    samples: list[ReplaySample] = []
+    for name in sorted(os.listdir(sample_dir)):
+        problem_dir = join(sample_dir, name)
+        if not isdir(problem_dir):
+            continue
+        with open(
+            join(problem_dir, 'information.txt'), encoding='utf-8'
+        ) as sample_file:
+            parsed = yaml.load(sample_file, Loader=Loader)
+        waveforms = [
+            read_wav_file(join(problem_dir, f'problem{index}.wav'))[1]
+            for index in range(1, parsed['nsplit'] + 1)
+        ]
+        samples.append(ReplaySample(
+            name=name,
+            expected=sorted({
+                int(speech[1:]) - 1
+                for speech in parsed['speech'].split(',')
+            }),
+            predictions=backend.predict(preprocess_batch(waveforms)),
+        ))
+    return samples
+
+
+def save_predictions(path: str, samples: list[ReplaySample]) -> None:
+    arrays: dict[str, np.ndarray] = {}
+    for sample in samples:
+        arrays[f'{sample.name}/expected'] = np.array(sample.expected)
+        arrays[f'{sample.name}/predictions'] = sample.predictions
+    np.savez(path, **arrays)
+
+
+def load_predictions(path: str) -> list[ReplaySample]:
+    with np.load(path) as arrays:
+        names = sorted({key.split('/')[0] for key in arrays.files})
+        return [
+            ReplaySample(
+                name=name,
+                expected=arrays[f'{name}/expected'].tolist(),
+                predictions=arrays[f'{name}/predictions'],
+            )
+            for name in names
+        ]
+
+
+def replay_sample(
+    policy: StoppingPolicy,
+    sample: ReplaySample,
+    bonus_factor: list[float] = DEFAULT_BONUS_FACTOR,
+) -> tuple[int, list[int]]:
+    """
+    1 つの問題だけの試合として、main.py の find_answers と同じく AnswerSearch で
+    断片データを 1 つずつ増やしながら回答を探す。
+
+    回答期限は十分に先にあるものとし、断片データを増やすかどうかは policy と
+    得点の期待値だけで決まる。
+
+    戻り値:
+        使った断片データの数と、回答した札の 0 から始まる列番号のリストの組。
+    """
+    picks = len(sample.expected)
+    problem = Problem(sample.name, len(sample.predictions), 0, 2 ** 31, picks)
+    with TemporaryDirectory() as temp_dir, redirect_stdout(StringIO()):
+        journal = Journal(temp_dir)
+        journal.load()
+        search = AnswerSearch(
+            ChunkScheduler(clock=lambda: 0.0),
+            policy,
+            Match(1, bonus_factor, 1, 1, 1, 1),
+            ScoreConstant(1, bonus_factor, 1),
+            journal,
+            problem,
+            solve_by_threshold_sweep,
+        )
+        for using_chunks in range(1, problem.chunks + 1):
+            search.use_chunks(using_chunks)
+            fused = np.average(sample.predictions[:using_chunks], axis=0)
+            if not search.step(using_chunks, fused):
+                break
+        answers = search.finish()
+        journal.close()
+    picked = [] if not answers \
+        else [int(answer) - 1 for answer in answers[-1].answers]
+    return (journal.state.used_chunks[sample.name], picked)
+
+
+def replay(
+    policy: StoppingPolicy,
+    samples: list[ReplaySample],
+    bonus_factor: list[float] = DEFAULT_BONUS_FACTOR,
+) -> ReplayResult:
+    """
+    各問題を replay_sample で再生し、回答した時点の断片データの数と正解率を集計する。
+    """
+    used_chunks = 0
+    corrects = 0
+    picks_total = 0
+    for sample in samples:
+        using_chunks, picked = replay_sample(policy, sample, bonus_factor)
+        used_chunks += using_chunks
+        corrects += len(set(picked) & set(sample.expected))
+        picks_total += len(sample.expected)
+    return ReplayResult(
+        policy=policy,
+        samples=len(samples),
+        mean_chunks=used_chunks / max(len(samples), 1),
+        accuracy=corrects / max(picks_total, 1),
+    )
+
+
+def format_results(results: list[ReplayResult]) -> str:
+    header = [
+        'min_lowest', 'min_margin', 'min_pick_margin',
+        'mean_chunks', 'accuracy',
+    ]
+    rows = [
+        [
+            f'{r.policy.min_lowest:g}', f'{r.policy.min_margin:g}',
+            f'{r.policy.min_pick_margin:g}',
+            f'{r.mean_chunks:.2f}', f'{r.accuracy:.3f}',
+        ]
+        for r in results
+    ]
+    return format_table(header, rows)
+
+
+def main() -> None:
+    parser = ArgumentParser(description='停止方針ごとに sample を再生して評価する。')
+    parser.add_argument('--sample-dir', default='sample')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--model', help='予測に使う Keras のモデルのパス')
+    source.add_argument('--predictions', help='保存した予測の .npz のパス')
+    parser.add_argument('--save-predictions', help='予測を .npz に保存するパス')
+    parser.add_argument(
+        '--min-lowest', nargs='+', type=float, default=DEFAULT_MIN_LOWEST)
+    parser.add_argument(
+        '--min-margin', nargs='+', type=float, default=DEFAULT_MIN_MARGIN)
+    parser.add_argument(
+        '--min-pick-margin', nargs='+', type=float,
+        default=DEFAULT_MIN_PICK_MARGIN)
+    parser.add_argument(
+        '--bonus-factor', nargs='+', type=float, default=DEFAULT_BONUS_FACTOR,
+        help='断片データの数ごとのボーナス係数')
+    args = parser.parse_args()
+
+    if args.model is not None:
+        samples = predict_samples(args.sample_dir, args.model)
+    else:
+        samples = load_predictions(args.predictions)
+    if args.save_predictions is not None:
+        save_predictions(args.save_predictions, samples)
+    for sample in samples:
+        if sample.predictions.shape[1:] != (CARDS,):
+            raise ValueError(f'unexpected prediction shape in {sample.name}')
+        if len(args.bonus_factor) < len(sample.predictions):
+            raise ValueError(f'too few bonus factors for {sample.name}')
+
+    results = [
+        replay(
+            StoppingPolicy(lowest, margin, pick_margin), samples,
+            args.bonus_factor)
+        for lowest, margin, pick_margin
+        in product(args.min_lowest, args.min_margin, args.min_pick_margin)
+    ]
+    # 確信度では止めず、得点の見込みだけで断片データを増やすときと比べられるようにする
+    results.append(
+        replay(StoppingPolicy(float('inf')), samples, args.bonus_factor))
+    print(format_results(results))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+from collections import OrderedDict
+from typing import Final, Optional, Tuple
+
+from solver.request.meta import AbstractRequester, Answer, Chunk, \
+    Match, Problem
+
+# 断片データのキャッシュに使うメモリの既定の上限のバイト数
+DEFAULT_MAX_BYTES: Final = 64 * 1024 * 1024
+
+
+class CachingRequester(AbstractRequester):
+    """断片データを問題ごとにキャッシュして、ほかの Requester に処理を委ねるクラス。
+
+    using_chunks を 1 つずつ増やしながら get_chunks を呼んでも、すでに取得した断片データは
+    ダウンロードもデコードもし直さず、新しく必要になった断片データだけを取得する。
+    キャッシュは問題 ID と断片データのファイル名の組で管理し、get_problem で出題中の問題が
+    変わったときに全て破棄する。使うメモリが max_bytes を超えるときは、最も長く使われて
+    いない断片データから破棄する。
+
+    Parameters:
+        requester (AbstractRequester): 実際にリクエストを送る Requester。
+        max_bytes (int): キャッシュしている断片データの音声波形の合計の最大のバイト数。
+    """
+
+    def __init__(
+        self,
+        requester: AbstractRequester,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        self.requester = requester
+        self.max_bytes = max_bytes
+        self._problem_id: Optional[str] = None
+        self._chunks: OrderedDict[Tuple[Optional[str], str], Chunk] = \
+            OrderedDict()
+        self._bytes = 0
+
+    def get_match(self) -> Match:
+        return self.requester.get_match()
+
+    def get_problem(self) -> Problem:
+        problem = self.requester.get_problem()
+        if problem.id != self._problem_id:
+            self.clear()
+            self._problem_id = problem.id
+        return problem
+
+    def get_chunk_names(self, using_chunks: int) -> list[str]:
+        return self.requester.get_chunk_names(using_chunks)
+
+    def fetch_chunks(
+        self,
+        chunk_names: list[str],
+        save_dir: str,
+    ) -> list[Chunk]:
+        found: dict[str, Chunk] = {}
+        missing = self._lookup(chunk_names, found)
+        if missing:
+            fetched = self.requester.fetch_chunks(missing, save_dir)
+            self._store_all(missing, fetched, found)
+        return [found[chunk_name] for chunk_name in chunk_names]
+
+    def post_answer(self, answer: Answer) -> None:
+        self.requester.post_answer(answer)
+
+    async def get_match_async(self) -> Match:
+        return await self.requester.get_match_async()
+
+    async def get_problem_async(self) -> Problem:
+        problem = await self.requester.get_problem_async()
+        if problem.id != self._problem_id:
+            self.clear()
+            self._problem_id = problem.id
+        return problem
+
+    async def get_chunk_names_async(self, using_chunks: int) -> list[str]:
+        return await self.requester.get_chunk_names_async(using_chunks)
+
+    async def fetch_chunks_async(
+        self,
+        chunk_names: list[str],
+        save_dir: str,
+    ) -> list[Chunk]:
+        found: dict[str, Chunk] = {}
+        missing = self._lookup(chunk_names, found)
+        if missing:
+            fetched = await self.requester.fetch_chunks_async(
+                missing, save_dir)
+            self._store_all(missing, fetched, found)
+        return [found[chunk_name] for chunk_name in chunk_names]
+
+    async def post_answer_async(self, answer: Answer) -> None:
+        await self.requester.post_answer_async(answer)
+
+    def cached_bytes(self) -> int:
+        """キャッシュしている断片データの音声波形の合計のバイト数を返す。
+        """
+        return self._bytes
+
+    def clear(self) -> None:
+        """キャッシュしている断片データを全て破棄する。
+        """
+        self._chunks.clear()
+        self._bytes = 0
+
+    def _lookup(
+        self,
+        chunk_names: list[str],
+        found: dict[str, Chunk],
+    ) -> list[str]:
+        # キャッシュにある断片データを found に入れて、ない断片データのファイル名を返す
+        missing: list[str] = []
+        for chunk_name in dict.fromkeys(chunk_names):
+            key = (self._problem_id, chunk_name)
+            if key in self._chunks:
+                # 今回使う断片データは、新しく取得した分で追い出されないようにする
+                self._chunks.move_to_end(key)
+                found[chunk_name] = self._chunks[key]
+            else:
+                missing.append(chunk_name)
+        return missing
+
+    def _store_all(
+        self,
+        chunk_names: list[str],
+        chunks: list[Chunk],
+        found: dict[str, Chunk],
+    ) -> None:
+        for chunk_name, chunk in zip(chunk_names, chunks):
+            self._store(chunk_name, chunk)
+            found[chunk_name] = chunk
+
+    def _store(self, chunk_name: str, chunk: Chunk) -> None:
+        # 1 つだけで上限を超える断片データは、キャッシュせずにそのまま返す
+        if self.max_bytes < chunk.wav.nbytes:
+            return
+        self._chunks[(self._problem_id, chunk_name)] = chunk
+        self._bytes += chunk.wav.nbytes
+        while self.max_bytes < self._bytes:
+            _key, evicted = self._chunks.popitem(last=False)
+            self._bytes -= evicted.wav.nbytes
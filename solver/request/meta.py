@@ -1,4 +1,5 @@
 import abc
+import asyncio
 from dataclasses import dataclass
 import numpy as np
 
@@ -78,9 +79,63 @@ class AbstractRequester(metaclass=abc.ABCMeta):
         pass
 
     @abc.abstractmethod
-    def get_chunks(self, using_chunks: int, save_dir: str) -> list[Chunk]:
+    def get_chunk_names(self, using_chunks: int) -> list[str]:
         pass
 
+    @abc.abstractmethod
+    def fetch_chunks(
+        self,
+        chunk_names: list[str],
+        save_dir: str,
+    ) -> list[Chunk]:
+        pass
+
+    def get_chunks(self, using_chunks: int, save_dir: str) -> list[Chunk]:
+        """現在出題中の問題における断片データのリストを取得する。
+
+        Args:
+            using_chunks (int): 使用する断片データの個数。
+            save_dir (str): 断片データを保存するディレクトリ。
+
+        Returns:
+            list[Chunk]: 断片データのリスト。長さは using_chunks に等しいことが期待される。
+        """
+        return self.fetch_chunks(self.get_chunk_names(using_chunks), save_dir)
+
     @abc.abstractmethod
     def post_answer(self, answer: Answer) -> None:
         pass
+
+    async def get_match_async(self) -> Match:
+        """get_match を別のスレッドで実行する。"""
+        return await asyncio.to_thread(self.get_match)
+
+    async def get_problem_async(self) -> Problem:
+        """get_problem を別のスレッドで実行する。"""
+        return await asyncio.to_thread(self.get_problem)
+
+    async def get_chunk_names_async(self, using_chunks: int) -> list[str]:
+        """get_chunk_names を別のスレッドで実行する。"""
+        return await asyncio.to_thread(self.get_chunk_names, using_chunks)
+
+    async def fetch_chunks_async(
+        self,
+        chunk_names: list[str],
+        save_dir: str,
+    ) -> list[Chunk]:
+        """fetch_chunks を別のスレッドで実行する。"""
+        return await asyncio.to_thread(
+            self.fetch_chunks, chunk_names, save_dir)
+
+    async def get_chunks_async(
+        self,
+        using_chunks: int,
+        save_dir: str,
+    ) -> list[Chunk]:
+        """get_chunks と同じく、現在出題中の問題における断片データのリストを取得する。"""
+        return await self.fetch_chunks_async(
+            await self.get_chunk_names_async(using_chunks), save_dir)
+
+    async def post_answer_async(self, answer: Answer) -> None:
+        """post_answer を別のスレッドで実行する。"""
+        await asyncio.to_thread(self.post_answer, answer)
@@ -1,10 +1,10 @@
 from time import gmtime
 from os.path import join
 from calendar import timegm
-from scipy.io import wavfile
 import yaml
 from solver.request.meta import AbstractRequester, Answer, Chunk, \
     Match, Problem
+from solver.request.wav import read_wav_file
 
 try:
     from yaml import CLoader as Loader
@@ -39,18 +39,34 @@ class MockRequester(AbstractRequester):
             len(self.expected),
         )
 
-    def get_chunks(self, using_chunks: int, _save_dir: str) -> list[Chunk]:
+    def get_chunk_names(self, using_chunks: int) -> list[str]:
+        return [f'problem{idx + 1}.wav' for idx in range(using_chunks)]
+
+    def fetch_chunks(
+        self,
+        chunk_names: list[str],
+        _save_dir: str,
+    ) -> list[Chunk]:
         chunks: list[Chunk] = []
-        for idx in range(using_chunks):
-            chunk_path = join(
-                'sample',
-                self.using_dir,
-                f'problem{idx + 1}.wav',
-            )
-            _sample, wav = wavfile.read(chunk_path)
-            chunks.append(Chunk(idx, wav))
+        for chunk_name in chunk_names:
+            chunk_path = join('sample', self.using_dir, chunk_name)
+            _sample, wav = read_wav_file(chunk_path)
+            index = int(chunk_name[len('problem'):-len('.wav')]) - 1
+            chunks.append(Chunk(index, wav))
         return chunks
 
+    async def get_match_async(self) -> Match:
+        return self.get_match()
+
+    async def get_problem_async(self) -> Problem:
+        return self.get_problem()
+
+    async def get_chunk_names_async(self, using_chunks: int) -> list[str]:
+        return self.get_chunk_names(using_chunks)
+
+    async def post_answer_async(self, answer: Answer) -> None:
+        self.post_answer(answer)
+
     def post_answer(self, answer: Answer) -> None:
         answer.answers.sort()
 
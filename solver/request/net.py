@@ -1,28 +1,98 @@
-from dataclasses import dataclass
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from os.path import join
+from typing import Final, Tuple
 import requests
-from scipy.io import wavfile
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from solver.request.meta import AbstractRequester, Answer, Chunk, \
     Match, Problem
+from solver.request.wav import decode_wav
+
+# 一時的なエラーとして再試行する HTTP ステータスコード
+RETRY_STATUSES: Final = [500, 502, 503, 504]
+# 再試行する HTTP メソッド。POST は断片データの一覧の取得だけで再試行する
+RETRY_METHODS: Final = frozenset(['GET'])
+CHUNK_LIST_RETRY_METHODS: Final = frozenset(['GET', 'POST'])
 
 
 @dataclass(frozen=True)
 class NetRequester(AbstractRequester):
     """問題 API に対してリクエストを送るためのクラス。
 
+    接続はセッションで使い回し、断片データのファイルは並行してダウンロードする。
+    ダウンロードした断片データはディスクを経由せずにメモリ上で読み込み、ファイルへの保存は
+    archive_chunks が True のときだけ別のスレッドで行う。
+
     Parameters:
         endpoint (str): API のエンドポイントの URL。
         token (str): API のエンドポイントで認証するためのトークン。
+        max_workers (int): 断片データを並行してダウンロードする最大の数。
+        connect_timeout (float): 接続を確立するまでのタイムアウトの秒数。
+        read_timeout (float): 応答を受信するまでのタイムアウトの秒数。
+        retries (int): 接続の失敗や一時的なエラーの応答に対して再試行する最大の回数。
+            GET と断片データの一覧を取得する POST を再試行し、回答の POST は再試行しない。
+        archive_chunks (bool): ダウンロードした断片データを save_dir に保存するかどうか。
     """
     endpoint: str
     token: str
+    max_workers: int = 5
+    connect_timeout: float = 3.05
+    read_timeout: float = 10.0
+    retries: int = 3
+    archive_chunks: bool = True
+    _session: requests.Session = field(
+        init=False, repr=False, compare=False)
+    _executor: ThreadPoolExecutor = field(
+        init=False, repr=False, compare=False)
+    _archiver: ThreadPoolExecutor = field(
+        init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        session = requests.Session()
+        adapter = self.__adapter(RETRY_METHODS)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        # 使った断片データの数はサーバーが数え終えているので、同じ数で一覧を取得し直しても
+        # 記録は変わらない。この URL の下の断片データのダウンロードもこのアダプターを通る
+        session.mount(
+            f'{self.endpoint}/problem/chunks',
+            self.__adapter(CHUNK_LIST_RETRY_METHODS),
+        )
+        session.headers.update(self.__headers())
+        object.__setattr__(self, '_session', session)
+        object.__setattr__(self, '_executor', ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix='chunk-download',
+        ))
+        object.__setattr__(self, '_archiver', ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix='chunk-archive',
+        ))
+
+    def __adapter(self, methods: frozenset[str]) -> HTTPAdapter:
+        return HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.max_workers,
+            max_retries=Retry(
+                total=self.retries,
+                backoff_factor=0.1,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=methods,
+                raise_on_status=False,
+            ),
+        )
 
     def __headers(self) -> dict[str, str]:
         return {
             'procon-token': self.token
         }
 
+    def __timeout(self) -> Tuple[float, float]:
+        return (self.connect_timeout, self.read_timeout)
+
     def get_match(self) -> Match:
         """試合全体を通して変化しない、問題全体で共通の情報を取得する。
 
@@ -33,7 +103,10 @@ class NetRequester(AbstractRequester):
         Returns:
             Match: 試合の情報。
         """
-        res = requests.get(f'{self.endpoint}/match', headers=self.__headers())
+        res = self._session.get(
+            f'{self.endpoint}/match',
+            timeout=self.__timeout(),
+        )
         if not res.ok:
             raise Exception(res.text)
         return Match(**res.json())
@@ -48,16 +121,16 @@ class NetRequester(AbstractRequester):
         Returns:
             Problem: 問題の情報。
         """
-        res = requests.get(
+        res = self._session.get(
             f'{self.endpoint}/problem',
-            headers=self.__headers()
+            timeout=self.__timeout(),
         )
         if not res.ok:
             raise Exception(res.text)
         return Problem(**res.json())
 
-    def get_chunks(self, using_chunks: int, save_dir: str) -> list[Chunk]:
-        """現在出題中の問題における断片データのリストを取得する。
+    def get_chunk_names(self, using_chunks: int) -> list[str]:
+        """現在出題中の問題における断片データのファイル名のリストを取得する。
 
         Args:
             using_chunks (int): 使用する断片データの個数。使用した断片データの個数は記録されるため、少ない数から試すこと。
@@ -68,34 +141,72 @@ class NetRequester(AbstractRequester):
             FormatError: Problem の chunks の値よりも大きい数が指定されたなど、不正な入力データ
 
         Returns:
-            list[Chunk]: 断片データのリスト。長さは using_chunks に等しいことが期待される。
+            list[str]: 断片データのファイル名のリスト。長さは using_chunks に等しいことが期待される。
         """
-        chunks_res = requests.post(
+        chunks_res = self._session.post(
             f'{self.endpoint}/problem/chunks',
-            headers=self.__headers(),
-            params={'n': using_chunks}
+            params={'n': using_chunks},
+            timeout=self.__timeout(),
         )
         if not chunks_res.ok:
             raise Exception(f"{chunks_res.status_code} {chunks_res.text}")
-        chunks: list[Chunk] = []
-        for chunk_filename in chunks_res.json()['chunks']:
-            index = int(chunk_filename.split("_")[0][7:])
-            file_res = requests.get(
-                f'{self.endpoint}/problem/chunks/{chunk_filename}',
-                headers=self.__headers(),
-                stream=True
-            )
-            if not file_res.ok:
-                raise Exception(file_res.text)
-
-            wav_path = join(save_dir, chunk_filename)
-            with open(wav_path, 'wb') as f:
-                f.truncate()
-                f.write(file_res.content)
-
-            _rate, wav = wavfile.read(wav_path)
-            chunks.append(Chunk(segment_index=index, wav=wav))
-        return chunks
+        return chunks_res.json()['chunks']
+
+    def fetch_chunks(
+        self,
+        chunk_names: list[str],
+        save_dir: str,
+    ) -> list[Chunk]:
+        """断片データのファイルを並行してダウンロードする。
+
+        Args:
+            chunk_names (list[str]): get_chunk_names で取得した断片データのファイル名のリスト。
+            save_dir (str): archive_chunks が True のときに断片データを保存するディレクトリ。
+
+        Raises:
+            InvalidToken: トークンが不正
+            AccessTimeError: 回答時間外のリクエスト
+
+        Returns:
+            list[Chunk]: chunk_names と同じ順に並べた断片データのリスト。
+        """
+        return list(self._executor.map(
+            lambda chunk_name: self.__get_chunk(chunk_name, save_dir),
+            chunk_names,
+        ))
+
+    async def fetch_chunks_async(
+        self,
+        chunk_names: list[str],
+        save_dir: str,
+    ) -> list[Chunk]:
+        """fetch_chunks と同じく、断片データのファイルを並行してダウンロードする。
+
+        ダウンロードは fetch_chunks と同じスレッドプールで行い、イベントループは止めない。
+        """
+        loop = asyncio.get_running_loop()
+        return list(await asyncio.gather(*(
+            loop.run_in_executor(
+                self._executor, self.__get_chunk, chunk_name, save_dir)
+            for chunk_name in chunk_names
+        )))
+
+    def __get_chunk(self, chunk_filename: str, save_dir: str) -> Chunk:
+        index = int(chunk_filename.split("_")[0][7:])
+        file_res = self._session.get(
+            f'{self.endpoint}/problem/chunks/{chunk_filename}',
+            timeout=self.__timeout(),
+        )
+        if not file_res.ok:
+            raise Exception(file_res.text)
+
+        content = file_res.content
+        if self.archive_chunks:
+            self._archiver.submit(
+                _archive, join(save_dir, chunk_filename), content)
+
+        _rate, wav = decode_wav(content)
+        return Chunk(segment_index=index, wav=wav)
 
     def post_answer(self, answer: Answer) -> None:
         """指定の問題に対して回答する。出題中の問題よりも過去の問題に対して、回答を再提出することもできる。
@@ -109,18 +220,22 @@ class NetRequester(AbstractRequester):
             TooLargeRequestError: 送信内容の JSON の本文が 1024 バイトを超えた
             FormatError: 無効な問題 ID など、入力形式が不正
         """
-        headers = {
-            'Content-Type': 'application/json'
-        }
-        headers.update(self.__headers())
-        res = requests.post(
+        res = self._session.post(
             f'{self.endpoint}/problem',
-            headers=headers,
             json={
                 'problem_id': answer.problem_id,
                 'answers': answer.answers,
             },
+            timeout=self.__timeout(),
         )
         if not res.ok:
             raise Exception(res.text)
         print(res.text)
+
+
+def _archive(path: str, content: bytes) -> None:
+    try:
+        with open(path, 'wb') as f:
+            f.write(content)
+    except OSError as e:
+        print(f'failed to archive chunk to {path}: {e}')
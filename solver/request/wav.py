@@ -0,0 +1,83 @@
+from mmap import ACCESS_READ, mmap
+import struct
+from typing import Final, Tuple, Union
+import numpy as np
+
+WAVE_FORMAT_PCM: Final = 0x0001
+WAVE_FORMAT_IEEE_FLOAT: Final = 0x0003
+WAVE_FORMAT_EXTENSIBLE: Final = 0xFFFE
+
+
+def decode_wav(buffer: Union[bytes, bytearray, memoryview, mmap]) \
+        -> Tuple[int, np.ndarray]:
+    """WAV ファイルの内容を解析し、サンプルをコピーせずに配列として返す。
+
+    返す配列は buffer をそのまま参照する読み取り専用のビューである。
+    scipy.io.wavfile.read と同じく、16 ビットの PCM なら要素の型は int16 になり、
+    チャンネルが複数あるときは (サンプル数, チャンネル数) の形になる。
+
+    Args:
+        buffer: WAV ファイル全体のバイト列。
+
+    Raises:
+        ValueError: RIFF/WAVE の形式として不正、または対応していないサンプルの形式
+
+    Returns:
+        Tuple[int, np.ndarray]: サンプリングレートとサンプルの配列の組。
+    """
+    view = memoryview(buffer)
+    if len(view) < 12 or view[0:4] != b'RIFF' or view[8:12] != b'WAVE':
+        raise ValueError('buffer is not a RIFF/WAVE file')
+
+    dtype = None
+    channels = 1
+    rate = 0
+    offset = 12
+    while offset + 8 <= len(view):
+        chunk_id = view[offset:offset + 4].tobytes()
+        size, = struct.unpack_from('<I', view, offset + 4)
+        body = offset + 8
+        if chunk_id == b'fmt ':
+            audio_format, channels, rate, _byte_rate, _block_align, bits = \
+                struct.unpack_from('<HHIIHH', view, body)
+            if audio_format == WAVE_FORMAT_EXTENSIBLE:
+                audio_format, = struct.unpack_from('<H', view, body + 24)
+            dtype = _sample_dtype(audio_format, bits)
+        elif chunk_id == b'data':
+            if dtype is None:
+                raise ValueError('data chunk appeared before fmt chunk')
+            # 途中で切れたファイルでも、揃っている分のサンプルは読む
+            size = min(size, len(view) - body)
+            count = size // (dtype.itemsize * channels) * channels
+            data = np.frombuffer(view, dtype=dtype, count=count, offset=body)
+            if 1 < channels:
+                data = data.reshape(-1, channels)
+            return (rate, data)
+        offset = body + size + (size & 1)
+    raise ValueError('data chunk was not found')
+
+
+def read_wav_file(path: str) -> Tuple[int, np.ndarray]:
+    """WAV ファイルをメモリマップして、サンプルをコピーせずに読み込む。
+
+    Args:
+        path (str): WAV ファイルのパス。
+
+    Returns:
+        Tuple[int, np.ndarray]: サンプリングレートとサンプルの配列の組。
+    """
+    with open(path, 'rb') as f:
+        mapped = mmap(f.fileno(), 0, access=ACCESS_READ)
+    return decode_wav(mapped)
+
+
+def _sample_dtype(audio_format: int, bits: int) -> np.dtype:
+    if audio_format == WAVE_FORMAT_PCM:
+        if bits == 8:
+            return np.dtype('u1')
+        if bits in (16, 32, 64):
+            return np.dtype(f'<i{bits // 8}')
+    if audio_format == WAVE_FORMAT_IEEE_FLOAT and bits in (32, 64):
+        return np.dtype(f'<f{bits // 8}')
+    raise ValueError(
+        f'unsupported sample format: format {audio_format}, {bits} bits')
@@ -0,0 +1,130 @@
+from contextlib import contextmanager
+from functools import wraps
+from time import perf_counter, time
+from typing import Callable, Final, Iterator, TypeVar
+
+from solver.const import ScoreConstant
+from solver.request.meta import Problem
+from solver.score import calc_score
+
+# 断片データを 1 つ増やすたびに実行する処理の段階
+STAGES: Final = ('fetch', 'journal', 'preprocess', 'inference', 'solve')
+# 所要時間の指数移動平均で、新しい計測値にかける重み
+SMOOTHING: Final = 0.5
+
+T = TypeVar('T', bound=Callable)
+
+
+class ChunkScheduler:
+    """
+    断片データを増やすたびにかかる時間を段階ごとに計測し、回答期限と得点の期待値から
+    断片データをもう 1 つ使うかどうかを決める。
+
+    各段階の所要時間は指数移動平均で見積もり、次の断片データを使った処理が
+    回答期限の margin 秒前までに終わらないと見込まれるときは、それ以上増やさない。
+    """
+
+    def __init__(
+        self,
+        margin: float = 1.0,
+        clock: Callable[[], float] = time,
+    ) -> None:
+        """
+        引数:
+            - margin: 回答の送信に使うために、回答期限より前に処理を終える秒数。
+            - clock: 現在時刻を UNIX エポックの秒数で返す関数。
+        """
+        self.margin = margin
+        self.clock = clock
+        self._seconds: dict[str, float] = {}
+        self._deadline = float('inf')
+
+    def start(self, problem: Problem) -> None:
+        """
+        problem の回答期限を、これから処理する問題の期限として設定する。
+        """
+        self._deadline = float(problem.start_at + problem.time_limit)
+
+    def remaining(self) -> float:
+        """
+        回答期限の margin 秒前までの残りの秒数を返す。
+        """
+        return self._deadline - self.margin - self.clock()
+
+    def record(self, stage: str, seconds: float) -> None:
+        """
+        stage の段階にかかった秒数を記録する。
+        """
+        if stage in self._seconds:
+            seconds = SMOOTHING * seconds \
+                + (1 - SMOOTHING) * self._seconds[stage]
+        self._seconds[stage] = seconds
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        """
+        with 文の中の処理にかかった時間を stage の段階の所要時間として記録する。
+        """
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, perf_counter() - start)
+
+    def timed(self, stage: str, function: T) -> T:
+        """
+        呼び出しにかかった時間を stage の段階の所要時間として記録するように function を包む。
+        """
+        @wraps(function)
+        def timed_function(*args, **kwargs):
+            with self.measure(stage):
+                return function(*args, **kwargs)
+        return timed_function  # type: ignore
+
+    def stage_seconds(self, stage: str) -> float:
+        """
+        stage の段階の所要時間の見積もりを返す。まだ計測していなければ 0 を返す。
+        """
+        return self._seconds.get(stage, 0.0)
+
+    def step_seconds(self) -> float:
+        """
+        断片データを 1 つ増やしたときに、全ての段階にかかる時間の見積もりを返す。
+        """
+        return sum(self.stage_seconds(stage) for stage in STAGES)
+
+    def fits_next(self) -> bool:
+        """
+        断片データをもう 1 つ使っても、回答期限の margin 秒前までに処理が終わるかを返す。
+        """
+        return self.step_seconds() <= self.remaining()
+
+    def should_escalate(
+        self,
+        problem: Problem,
+        using_chunks: int,
+        expected_corrects: float,
+        fails: int,
+        const: ScoreConstant,
+    ) -> bool:
+        """
+        断片データを using_chunks から 1 つ増やすべきかを返す。
+
+        次の断片データで全ての札を正解できたとしても、今の回答の得点の期待値を
+        超えないときや、回答期限に間に合わないと見込まれるときは増やさない。
+
+        引数:
+            - problem: 回答している問題。
+            - using_chunks: 今の回答に使った断片データの個数。
+            - expected_corrects: 今の回答で正解する札の数の期待値。
+            - fails: これまでのお手付きの数。
+            - const: 得点の計算に使う定数。
+
+        戻り値:
+            断片データをもう 1 つ使うべきなら True。
+        """
+        if problem.chunks <= using_chunks or not self.fits_next():
+            return False
+        current = calc_score(expected_corrects, fails, using_chunks, const)
+        best_next = calc_score(problem.data, fails, using_chunks + 1, const)
+        return current < best_next
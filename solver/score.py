@@ -1,23 +1,4 @@
-from solver.card import ShouldPickCardsByProblem
 from solver.const import ScoreConstant
-from solver.state import SolverState
-
-
-def current_score(
-    state: SolverState,
-    should_picks: ShouldPickCardsByProblem,
-    const: ScoreConstant,
-) -> float:
-    """
-    現在の回答状況からスコアを計算する。
-    """
-    point = 0.0
-    for problem in should_picks.problems():
-        picks = should_picks.picks_on(problem)
-        point += picks * const.score_per_correct * \
-            const.bonus_by_used_data[state.used_chunks[problem]]
-    point -= state.current_fails * const.score_per_fail
-    return point
 
 
 def calc_score(
@@ -28,8 +9,9 @@ def calc_score(
 ) -> float:
     """
     正解数、お手付きの数、使用した分割データの数から得点を算出する。
+    ボーナス係数は、使用した分割データが n 個のときに n 番目のものを使う。
     """
     point = corrects * const.score_per_correct * \
-        const.bonus_by_used_data[used_data]
+        const.bonus_by_used_data[used_data - 1]
     deduct = fails * const.score_per_fail
     return point - deduct
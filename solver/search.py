@@ -0,0 +1,161 @@
+from typing import Optional
+import numpy as np
+
+from solver.card import CardIndex
+from solver.const import ScoreConstant
+from solver.journal import Journal
+from solver.pick_ways import Solver, calc_pick_probabilities
+from solver.request.meta import Answer, Match, Problem
+from solver.schedule import ChunkScheduler
+from solver.state import SolverState
+from solver.stopping import StoppingPolicy
+
+
+class AnswerSearch:
+    """
+    1 つの問題について、断片データを 1 つずつ増やしながら最も良い回答を探す。
+
+    断片データの取得と推論は呼び出し側が行い、ここでは取り方の探索と、
+    断片データをさらに増やすかどうかの判断を行う。
+    """
+
+    def __init__(
+        self,
+        scheduler: ChunkScheduler,
+        policy: StoppingPolicy,
+        match: Match,
+        score_const: ScoreConstant,
+        journal: Journal,
+        problem: Problem,
+        solve_ways: Solver,
+    ) -> None:
+        self.scheduler = scheduler
+        self.policy = policy
+        self.match = match
+        self.score_const = score_const
+        self.journal = journal
+        self.should = journal.should
+        self.current_state = journal.state
+        self.problem = problem
+        self.solve_ways = solve_ways
+
+        self.current_state.current_problem_id = problem.id
+        scheduler.start(problem)
+        self.latest: Optional[list[list[CardIndex]]] = None
+        self._previous_answers: Optional[list[str]] = None
+        self._added_fails = 0
+
+    def can_use_next(self) -> bool:
+        """
+        回答期限までに、断片データをもう 1 つ使って処理できるかを返す。
+        """
+        if self.latest is not None and not self.scheduler.fits_next():
+            print('no time left for another chunk, submitting the latest one')
+            return False
+        return True
+
+    def use_chunks(self, using_chunks: int) -> None:
+        self.current_state.used_chunks[self.problem.id] = max(
+            self.current_state.used_chunks.get(self.problem.id, 0),
+            using_chunks,
+        )
+        # 使った断片データの数は競技システムに記録されるので、すぐに保存する
+        self.journal.record_state(self.problem.id)
+
+    def step(self, using_chunks: int, prediction_avg: np.ndarray) -> bool:
+        """
+        using_chunks 個の断片データの予測の平均から取り方を探索し、断片データを増やすべきかを返す。
+        """
+        problem = self.problem
+        self.should.insert_all(problem.id, prediction_avg)
+        self.should.set_picks_on(problem.id, problem.data)
+        self.journal.record_row(problem.id)
+
+        with self.scheduler.measure('solve'):
+            solution = self.solve_ways(self.match.problems, self.should)
+        if solution is None:
+            print(f'solution not found with using {using_chunks} chunks')
+            return True
+
+        picks_by_problem, acc = solution
+        # 断片データを増やすほど予測の平均は確かになり、使った断片データの数は
+        # 競技システムに記録済みでボーナスは戻らないので、最後に見つかった取り方を回答する
+        self.latest = picks_by_problem
+        # この問題で取る札の確率の和を、正解する札の数の期待値とする
+        row = list(self.should.problems()).index(problem.id)
+        probabilities = self.should.row(problem.id)
+        expected_corrects = float(sum(
+            probabilities[hash(card) - 1]
+            for card in picks_by_problem[row]
+        )) if row < len(picks_by_problem) else 0.0
+
+        if self.policy.should_stop(
+            prediction_avg,
+            calc_pick_probabilities(self.should)[row],
+            problem.data,
+        ):
+            print(f'confident enough with {using_chunks} chunks')
+            return False
+        if not self.scheduler.should_escalate(
+            problem, using_chunks, expected_corrects,
+            self.current_state.current_fails, self.score_const,
+        ):
+            return False
+        print(
+            f'expected {expected_corrects:.2f} corrects with '
+            f'{using_chunks} chunks, using another chunk'
+        )
+        return True
+
+    def finish(self) -> list[Answer]:
+        """
+        最後に見つかった取り方を回答にして、進捗を保存する。
+        """
+        if self.latest is None:
+            return []
+        self._previous_answers = \
+            self.current_state.past_answers.get(self.problem.id)
+        fails = self.current_state.current_fails
+        answers = build_answers(self.problem, self.latest, self.current_state)
+        self._added_fails = self.current_state.current_fails - fails
+        self.journal.record_state(self.problem.id)
+        return answers
+
+    def roll_back(self) -> None:
+        """
+        回答を送信できなかったときに、finish で回答済みにした状態を元に戻して保存する。
+        """
+        state = self.current_state
+        state.current_fails -= self._added_fails
+        self._added_fails = 0
+        if self._previous_answers is None:
+            state.past_answers.pop(self.problem.id, None)
+        else:
+            state.past_answers[self.problem.id] = self._previous_answers
+        self.journal.record_state(self.problem.id)
+
+
+def build_answers(
+    problem: Problem,
+    picks_by_problem: list[list[CardIndex]],
+    current_state: SolverState,
+) -> list[Answer]:
+    answers: list[Answer] = []
+    for picks in picks_by_problem:
+        new_answer = Answer(
+            problem_id=problem.id,
+            answers=list(map(
+                lambda card_index: card_index.as_0_pad(),
+                picks,
+            )),
+        )
+        if problem.id in current_state.past_answers:
+            new_taking_set = set(new_answer.answers)
+            old_taking_set = set(
+                current_state.past_answers[problem.id])
+            retaken_cards = len(
+                new_taking_set.difference(old_taking_set))
+            current_state.current_fails += retaken_cards
+        current_state.past_answers[problem.id] = new_answer.answers
+        answers.append(new_answer)
+    return answers
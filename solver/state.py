@@ -1,6 +1,8 @@
 from dataclasses import dataclass
 import yaml
 
+from solver.atomic import write_atomically
+
 try:
     from yaml import CLoader as Loader, CDumper as Dumper
 except ImportError:
@@ -20,10 +22,8 @@ class SolverState:
             'current_fails': self.current_fails,
             'using_chunks': self.used_chunks,
             'past_answers': self.past_answers,
-        }, Dumper=Dumper)
-        with open(path, 'w') as f:
-            f.truncate()
-            f.write(output)
+        }, Dumper=Dumper, sort_keys=False)
+        write_atomically(path, output)
 
 
 def solver_state_from_yaml(path: str) -> SolverState:
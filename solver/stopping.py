@@ -0,0 +1,93 @@
+from dataclasses import dataclass
+import numpy as np
+
+
+@dataclass(frozen=True)
+class Confidence:
+    """
+    ある問題の予測について、取るべき札をどれだけ確信しているかを表す。
+
+    Attributes:
+        lowest (float): 確率の高い順に picks 枚選んだ札のうち、最も低い確率。
+        margin (float): picks 番目と picks + 1 番目に高い確率の差。
+        pick_margin (float): 試合全体を通した確率を行の最大値で割った値で、picks 番目と
+            picks + 1 番目に高い値の差。
+    """
+    lowest: float
+    margin: float
+    pick_margin: float
+
+
+@dataclass(frozen=True)
+class StoppingPolicy:
+    """
+    断片データを統合した予測の確信度から、今の断片データの数で回答するかを決める。
+
+    Attributes:
+        min_lowest (float): 選んだ札の確率の最小値がこれ以上なら回答する。
+        min_margin (float): 選んだ札と選ばなかった札の確率の差がこれ以上なら回答する。
+        min_pick_margin (float): 試合全体を通した確率の差がこれ以上なら回答する。
+            試合全体を通した確率は後の問題ほど桁が大きくなるので、行の最大値に対する割合で比べる。
+    """
+    min_lowest: float = 0.5
+    min_margin: float = 0.2
+    min_pick_margin: float = 0.15
+
+    def confidence(
+        self,
+        probabilities: np.ndarray,
+        pick_probabilities: np.ndarray,
+        picks: int,
+    ) -> Confidence:
+        """
+        ある問題の予測の確信度を求める。
+
+        引数:
+            - probabilities: 断片データを統合した、各札が含まれている確率。
+            - pick_probabilities: calc_pick_probabilities で求めた、この問題の行。
+            - picks: この問題で取るべき札の数。
+
+        戻り値:
+            予測の確信度。
+        """
+        return Confidence(
+            lowest=_kth_largest(probabilities, picks),
+            margin=_gap_after(probabilities, picks),
+            pick_margin=_gap_after(_relative(pick_probabilities), picks),
+        )
+
+    def should_stop(
+        self,
+        probabilities: np.ndarray,
+        pick_probabilities: np.ndarray,
+        picks: int,
+    ) -> bool:
+        """
+        今の断片データの数で回答してよいほど確信しているかを返す。
+
+        引数と戻り値の意味は confidence と同じく、全てのしきい値を満たすときに True を返す。
+        """
+        confidence = self.confidence(probabilities, pick_probabilities, picks)
+        return self.min_lowest <= confidence.lowest \
+            and self.min_margin <= confidence.margin \
+            and self.min_pick_margin <= confidence.pick_margin
+
+
+def _relative(values: np.ndarray) -> np.ndarray:
+    if len(values) == 0 or values.max() <= 0:
+        return values
+    return values / values.max()
+
+
+def _kth_largest(values: np.ndarray, k: int) -> float:
+    if k <= 0 or len(values) < k:
+        return 0.0
+    return float(np.partition(values, len(values) - k)[len(values) - k])
+
+
+def _gap_after(values: np.ndarray, k: int) -> float:
+    if k <= 0 or len(values) < k:
+        return 0.0
+    if len(values) == k:
+        return _kth_largest(values, k)
+    return _kth_largest(values, k) - _kth_largest(values, k + 1)
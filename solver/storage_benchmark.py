@@ -0,0 +1,126 @@
+# 札の確率を YAML と .npz で保存、読み込みする時間とファイルの大きさを計測する。
+#
+#     python -m solver.storage_benchmark
+#     python -m solver.storage_benchmark --json --problems 10 100 1000
+from argparse import ArgumentParser
+from dataclasses import asdict, dataclass
+import json
+from os.path import getsize, join
+from statistics import median
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Callable, Final
+
+from solver.benchmark import generate_match
+from solver.card import ShouldPickCardsByProblem, \
+    should_pick_cards_from_npz, should_pick_cards_from_yaml
+from solver.table import format_table
+
+DEFAULT_PROBLEMS: Final = [10, 100, 1000]
+DEFAULT_REPEAT: Final = 5
+
+# 形式の名前と、保存する関数と読み込む関数の組
+FORMATS: Final[dict[str, tuple[
+    Callable[[ShouldPickCardsByProblem, str], None],
+    Callable[[str], ShouldPickCardsByProblem],
+]]] = {
+    'yaml': (
+        ShouldPickCardsByProblem.save_yaml, should_pick_cards_from_yaml),
+    'npz': (
+        ShouldPickCardsByProblem.save_npz,
+        lambda path: should_pick_cards_from_npz(path, mmap=False)),
+    'npz_mmap': (
+        ShouldPickCardsByProblem.save_npz, should_pick_cards_from_npz),
+}
+
+
+@dataclass(frozen=True)
+class StorageResult:
+    format: str
+    problems: int
+    save_seconds: float
+    load_seconds: float
+    file_bytes: int
+
+
+def run_case(
+    name: str,
+    should: ShouldPickCardsByProblem,
+    directory: str,
+    repeat: int,
+) -> StorageResult:
+    """
+    1 つのデータを name の形式で repeat 回ずつ保存、読み込みし、所要時間の中央値を求める。
+    """
+    save, load = FORMATS[name]
+    path = join(directory, f'pick-cards.{name}')
+    save_seconds: list[float] = []
+    load_seconds: list[float] = []
+    for _ in range(repeat):
+        start = perf_counter()
+        save(should, path)
+        save_seconds.append(perf_counter() - start)
+
+        start = perf_counter()
+        loaded = load(path)
+        # メモリマップでは読み込みが遅れるので、行列全体に触れるまでを計測する
+        loaded.matrix().sum()
+        load_seconds.append(perf_counter() - start)
+    return StorageResult(
+        format=name,
+        problems=should.problem_count(),
+        save_seconds=median(save_seconds),
+        load_seconds=median(load_seconds),
+        file_bytes=getsize(path),
+    )
+
+
+def run_benchmark(
+    formats: list[str],
+    problems_list: list[int],
+    repeat: int = DEFAULT_REPEAT,
+    seed: int = 0,
+) -> list[StorageResult]:
+    results: list[StorageResult] = []
+    with TemporaryDirectory() as temp_dir:
+        for problems in problems_list:
+            should = generate_match(seed, problems, 3, 2.0)
+            for name in formats:
+                results.append(run_case(name, should, temp_dir, repeat))
+    return results
+
+
+def format_results(results: list[StorageResult]) -> str:
+    header = ['format', 'problems', 'save_ms', 'load_ms', 'kib']
+    rows = [
+        [
+            r.format, str(r.problems),
+            f'{r.save_seconds * 1000:.3f}', f'{r.load_seconds * 1000:.3f}',
+            f'{r.file_bytes / 1024:.1f}',
+        ]
+        for r in results
+    ]
+    return format_table(header, rows)
+
+
+def main() -> None:
+    parser = ArgumentParser(description='札の確率の保存形式のベンチマークを実行する。')
+    parser.add_argument(
+        '--formats', nargs='+', choices=list(FORMATS), default=list(FORMATS))
+    parser.add_argument(
+        '--problems', nargs='+', type=int, default=DEFAULT_PROBLEMS)
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    results = run_benchmark(
+        args.formats, args.problems, repeat=args.repeat, seed=args.seed)
+    if args.json:
+        print(json.dumps([asdict(r) for r in results], indent=2))
+    else:
+        print(format_results(results))
+
+
+if __name__ == '__main__':
+    main()
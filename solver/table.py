@@ -0,0 +1,17 @@
+def format_table(header: list[str], rows: list[list[str]]) -> str:
+    """
+    ベンチマークなどの結果を、列ごとに右揃えした表の文字列にする。
+
+    引数:
+        - header: 各列の見出し。
+        - rows: 各行のセルの文字列のリスト。各行の長さは header と同じにする。
+
+    戻り値:
+        見出しの行に続けて各行を並べ、列の間を 2 つの空白で区切った文字列。
+    """
+    lines = [header] + rows
+    widths = [max(len(line[i]) for line in lines) for i in range(len(header))]
+    return '\n'.join(
+        '  '.join(cell.rjust(width) for cell, width in zip(line, widths))
+        for line in lines
+    )
@@ -0,0 +1,76 @@
+from time import monotonic
+from unittest import TestCase
+
+import numpy as np
+
+from solver.anytime import solve_anytime
+from solver.card import CardIndex, ShouldPickCardsByProblem
+from solver.pick_ways import solve_by_threshold_sweep
+
+
+class AnytimeTestCase(TestCase):
+    def test_same_threshold_as_sweep(self):
+        rng = np.random.default_rng(0)
+        for _ in range(20):
+            rounds = int(rng.integers(1, 8))
+            should_pick_sets = ShouldPickCardsByProblem()
+            for problem in range(rounds):
+                should_pick_sets.insert_all(
+                    str(problem),
+                    rng.random(44) * (rng.random(44) < 0.5),
+                )
+                should_pick_sets.set_picks_on(
+                    str(problem), int(rng.integers(1, 4)))
+
+            expected = solve_by_threshold_sweep(rounds, should_pick_sets)
+            actual = solve_anytime(
+                rounds, should_pick_sets, monotonic() + 60.0)
+
+            if expected is None:
+                self.assertIsNone(actual)
+                continue
+            self.assertIsNotNone(actual)
+            self.assertTrue(actual.optimal)
+            self.assertEqual(actual.threshold, expected[1])
+
+    def test_past_deadline(self):
+        """
+        1. [い, う]
+        2. [あ, い]
+        3. [い, え]
+        4. [え]
+        """
+        rounds = 4
+        should_pick_sets = ShouldPickCardsByProblem()
+        should_pick_sets.set_picks_on('0', 1)
+        should_pick_sets.insert('0', CardIndex.from_kana('い'), 0.5)
+        should_pick_sets.insert('0', CardIndex.from_kana('う'), 0.5)
+        should_pick_sets.set_picks_on('1', 1)
+        should_pick_sets.insert('1', CardIndex.from_kana('あ'), 0.5)
+        should_pick_sets.insert('1', CardIndex.from_kana('い'), 0.5)
+        should_pick_sets.set_picks_on('2', 1)
+        should_pick_sets.insert('2', CardIndex.from_kana('い'), 0.5)
+        should_pick_sets.insert('2', CardIndex.from_kana('え'), 0.5)
+        should_pick_sets.set_picks_on('3', 1)
+        should_pick_sets.insert('3', CardIndex.from_kana('え'), 1.0)
+
+        answer = solve_anytime(rounds, should_pick_sets, monotonic() - 1.0)
+
+        self.assertIsNotNone(answer)
+        self.assertEqual(answer.ways, [
+            [CardIndex.from_kana('う')],
+            [CardIndex.from_kana('あ')],
+            [CardIndex.from_kana('い')],
+            [CardIndex.from_kana('え')]
+        ])
+        self.assertEqual(answer.threshold, 0.25)
+
+    def test_not_found(self):
+        should_pick_sets = ShouldPickCardsByProblem()
+        should_pick_sets.set_picks_on('0', 1)
+        should_pick_sets.insert('0', CardIndex.from_kana('あ'), 0.5)
+        should_pick_sets.set_picks_on('1', 1)
+        should_pick_sets.insert('1', CardIndex.from_kana('あ'), 0.5)
+
+        self.assertIsNone(
+            solve_anytime(2, should_pick_sets, monotonic() + 60.0))
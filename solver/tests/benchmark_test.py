@@ -0,0 +1,46 @@
+from unittest import TestCase
+
+import numpy as np
+
+from solver.benchmark import format_results, generate_match, run_benchmark
+from solver import storage_benchmark
+from solver.table import format_table
+
+
+class BenchmarkTestCase(TestCase):
+    def test_generate_match(self):
+        first = generate_match(3, 5, 4, 2.0)
+        second = generate_match(3, 5, 4, 2.0)
+
+        self.assertEqual(first.problem_count(), 5)
+        self.assertEqual(first.picks_array().tolist(), [4] * 5)
+        self.assertTrue(np.array_equal(first.matrix(), second.matrix()))
+
+    def test_exact_solvers_agree(self):
+        results = list(run_benchmark(
+            ['threshold_sweep', 'incremental', 'anytime'],
+            [1, 5, 11],
+            [3, 4],
+            [2.0],
+        ))
+
+        self.assertEqual(len(results), 3 * 6 * 2)
+        for i in range(0, len(results), 3):
+            thresholds = {result.threshold for result in results[i:i + 3]}
+            self.assertEqual(len(thresholds), 1)
+            self.assertTrue(all(result.found for result in results[i:i + 3]))
+        self.assertIn('threshold_sweep', format_results(results))
+
+    def test_storage_benchmark(self):
+        results = storage_benchmark.run_benchmark(
+            list(storage_benchmark.FORMATS), [1, 10], repeat=1)
+
+        self.assertEqual(len(results), 2 * len(storage_benchmark.FORMATS))
+        self.assertTrue(all(result.file_bytes > 0 for result in results))
+        self.assertIn('npz_mmap', storage_benchmark.format_results(results))
+
+    def test_format_table(self):
+        self.assertEqual(
+            format_table(['name', 'n'], [['a', '10'], ['long', '2']]),
+            'name   n\n   a  10\nlong   2',
+        )
@@ -0,0 +1,62 @@
+import asyncio
+from unittest import TestCase
+
+from solver.request.cache import CachingRequester
+from solver.request.meta import Problem
+from solver.tests.fake_requester import FakeRequester
+
+
+class CachingRequesterTestCase(TestCase):
+    def test_fetch_only_new_chunks(self):
+        fake = FakeRequester([Problem('p1', 3, 0, 60, 3)])
+        req = CachingRequester(fake)
+        req.get_problem()
+        for using_chunks in range(1, 4):
+            chunks = req.get_chunks(using_chunks, '')
+            self.assertEqual(
+                [chunk.segment_index for chunk in chunks],
+                list(range(1, using_chunks + 1)),
+            )
+        self.assertEqual(fake.fetched, fake.get_chunk_names(3))
+
+    def test_evict_on_problem_change(self):
+        fake = FakeRequester([Problem('p1', 3, 0, 60, 3)])
+        req = CachingRequester(fake)
+        req.get_problem()
+        req.get_chunks(2, '')
+        self.assertEqual(req.cached_bytes(), 400)
+
+        fake.problems = [Problem('p2', 3, 0, 60, 3)]
+        req.get_problem()
+        self.assertEqual(req.cached_bytes(), 0)
+        req.get_chunks(1, '')
+        self.assertEqual(fake.fetched[-1], 'problem1_p2.wav')
+
+    def test_memory_bound(self):
+        fake = FakeRequester([Problem('p1', 3, 0, 60, 3)])
+        req = CachingRequester(fake, max_bytes=500)
+        req.get_problem()
+        req.get_chunks(3, '')
+        self.assertLessEqual(req.cached_bytes(), 500)
+
+        # 最も古い 1 つ目だけが破棄されている
+        fake.fetched.clear()
+        req.get_chunks(3, '')
+        self.assertEqual(fake.fetched, ['problem1_p1.wav'])
+
+        # 今回使う断片データは、新しく取得した分で追い出されない
+        fake.fetched.clear()
+        req.get_chunks(2, '')
+        self.assertEqual(fake.fetched, ['problem2_p1.wav'])
+        req.get_chunks(2, '')
+        self.assertEqual(fake.fetched, ['problem2_p1.wav'])
+
+    def test_fetch_async(self):
+        fake = FakeRequester([Problem('p1', 3, 0, 60, 3)])
+        req = CachingRequester(fake)
+        asyncio.run(req.get_problem_async())
+        asyncio.run(req.get_chunks_async(2, ''))
+        chunks = asyncio.run(req.get_chunks_async(3, ''))
+        self.assertEqual(
+            [chunk.segment_index for chunk in chunks], [1, 2, 3])
+        self.assertEqual(fake.fetched, fake.get_chunk_names(3))
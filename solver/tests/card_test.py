@@ -1,6 +1,14 @@
+import copy
+import pickle
+from os.path import join
+from tempfile import TemporaryDirectory
 from unittest import TestCase
 
-from solver.card import CardIndex, ShouldPickCardsByProblem
+import numpy as np
+
+from solver.card import CardIndex, ShouldPickCardsByProblem, \
+    should_pick_cards_from_npz, should_pick_cards_from_yaml
+from solver.convert import convert
 
 
 class CardTestCase(TestCase):
@@ -54,3 +62,123 @@ class CardTestCase(TestCase):
             '1', CardIndex.from_kana('あ')), 0.0)
         self.assertEqual(should_pick_sets.probability(
             '2', CardIndex.from_kana('あ')), 0.0)
+
+    def test_insert_all(self):
+        should_pick_sets = ShouldPickCardsByProblem()
+        for problem in range(20):
+            probabilities = np.full(44, problem / 100)
+            should_pick_sets.insert_all(str(problem), probabilities)
+            should_pick_sets.set_picks_on(str(problem), problem % 3 + 3)
+
+        self.assertEqual(should_pick_sets.problem_count(), 20)
+        self.assertEqual(should_pick_sets.matrix().shape, (20, 44))
+        self.assertEqual(should_pick_sets.cards_on('7'), 44)
+        self.assertEqual(should_pick_sets.picks_on('7'), 4)
+        self.assertEqual(should_pick_sets.probability(
+            '7', CardIndex.from_kana('わ')), 0.07)
+        self.assertEqual(should_pick_sets.picks_array().tolist(), [
+            problem % 3 + 3 for problem in range(20)
+        ])
+
+        row = should_pick_sets.row('7')
+        row[0] = 0.5
+        self.assertEqual(should_pick_sets.probability(
+            '7', CardIndex.from_kana('あ')), 0.5)
+
+        with self.assertRaises(ValueError):
+            should_pick_sets.insert_all('7', np.zeros(43))
+
+    def test_yaml_round_trip(self):
+        should_pick_sets = ShouldPickCardsByProblem()
+        should_pick_sets.set_picks_on('0', 3)
+        should_pick_sets.insert('0', CardIndex.from_kana('か'), 0.8)
+        should_pick_sets.insert('0', CardIndex.from_kana('と'), 0.25)
+        should_pick_sets.insert_all('1', np.linspace(0.0, 1.0, 44))
+
+        with TemporaryDirectory() as temp_dir:
+            path = join(temp_dir, 'pick-cards.yaml')
+            should_pick_sets.save_yaml(path)
+            loaded = should_pick_cards_from_yaml(path)
+
+        self.assertEqual(loaded.picks_on('0'), 3)
+        self.assertEqual(loaded.cards_on('0'), 2)
+        self.assertEqual(loaded.cards_on('1'), 44)
+        self.assertTrue(np.array_equal(
+            loaded.row('0'), should_pick_sets.row('0')))
+        self.assertTrue(np.array_equal(
+            loaded.row('1'), should_pick_sets.row('1')))
+
+    def test_npz_round_trip(self):
+        should_pick_sets = ShouldPickCardsByProblem()
+        should_pick_sets.set_picks_on('9', 3)
+        should_pick_sets.insert('9', CardIndex.from_kana('か'), 0.8)
+        should_pick_sets.insert_all('1', np.linspace(0.0, 1.0, 44))
+        should_pick_sets.set_picks_on('1', 4)
+
+        with TemporaryDirectory() as temp_dir:
+            path = join(temp_dir, 'pick-cards.npz')
+            should_pick_sets.save_npz(path)
+            for mmap in [True, False]:
+                loaded = should_pick_cards_from_npz(path, mmap=mmap)
+                self.assertEqual(list(loaded.problems()), ['9', '1'])
+                self.assertEqual(loaded.picks_array().tolist(), [3, 4])
+                self.assertEqual(loaded.cards_on('9'), 1)
+                self.assertTrue(np.array_equal(
+                    loaded.matrix(), should_pick_sets.matrix()))
+
+            # メモリマップした行列を書き換えても、ファイルは変わらない
+            loaded = should_pick_cards_from_npz(path)
+            loaded.insert_all('1', np.zeros(44))
+            for problem in range(20):
+                loaded.insert_all(str(problem + 10), np.ones(44))
+            self.assertEqual(loaded.problem_count(), 22)
+            self.assertEqual(loaded.probability(
+                '9', CardIndex.from_kana('か')), 0.8)
+            self.assertTrue(np.array_equal(
+                should_pick_cards_from_npz(path).row('1'),
+                should_pick_sets.row('1')))
+
+            empty = join(temp_dir, 'empty.npz')
+            ShouldPickCardsByProblem().save_npz(empty)
+            self.assertEqual(
+                should_pick_cards_from_npz(empty).problem_count(), 0)
+
+    def test_convert(self):
+        should_pick_sets = ShouldPickCardsByProblem()
+        should_pick_sets.insert('2', CardIndex.from_kana('と'), 0.25)
+        should_pick_sets.insert_all('0', np.linspace(0.0, 1.0, 44))
+
+        with TemporaryDirectory() as temp_dir:
+            yaml_path = join(temp_dir, 'pick-cards.yaml')
+            npz_path = join(temp_dir, 'pick-cards.npz')
+            should_pick_sets.save_yaml(yaml_path)
+            convert(yaml_path, npz_path)
+            convert(npz_path, yaml_path)
+            loaded = should_pick_cards_from_yaml(yaml_path)
+
+        self.assertEqual(list(loaded.problems()), ['2', '0'])
+        self.assertEqual(loaded.cards_on('2'), 1)
+        self.assertTrue(np.array_equal(
+            loaded.matrix(), should_pick_sets.matrix()))
+
+    def test_interned(self):
+        cards = list(CardIndex.all())
+
+        self.assertEqual(len(cards), 44)
+        for index, card in enumerate(cards):
+            self.assertIs(CardIndex.of(index + 1), card)
+            self.assertIs(CardIndex.from_kana(str(card)), card)
+            self.assertIs(CardIndex.from_0_pad(card.as_0_pad()), card)
+            self.assertIs(pickle.loads(pickle.dumps(card)), card)
+            self.assertIs(copy.deepcopy(card), card)
+        self.assertEqual(CardIndex.of(12).as_0_pad(), '12')
+        self.assertEqual(CardIndex.from_0_pad('03'), CardIndex(3))
+
+        with self.assertRaises(ValueError):
+            CardIndex.of(0)
+        with self.assertRaises(ValueError):
+            CardIndex.of(45)
+        with self.assertRaises(ValueError):
+            CardIndex.from_kana('ん')
+        with self.assertRaises(AttributeError):
+            CardIndex.of(1).__dict__
@@ -0,0 +1,29 @@
+from time import monotonic
+from unittest import TestCase
+
+from solver.benchmark import generate_match
+from solver.factory import SOLVER_FACTORIES, create_solver
+from solver.pick_ways import solve_by_threshold_sweep
+
+
+class FactoryTestCase(TestCase):
+    def test_exact_solvers_agree(self):
+        should = generate_match(0, 5, 3, 2.0)
+        expected = solve_by_threshold_sweep(5, should)
+        for name in SOLVER_FACTORIES:
+            if name == 'binary_search':
+                continue
+            solvers = create_solver(name, workers=2)
+            try:
+                solution = solvers.for_deadline(monotonic() + 60.0)(
+                    5, should)
+            finally:
+                solvers.close()
+            self.assertEqual(solution[1], expected[1], name)
+
+    def test_incremental_keeps_state(self):
+        solvers = create_solver('incremental')
+        self.assertIs(
+            solvers.for_deadline(0.0).__self__,
+            solvers.for_deadline(1.0).__self__,
+        )
@@ -0,0 +1,47 @@
+import numpy as np
+
+from solver.request.meta import AbstractRequester, Answer, Chunk, \
+    Match, Problem
+
+
+class FakeRequester(AbstractRequester):
+    """
+    テスト用のリクエスター。problems を問い合わせのたびに順に返し、最後の問題は返し続ける。
+
+    断片データは、最後に返した問題の ID を含むファイル名と、0 の音声波形で返す。
+    """
+
+    def __init__(self, problems: list[Problem]) -> None:
+        self.problems = problems
+        self.current_id = problems[0].id
+        self.fetched: list[str] = []
+
+    def get_match(self) -> Match:
+        return Match(1, [1.0], 1, 1, 1, 1)
+
+    def get_problem(self) -> Problem:
+        problem = self.problems[0]
+        if 1 < len(self.problems):
+            self.problems.pop(0)
+        self.current_id = problem.id
+        return problem
+
+    def get_chunk_names(self, using_chunks: int) -> list[str]:
+        return [
+            f'problem{idx + 1}_{self.current_id}.wav'
+            for idx in range(using_chunks)
+        ]
+
+    def fetch_chunks(
+        self,
+        chunk_names: list[str],
+        save_dir: str,
+    ) -> list[Chunk]:
+        self.fetched += chunk_names
+        return [
+            Chunk(int(name.split('_')[0][7:]), np.zeros(100, np.int16))
+            for name in chunk_names
+        ]
+
+    def post_answer(self, answer: Answer) -> None:
+        pass
@@ -0,0 +1,27 @@
+from unittest import TestCase
+
+from solver.flow import MinCostFlow
+
+
+class FlowTestCase(TestCase):
+    def test_min_cost_flow(self):
+        flow = MinCostFlow(4)
+        a = flow.add_edge(0, 1, 2, 1.0)
+        b = flow.add_edge(0, 2, 1, 2.0)
+        c = flow.add_edge(1, 2, 1, 1.0)
+        d = flow.add_edge(1, 3, 1, 3.0)
+        e = flow.add_edge(2, 3, 2, 1.0)
+
+        self.assertEqual(flow.flow(0, 3, 3), (3, 10.0))
+        self.assertEqual(
+            [flow.edge_flow(edge) for edge in [a, b, c, d, e]],
+            [2, 1, 1, 1, 2],
+        )
+
+    def test_negative_cost(self):
+        flow = MinCostFlow(3)
+        flow.add_edge(0, 1, 1, -2.0)
+        flow.add_edge(0, 1, 1, 1.0)
+        flow.add_edge(1, 2, 5, -1.0)
+
+        self.assertEqual(flow.flow(0, 2, 5), (2, -3.0))
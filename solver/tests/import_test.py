@@ -0,0 +1,20 @@
+import subprocess
+import sys
+from unittest import TestCase
+
+
+class ImportTestCase(TestCase):
+    def test_solver_does_not_import_tensorflow(self):
+        # ソルバーだけを使うときは、読み込みに時間がかかる TensorFlow などを import しない
+        code = (
+            'import sys\n'
+            'import solver.benchmark, solver.prediction_cache, '
+            'solver.request.cache, solver.request.mock, solver.request.net\n'
+            'heavy = {"tensorflow", "librosa", "cv2"}\n'
+            'print(sorted(heavy & sys.modules.keys()))'
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', code],
+            capture_output=True, text=True, check=True,
+        )
+        self.assertEqual(result.stdout.strip(), '[]')
@@ -0,0 +1,55 @@
+from unittest import TestCase
+
+import numpy as np
+
+from solver.card import CardIndex, ShouldPickCardsByProblem
+from solver.incremental import IncrementalSolver
+from solver.pick_ways import solve_by_threshold_sweep
+
+
+class IncrementalTestCase(TestCase):
+    def test_same_threshold_as_sweep(self):
+        rng = np.random.default_rng(0)
+        solver = IncrementalSolver()
+        should_pick_sets = ShouldPickCardsByProblem()
+        rounds = 6
+        for problem in range(rounds):
+            for _ in range(3):
+                should_pick_sets.insert_all(
+                    str(problem),
+                    rng.random(44) * (rng.random(44) < 0.5),
+                )
+                should_pick_sets.set_picks_on(
+                    str(problem), int(rng.integers(1, 4)))
+
+                expected = solve_by_threshold_sweep(rounds, should_pick_sets)
+                actual = solver.solve(rounds, should_pick_sets)
+
+                if expected is None:
+                    self.assertIsNone(actual)
+                    continue
+                self.assertIsNotNone(actual)
+                self.assertEqual(actual[1], expected[1])
+                picked = [card for cards in actual[0] for card in cards]
+                self.assertEqual(len(picked), len(set(picked)))
+                for index, cards in enumerate(actual[0]):
+                    self.assertEqual(
+                        len(cards), should_pick_sets.picks_on(str(index)))
+
+    def test_reuse_previous_result(self):
+        should_pick_sets = ShouldPickCardsByProblem()
+        should_pick_sets.set_picks_on('0', 1)
+        should_pick_sets.insert('0', CardIndex.from_kana('あ'), 0.5)
+        should_pick_sets.insert('0', CardIndex.from_kana('い'), 0.5)
+        solver = IncrementalSolver()
+
+        first = solver.solve(2, should_pick_sets)
+        self.assertIs(solver.solve(2, should_pick_sets), first)
+
+        should_pick_sets.set_picks_on('1', 1)
+        should_pick_sets.insert('1', CardIndex.from_kana('あ'), 1.0)
+        second = solver.solve(2, should_pick_sets)
+        self.assertEqual(second, (
+            [[CardIndex.from_kana('い')], [CardIndex.from_kana('あ')]],
+            0.25,
+        ))
@@ -0,0 +1,86 @@
+from os.path import getsize, join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import numpy as np
+
+from solver.card import CARDS, should_pick_cards_from_npz
+from solver.journal import Journal
+
+
+class JournalTestCase(TestCase):
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.rng = np.random.default_rng(0)
+
+    def record_problem(self, journal: Journal, problem: str) -> None:
+        journal.should.insert_all(problem, self.rng.random(CARDS))
+        journal.should.set_picks_on(problem, 3)
+        journal.record_row(problem)
+        journal.state.current_problem_id = problem
+        journal.state.used_chunks[problem] = 2
+        journal.state.past_answers[problem] = ['01', '02', '03']
+        journal.state.current_fails += 1
+        journal.record_state(problem)
+
+    def reload(self) -> Journal:
+        journal = Journal(self.temp_dir.name)
+        journal.load()
+        self.addCleanup(journal.close)
+        return journal
+
+    def assert_restored(self, restored: Journal, original: Journal) -> None:
+        self.assertEqual(
+            list(restored.should.problems()), list(original.should.problems()))
+        self.assertTrue(np.array_equal(
+            restored.should.matrix(), original.should.matrix()))
+        self.assertTrue(np.array_equal(
+            restored.should.picks_array(), original.should.picks_array()))
+        self.assertEqual(restored.state, original.state)
+
+    def test_replay(self):
+        journal = Journal(self.temp_dir.name, snapshot_every=5)
+        journal.load()
+        # 追加順がソートした順と異なるようにする
+        for problem in ['p3', 'p1', 'p2']:
+            self.record_problem(journal, problem)
+        journal.close()
+        self.assert_restored(self.reload(), journal)
+
+    def test_snapshot_keeps_order(self):
+        journal = Journal(self.temp_dir.name)
+        journal.load()
+        for problem in ['p3', 'p1', 'p2']:
+            self.record_problem(journal, problem)
+        journal.snapshot()
+        journal.close()
+        self.assertEqual(getsize(journal.journal_path), 0)
+        should = should_pick_cards_from_npz(journal.pick_cards_path)
+        self.assertEqual(list(should.problems()), ['p3', 'p1', 'p2'])
+        self.assert_restored(self.reload(), journal)
+
+    def test_load_legacy_yaml(self):
+        journal = Journal(self.temp_dir.name)
+        journal.load()
+        self.record_problem(journal, 'p1')
+        journal.close()
+        journal.should.save_yaml(journal.legacy_pick_cards_path)
+        journal.state.save_yaml(journal.state_path)
+        open(journal.journal_path, 'w').close()
+        self.assert_restored(self.reload(), journal)
+
+    def test_torn_record(self):
+        journal = Journal(self.temp_dir.name)
+        journal.load()
+        self.record_problem(journal, 'p1')
+        journal.close()
+        with open(join(self.temp_dir.name, 'journal.jsonl'), 'a') as f:
+            f.write('{"row":"p2","picks":3,"probabil')
+
+        restored = self.reload()
+        self.assert_restored(restored, journal)
+        # 壊れた行は切り捨てられ、続きの記録を追記できる
+        self.record_problem(restored, 'p2')
+        restored.close()
+        self.assert_restored(self.reload(), restored)
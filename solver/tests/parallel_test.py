@@ -0,0 +1,45 @@
+from unittest import TestCase
+
+import numpy as np
+
+from solver.card import ShouldPickCardsByProblem
+from solver.parallel import ParallelSolver, solve_in_parallel
+from solver.pick_ways import solve_by_threshold_sweep
+
+
+class ParallelTestCase(TestCase):
+    def test_same_threshold_as_sweep(self):
+        rng = np.random.default_rng(0)
+        for rounds in [1, 4, 8]:
+            should_pick_sets = ShouldPickCardsByProblem()
+            for problem in range(rounds):
+                should_pick_sets.insert_all(
+                    str(problem),
+                    rng.random(44) * (rng.random(44) < 0.5),
+                )
+                should_pick_sets.set_picks_on(
+                    str(problem), int(rng.integers(1, 4)))
+
+            expected = solve_by_threshold_sweep(rounds, should_pick_sets)
+            actual = solve_in_parallel(
+                rounds, should_pick_sets, workers=3, min_problems=0)
+
+            if expected is None:
+                self.assertIsNone(actual)
+                continue
+            self.assertIsNotNone(actual)
+            self.assertEqual(actual[1], expected[1])
+            picked = [card for cards in actual[0] for card in cards]
+            self.assertEqual(len(picked), len(set(picked)))
+
+    def test_reuse_pool(self):
+        rng = np.random.default_rng(1)
+        should_pick_sets = ShouldPickCardsByProblem()
+        with ParallelSolver(workers=2, min_problems=0) as solver:
+            for problem in range(6):
+                should_pick_sets.insert_all(str(problem), rng.random(44))
+                should_pick_sets.set_picks_on(str(problem), 3)
+                expected = solve_by_threshold_sweep(
+                    problem + 1, should_pick_sets)
+                actual = solver.solve(problem + 1, should_pick_sets)
+                self.assertEqual(actual[1], expected[1])
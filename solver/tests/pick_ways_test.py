@@ -1,8 +1,12 @@
 from unittest import TestCase
 
+import numpy as np
+
 from solver.card import CardIndex, ShouldPickCardsByProblem
-from solver.pick_ways import ShouldPickList, convert_to_pick_lists, \
-    solve_by_binary_search
+from solver.pick_ways import MEMO_LIMIT, SOLVERS, ShouldPickList, \
+    calc_pick_probabilities, convert_to_pick_indexes, convert_to_pick_lists, \
+    search_pick_indexes, solve_by_binary_search, solve_by_min_cost_flow, \
+    solve_by_threshold_sweep
 
 
 class PickWaysTestCase(TestCase):
@@ -90,3 +94,148 @@ class PickWaysTestCase(TestCase):
                 [CardIndex.from_kana('え')]
             ], 0.2490234375)
         )
+
+    def test_pick_probabilities(self):
+        should_pick_sets = ShouldPickCardsByProblem()
+        should_pick_sets.insert('0', CardIndex.from_kana('あ'), 0.5)
+        should_pick_sets.insert('0', CardIndex.from_kana('い'), 0.25)
+        should_pick_sets.insert('1', CardIndex.from_kana('あ'), 0.5)
+        should_pick_sets.insert('1', CardIndex.from_kana('う'), 1.0)
+
+        pick_probabilities = calc_pick_probabilities(should_pick_sets)
+
+        self.assertEqual(pick_probabilities.shape, (2, 44))
+        self.assertEqual(pick_probabilities[0, 0], 0.25)
+        self.assertEqual(pick_probabilities[0, 1], 0.0625)
+        self.assertEqual(pick_probabilities[1, 0], 0.125)
+        self.assertEqual(pick_probabilities[1, 2], 0.75)
+
+        pick_indexes = convert_to_pick_indexes(
+            pick_probabilities, np.array([1, 2]), 0.1)
+        self.assertIsNotNone(pick_indexes)
+        self.assertEqual([indexes.tolist() for indexes in pick_indexes], [
+            [0],
+            [0, 2],
+        ])
+        self.assertIsNone(convert_to_pick_indexes(
+            pick_probabilities, np.array([1, 2]), 0.2))
+
+    def test_threshold_sweep(self):
+        """
+        1. [い, う]
+        2. [あ, い]
+        3. [い, え]
+        4. [え]
+        """
+        rounds = 4
+        should_pick_sets = ShouldPickCardsByProblem()
+        should_pick_sets.set_picks_on('0', 1)
+        should_pick_sets.insert('0', CardIndex.from_kana('い'), 0.5)
+        should_pick_sets.insert('0', CardIndex.from_kana('う'), 0.5)
+        should_pick_sets.set_picks_on('1', 1)
+        should_pick_sets.insert('1', CardIndex.from_kana('あ'), 0.5)
+        should_pick_sets.insert('1', CardIndex.from_kana('い'), 0.5)
+        should_pick_sets.set_picks_on('2', 1)
+        should_pick_sets.insert('2', CardIndex.from_kana('い'), 0.5)
+        should_pick_sets.insert('2', CardIndex.from_kana('え'), 0.5)
+        should_pick_sets.set_picks_on('3', 1)
+        should_pick_sets.insert('3', CardIndex.from_kana('え'), 1.0)
+
+        answer = solve_by_threshold_sweep(rounds, should_pick_sets)
+        approximated = solve_by_binary_search(rounds, should_pick_sets)
+
+        self.assertIsNotNone(answer)
+        self.assertIsNotNone(approximated)
+        ways, threshold = answer
+        self.assertEqual(ways, [
+            [CardIndex.from_kana('う')],
+            [CardIndex.from_kana('あ')],
+            [CardIndex.from_kana('い')],
+            [CardIndex.from_kana('え')]
+        ])
+        self.assertEqual(threshold, 0.25)
+        self.assertAlmostEqual(threshold, approximated[1], delta=0.001)
+
+    def test_threshold_sweep_not_found(self):
+        should_pick_sets = ShouldPickCardsByProblem()
+        should_pick_sets.set_picks_on('0', 2)
+        should_pick_sets.insert('0', CardIndex.from_kana('あ'), 0.5)
+        should_pick_sets.set_picks_on('1', 1)
+        should_pick_sets.insert('1', CardIndex.from_kana('い'), 0.5)
+
+        self.assertIsNone(solve_by_threshold_sweep(2, should_pick_sets))
+
+    def test_search_pick_indexes(self):
+        pick_indexes = [
+            [0, 1, 2, 3],
+            [0, 1],
+            [1, 2],
+            [4, 5],
+        ]
+        picks = [2, 1, 1, 2]
+
+        for memo_limit in [1, MEMO_LIMIT]:
+            ways = search_pick_indexes(
+                4, pick_indexes, picks, memo_limit=memo_limit)
+            self.assertEqual(ways, [[2, 3], [0], [1], [4, 5]])
+
+        self.assertIsNone(search_pick_indexes(4, pick_indexes, [3, 1, 1, 2]))
+        self.assertEqual(search_pick_indexes(2, pick_indexes, [3, 1]), [
+            [1, 2, 3],
+            [0],
+        ])
+
+    def test_min_cost_flow(self):
+        """
+        1. [い, う]
+        2. [あ, い]
+        3. [い, え]
+        4. [え]
+        """
+        rounds = 4
+        should_pick_sets = ShouldPickCardsByProblem()
+        should_pick_sets.set_picks_on('0', 1)
+        should_pick_sets.insert('0', CardIndex.from_kana('い'), 0.5)
+        should_pick_sets.insert('0', CardIndex.from_kana('う'), 0.5)
+        should_pick_sets.set_picks_on('1', 1)
+        should_pick_sets.insert('1', CardIndex.from_kana('あ'), 0.5)
+        should_pick_sets.insert('1', CardIndex.from_kana('い'), 0.5)
+        should_pick_sets.set_picks_on('2', 1)
+        should_pick_sets.insert('2', CardIndex.from_kana('い'), 0.5)
+        should_pick_sets.insert('2', CardIndex.from_kana('え'), 0.5)
+        should_pick_sets.set_picks_on('3', 1)
+        should_pick_sets.insert('3', CardIndex.from_kana('え'), 1.0)
+
+        answer = SOLVERS['min_cost_flow'](rounds, should_pick_sets)
+
+        self.assertEqual(answer, ([
+            [CardIndex.from_kana('う')],
+            [CardIndex.from_kana('あ')],
+            [CardIndex.from_kana('い')],
+            [CardIndex.from_kana('え')]
+        ], 0.25))
+
+    def test_min_cost_flow_maximizes_log_probability(self):
+        """
+        1. [あ: 0.9, い: 0.8] から 1 枚
+        2. [あ: 0.9, い: 0.1, う: 0.5] から 2 枚
+        """
+        should_pick_sets = ShouldPickCardsByProblem()
+        should_pick_sets.set_picks_on('0', 1)
+        should_pick_sets.insert('0', CardIndex.from_kana('あ'), 0.9)
+        should_pick_sets.insert('0', CardIndex.from_kana('い'), 0.8)
+        should_pick_sets.set_picks_on('1', 2)
+        should_pick_sets.insert('1', CardIndex.from_kana('あ'), 0.9)
+        should_pick_sets.insert('1', CardIndex.from_kana('い'), 0.1)
+        should_pick_sets.insert('1', CardIndex.from_kana('う'), 0.5)
+
+        answer = solve_by_min_cost_flow(2, should_pick_sets)
+
+        self.assertIsNotNone(answer)
+        self.assertEqual(answer[0], [
+            [CardIndex.from_kana('い')],
+            [CardIndex.from_kana('あ'), CardIndex.from_kana('う')],
+        ])
+
+        should_pick_sets.set_picks_on('1', 3)
+        self.assertIsNone(solve_by_min_cost_flow(2, should_pick_sets))
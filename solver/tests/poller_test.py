@@ -0,0 +1,94 @@
+import asyncio
+from time import time
+from unittest import TestCase
+
+from solver.poller import ProblemPoller
+from solver.request.meta import Problem
+from solver.state import SolverState
+from solver.tests.fake_requester import FakeRequester
+
+
+class ProblemPollerTestCase(TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        self.slept: list[float] = []
+        self.state = SolverState('', 0, {}, {'p1': ['01']})
+
+    def poller(self, problems: list[Problem]) -> ProblemPoller:
+        def sleep(seconds: float) -> None:
+            self.slept.append(seconds)
+            self.now += seconds
+        return ProblemPoller(
+            FakeRequester(problems), self.state,
+            min_interval=1.0, max_interval=4.0,
+            clock=lambda: self.now, sleep=sleep,
+        )
+
+    def test_skip_solved_problem(self):
+        poller = self.poller([
+            Problem('p1', 3, 990, 20, 3),
+            Problem('p2', 3, 1010, 20, 3),
+        ])
+        self.assertEqual(poller.next_problem().id, 'p2')
+        # 回答済みの問題の回答期限まで待つ
+        self.assertEqual(self.slept, [10.0])
+        self.assertEqual(poller.total_polls, 2)
+
+    def test_back_off(self):
+        poller = self.poller([Problem('p2', 3, 900, 20, 3)] * 6 + [
+            Problem('p3', 3, 1000, 20, 3),
+        ])
+        self.assertEqual(poller.next_problem().id, 'p2')
+        self.assertEqual(poller.next_problem().id, 'p3')
+        # 期限を過ぎても問題が変わらないときは、待つ時間を倍にしていく
+        self.assertEqual(self.slept, [1.0, 2.0, 4.0, 4.0, 4.0])
+        self.assertEqual(poller.total_polls, 7)
+
+    def test_forget(self):
+        poller = self.poller([Problem('p2', 3, 1000, 20, 3)] * 2)
+        self.assertEqual(poller.next_problem().id, 'p2')
+        # 回答を送信できなかった問題は、もう一度処理する
+        self.assertTrue(poller.forget('p2'))
+        self.assertEqual(poller.next_problem().id, 'p2')
+        self.assertEqual(self.slept, [])
+
+    def test_forget_after_next_problem(self):
+        poller = self.poller([
+            Problem('p2', 3, 1000, 20, 3),
+            Problem('p3', 3, 1020, 20, 3),
+        ])
+        self.assertEqual(poller.next_problem().id, 'p2')
+        self.assertEqual(poller.next_problem().id, 'p3')
+        # 次の問題に進んだ後は、以前の問題を処理し直さない
+        self.assertFalse(poller.is_current('p2'))
+        self.assertFalse(poller.forget('p2'))
+        self.assertTrue(poller.is_current('p3'))
+
+    def test_forget_wakes_async_wait(self):
+        poller = self.poller([
+            Problem('p2', 3, int(time()), 3600, 3),
+            Problem('p2', 3, int(time()), 3600, 3),
+        ])
+        poller.clock = time
+
+        async def run():
+            self.assertEqual((await poller.next_problem_async()).id, 'p2')
+            waiting = asyncio.create_task(poller.next_problem_async())
+            await asyncio.sleep(0.05)
+            self.assertFalse(waiting.done())
+            poller.forget('p2')
+            return await asyncio.wait_for(waiting, 1.0)
+
+        self.assertEqual(asyncio.run(run()).id, 'p2')
+
+    def test_async_in_separate_event_loops(self):
+        # main.py と同じく、イベントループの外で作ってから使う
+        self.now = 999.99
+        poller = self.poller([
+            Problem('p1', 3, 990, 10, 3),
+            Problem('p2', 3, 1000, 20, 3),
+            Problem('p1', 3, 990, 10, 3),
+            Problem('p3', 3, 1000, 20, 3),
+        ])
+        self.assertEqual(asyncio.run(poller.next_problem_async()).id, 'p2')
+        self.assertEqual(asyncio.run(poller.next_problem_async()).id, 'p3')
@@ -0,0 +1,50 @@
+from unittest import TestCase
+
+import numpy as np
+
+from solver.prediction_cache import PredictionCache
+from solver.request.meta import Chunk
+
+
+class PredictionCacheTestCase(TestCase):
+    def setUp(self):
+        self.preprocessed: list[int] = []
+        self.batch_sizes: list[int] = []
+
+        def preprocess(wavs: list[np.ndarray]) -> np.ndarray:
+            self.preprocessed += [int(wav[0]) for wav in wavs]
+            return np.array(wavs, dtype=np.float64)
+
+        def predict(features: np.ndarray) -> np.ndarray:
+            self.batch_sizes.append(len(features))
+            return features[:, :4] / 10.0
+
+        self.cache = PredictionCache(preprocess, predict)
+        rng = np.random.default_rng(0)
+        self.chunks = [
+            Chunk(index, np.concatenate([[index], rng.uniform(0, 1, 7)]))
+            for index in range(4)
+        ]
+
+    def test_infer_only_new_chunks(self):
+        for using_chunks in range(1, len(self.chunks) + 1):
+            chunks = self.chunks[:using_chunks]
+            average = self.cache.update('p1', chunks)
+            expected = np.average(
+                [chunk.wav[:4] / 10.0 for chunk in chunks], axis=0)
+            self.assertTrue(np.allclose(average, expected))
+        self.assertEqual(self.preprocessed, [0, 1, 2, 3])
+        self.assertEqual(self.batch_sizes, [1, 1, 1, 1])
+        self.assertIsNotNone(self.cache.feature(3))
+
+    def test_reset_on_problem_change(self):
+        self.cache.update('p1', self.chunks[:2])
+        self.cache.update('p2', self.chunks[:1])
+        self.assertEqual(self.preprocessed, [0, 1, 0])
+        self.assertIsNone(self.cache.prediction(1))
+
+    def test_fewer_chunks(self):
+        self.cache.update('p1', self.chunks[:3])
+        average = self.cache.update('p1', self.chunks[1:2])
+        self.assertTrue(np.allclose(average, self.chunks[1].wav[:4] / 10.0))
+        self.assertEqual(self.batch_sizes, [3])
@@ -0,0 +1,53 @@
+from unittest import TestCase
+
+from solver.const import ScoreConstant
+from solver.request.meta import Problem
+from solver.schedule import ChunkScheduler
+
+
+class ChunkSchedulerTestCase(TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        self.scheduler = ChunkScheduler(margin=1.0, clock=lambda: self.now)
+        self.problem = Problem('p1', 4, 1000, 10, 3)
+        self.const = ScoreConstant(1, [1.0, 1.0, 0.9, 0.8, 0.7], 1)
+        self.scheduler.start(self.problem)
+
+    def test_fits_next(self):
+        self.assertTrue(self.scheduler.fits_next())
+        for stage, seconds in [
+            ('fetch', 2.0), ('preprocess', 1.0),
+            ('inference', 1.0), ('solve', 1.0),
+        ]:
+            self.scheduler.record(stage, seconds)
+        self.assertAlmostEqual(self.scheduler.step_seconds(), 5.0)
+        self.assertTrue(self.scheduler.fits_next())
+
+        self.now = 1004.5
+        self.assertFalse(self.scheduler.fits_next())
+
+    def test_moving_average(self):
+        self.scheduler.record('fetch', 2.0)
+        self.scheduler.record('fetch', 4.0)
+        self.assertAlmostEqual(self.scheduler.stage_seconds('fetch'), 3.0)
+
+        timed = self.scheduler.timed('solve', lambda x: x + 1)
+        self.assertEqual(timed(1), 2)
+        self.assertLess(3.0, self.scheduler.step_seconds())
+
+    def test_should_escalate(self):
+        # 確信が低いときは、次の断片データで得点が上がる見込みがある
+        self.assertTrue(self.scheduler.should_escalate(
+            self.problem, 1, 1.5, 0, self.const))
+        # 十分に確信があるときは、ボーナスが減るので増やさない
+        self.assertFalse(self.scheduler.should_escalate(
+            self.problem, 2, 2.9, 0, self.const))
+        # 全ての断片データを使ったときは増やせない
+        self.assertFalse(self.scheduler.should_escalate(
+            self.problem, 4, 0.0, 0, self.const))
+
+    def test_no_escalation_near_deadline(self):
+        self.scheduler.record('fetch', 3.0)
+        self.now = 1007.0
+        self.assertFalse(self.scheduler.should_escalate(
+            self.problem, 1, 0.0, 0, self.const))
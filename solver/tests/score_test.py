@@ -0,0 +1,11 @@
+from unittest import TestCase
+
+from solver.const import ScoreConstant
+from solver.score import calc_score
+
+
+class ScoreTestCase(TestCase):
+    def test_bonus_by_used_data(self):
+        const = ScoreConstant(1, [3.0, 2.5, 2.0, 1.5, 1.0], 20)
+        self.assertEqual(calc_score(3, 0, 1, const), 9.0)
+        self.assertEqual(calc_score(3, 1, 5, const), -17.0)
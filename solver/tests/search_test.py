@@ -0,0 +1,89 @@
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import numpy as np
+
+from solver.card import CARDS
+from solver.const import ScoreConstant
+from solver.journal import Journal
+from solver.pick_ways import solve_by_threshold_sweep
+from solver.request.meta import Match, Problem
+from solver.schedule import ChunkScheduler
+from solver.search import AnswerSearch
+from solver.stopping import StoppingPolicy
+
+
+class AnswerSearchTestCase(TestCase):
+    def setUp(self):
+        temp_dir = TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = temp_dir.name
+        self.journal = Journal(self.temp_dir)
+        self.journal.load()
+        self.addCleanup(self.journal.close)
+        self.bonus = [3.0, 2.5, 2.0]
+        self.match = Match(2, self.bonus, 1, 1, 1, 1)
+        self.const = ScoreConstant(1, self.bonus, 1)
+
+    def search_on(self, problem: Problem) -> AnswerSearch:
+        return AnswerSearch(
+            ChunkScheduler(clock=lambda: 1000.0),
+            # 確信度では止めず、得点の見込みだけで断片データを増やす
+            StoppingPolicy(min_lowest=float('inf')),
+            self.match, self.const, self.journal, problem,
+            solve_by_threshold_sweep,
+        )
+
+    def test_submit_latest_solution(self):
+        search = self.search_on(Problem('p1', 3, 1000, 60, 2))
+
+        # 1 つ目の断片データでは、札 01 と 02 が含まれていそうだが確信は低い
+        first = np.full(CARDS, 0.1)
+        first[[0, 1]] = 0.6
+        search.use_chunks(1)
+        self.assertTrue(search.step(1, first))
+
+        # 2 つ目までの平均では、札 03 と 04 だと確信できる
+        second = np.full(CARDS, 0.05)
+        second[[2, 3]] = 0.99
+        search.use_chunks(2)
+        self.assertFalse(search.step(2, second))
+
+        answers = search.finish()
+        self.assertEqual(answers[-1].answers, ['03', '04'])
+        self.assertEqual(self.journal.state.past_answers['p1'], ['03', '04'])
+
+    def test_submit_after_solved_problems(self):
+        # 解き終えた問題の得点が高くても、この問題の回答を送る
+        solved = np.full(CARDS, 0.05)
+        solved[[10, 11]] = 0.99
+        self.journal.should.insert_all('p0', solved)
+        self.journal.should.set_picks_on('p0', 2)
+        self.journal.state.used_chunks['p0'] = 1
+
+        search = self.search_on(Problem('p1', 3, 1000, 60, 2))
+        current = np.full(CARDS, 0.05)
+        current[[2, 3]] = 0.99
+        search.use_chunks(1)
+        self.assertFalse(search.step(1, current))
+        self.assertEqual(search.finish()[-1].answers, ['03', '04'])
+
+    def test_roll_back(self):
+        self.journal.state.past_answers['p1'] = ['01', '02']
+        search = self.search_on(Problem('p1', 3, 1000, 60, 2))
+        current = np.full(CARDS, 0.05)
+        current[[2, 3]] = 0.99
+        search.use_chunks(1)
+        search.step(1, current)
+        search.finish()
+        self.assertEqual(self.journal.state.current_fails, 2)
+
+        # 送信できなかった回答は取り消され、ジャーナルから再生しても戻らない
+        search.roll_back()
+        self.assertEqual(self.journal.state.current_fails, 0)
+        self.assertEqual(self.journal.state.past_answers['p1'], ['01', '02'])
+        self.journal.close()
+        restored = Journal(self.temp_dir)
+        restored.load()
+        self.addCleanup(restored.close)
+        self.assertEqual(restored.state, self.journal.state)
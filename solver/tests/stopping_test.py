@@ -0,0 +1,97 @@
+from os.path import join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import numpy as np
+
+from solver.card import CARDS, ShouldPickCardsByProblem
+from solver.pick_ways import solve_by_threshold_sweep
+from solver.replay import ReplaySample, load_predictions, replay, \
+    replay_sample, save_predictions
+from solver.stopping import StoppingPolicy
+
+
+class StoppingPolicyTestCase(TestCase):
+    def test_confidence(self):
+        probabilities = np.full(CARDS, 0.1)
+        probabilities[[3, 7, 9]] = [0.9, 0.8, 0.6]
+        confidence = StoppingPolicy().confidence(
+            probabilities, probabilities, 3)
+        self.assertAlmostEqual(confidence.lowest, 0.6)
+        self.assertAlmostEqual(confidence.margin, 0.5)
+        self.assertAlmostEqual(confidence.pick_margin, 0.5 / 0.9)
+
+        # 試合全体を通した確率は、後の問題ほど桁が大きくなっても同じ差になる
+        scaled = StoppingPolicy().confidence(
+            probabilities, probabilities * 1e6, 3)
+        self.assertAlmostEqual(scaled.pick_margin, 0.5 / 0.9)
+
+    def test_should_stop(self):
+        probabilities = np.full(CARDS, 0.1)
+        probabilities[[3, 7, 9]] = [0.9, 0.8, 0.6]
+        self.assertTrue(StoppingPolicy(0.5, 0.2).should_stop(
+            probabilities, probabilities, 3))
+        self.assertFalse(StoppingPolicy(0.7, 0.2).should_stop(
+            probabilities, probabilities, 3))
+        # 3 枚目と 4 枚目の差が小さいときは回答しない
+        probabilities[11] = 0.55
+        self.assertFalse(StoppingPolicy(0.5, 0.2).should_stop(
+            probabilities, probabilities, 3))
+
+    def test_should_stop_on_pick_margin(self):
+        probabilities = np.full(CARDS, 0.1)
+        probabilities[[3, 7, 9]] = [0.9, 0.8, 0.6]
+        # 以前の問題で取られていそうな札は、試合全体を通した確率が選ばなかった札と近くなる
+        pick_probabilities = probabilities.copy()
+        pick_probabilities[9] = 0.2
+        self.assertTrue(StoppingPolicy(0.5, 0.2, 0.0).should_stop(
+            probabilities, pick_probabilities, 3))
+        self.assertFalse(StoppingPolicy(0.5, 0.2).should_stop(
+            probabilities, pick_probabilities, 3))
+
+
+class ReplayTestCase(TestCase):
+    def setUp(self):
+        # 1 つ目の断片データだけでは、2 枚目の正解の札と不正解の札の確率が近い
+        predictions = np.full((3, CARDS), 0.1)
+        predictions[:, 0] = 0.9
+        predictions[:, 5] = [0.45, 0.9, 0.9]
+        predictions[0, 6] = 0.5
+        self.samples = [ReplaySample('p1', [0, 5], predictions)]
+
+    def test_replay(self):
+        eager = replay(StoppingPolicy(0.0, 0.0, 0.0), self.samples)
+        self.assertEqual(eager.mean_chunks, 1.0)
+        self.assertEqual(eager.accuracy, 0.5)
+
+        careful = replay(StoppingPolicy(0.4, 0.1), self.samples)
+        self.assertEqual(careful.mean_chunks, 2.0)
+        self.assertEqual(careful.accuracy, 1.0)
+
+        full = replay(StoppingPolicy(float('inf')), self.samples)
+        self.assertEqual(full.mean_chunks, 3.0)
+
+    def test_replay_scores_submitted_answer(self):
+        sample = self.samples[0]
+        using_chunks, picked = replay_sample(
+            StoppingPolicy(0.4, 0.1), sample)
+        self.assertEqual(using_chunks, 2)
+
+        # 止めた時点の予測の平均から、main.py と同じソルバーで求めた取り方を回答している
+        should = ShouldPickCardsByProblem()
+        should.insert_all(
+            sample.name, np.average(sample.predictions[:2], axis=0))
+        should.set_picks_on(sample.name, 2)
+        ways, _threshold = solve_by_threshold_sweep(1, should)
+        self.assertEqual(picked, [hash(card) - 1 for card in ways[0]])
+        self.assertEqual(sorted(picked), sample.expected)
+
+    def test_save_and_load(self):
+        with TemporaryDirectory() as temp_dir:
+            path = join(temp_dir, 'replay.npz')
+            save_predictions(path, self.samples)
+            loaded = load_predictions(path)
+        self.assertEqual(loaded[0].name, 'p1')
+        self.assertEqual(loaded[0].expected, [0, 5])
+        self.assertTrue(
+            np.array_equal(loaded[0].predictions, self.samples[0].predictions))
@@ -0,0 +1,50 @@
+from io import BytesIO
+from os.path import join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import numpy as np
+from scipy.io import wavfile
+
+from solver.request.wav import decode_wav, read_wav_file
+
+
+class WavTestCase(TestCase):
+    def test_same_as_scipy(self):
+        samples = [
+            (np.arange(-500, 500) * 30).astype(np.int16),
+            np.stack([np.arange(100), -np.arange(100)], axis=1)
+            .astype(np.int16),
+            np.linspace(-1.0, 1.0, 77).astype(np.float32),
+            np.arange(256).astype(np.uint8),
+        ]
+        for sample in samples:
+            buffer = BytesIO()
+            wavfile.write(buffer, 48000, sample)
+            content = buffer.getvalue()
+
+            rate, wav = decode_wav(content)
+            expected_rate, expected = wavfile.read(BytesIO(content))
+
+            self.assertEqual(rate, expected_rate)
+            self.assertEqual(wav.dtype, expected.dtype)
+            self.assertTrue(np.array_equal(wav, expected))
+            self.assertFalse(wav.flags.writeable)
+
+    def test_read_wav_file(self):
+        sample = (np.arange(1000) % 300).astype(np.int16)
+        with TemporaryDirectory() as temp_dir:
+            path = join(temp_dir, 'chunk.wav')
+            wavfile.write(path, 48000, sample)
+
+            rate, wav = read_wav_file(path)
+
+            self.assertEqual(rate, 48000)
+            self.assertTrue(np.array_equal(wav, sample))
+            del wav
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            decode_wav(b'RIFF\x00\x00\x00\x00WAVX')
+        with self.assertRaises(ValueError):
+            decode_wav(b'RIFF\x04\x00\x00\x00WAVE')